@@ -0,0 +1,204 @@
+from geocodificador import (
+    obter_geocodificador, IndiceProximidade, GradeEsferica, vetores_unitarios, similaridade_para_km, melhor_por_grupo,
+    RAIO_TERRA_KM,
+)
+import numpy as np
+import threading
+import os
+
+# Aeronaves abaixo desta altitude barométrica (m) e sem subir forte são candidatas a estar em aproximação
+ALTITUDE_MAXIMA_APROXIMACAO = float(os.getenv("ALTITUDE_MAXIMA_APROXIMACAO", 6000))
+
+# Razão de subida (m/s) acima da qual a aeronave é considerada decolando, e não em aproximação
+RAZAO_SUBIDA_MAXIMA_APROXIMACAO = 2.5
+
+# Abertura do cone à frente da aeronave (graus para cada lado da direção) em que o destino é procurado
+CONE_DESTINO_GRAUS = 30.0
+
+# Alcance de descida: regra de 3 milhas náuticas por 1000 pés, com uma margem de segurança
+MILHAS_POR_MIL_PES = 3.0
+MARGEM_ALCANCE_DESCIDA = 1.5
+ALCANCE_MINIMO_DESCIDA_KM = 20.0
+
+METROS_PARA_PES = 3.28084
+MILHA_NAUTICA_EM_KM = 1.852
+KM_POR_GRAU = RAIO_TERRA_KM * np.pi / 180.0
+
+# Tamanho (graus) das células da grade usada para encontrar os aeroportos ao alcance da descida
+CELULA_DESTINO_GRAUS = 2.0
+
+
+class IndiceAeroportos:
+    """
+    Índice espacial de aeroportos para enriquecer um snapshot inteiro de uma só vez, sem
+    requisições de rede: aeroporto mais próximo e destino provável de cada aeronave.
+    """
+
+    def __init__(self, aeroportos):
+        self.aeroportos = aeroportos
+        self.icao = np.array([a["icao"] for a in aeroportos])
+        self.lat = np.array([a["lat"] for a in aeroportos], dtype=np.float64)
+        self.lon = np.array([a["lon"] for a in aeroportos], dtype=np.float64)
+        self.vetores = vetores_unitarios(self.lat, self.lon)
+
+        # Índice do aeroporto mais próximo e uma grade para o alcance de descida
+        self._proximidade = IndiceProximidade(self.lat, self.lon)
+        self._grade_destino = GradeEsferica(self.lat, self.lon, CELULA_DESTINO_GRAUS)
+
+    def aeroportos_mais_proximos(self, lat, lon):
+        """
+        Calcula, de forma vetorizada, o aeroporto mais próximo de cada posição.
+
+        Retorna:
+        - tuple: Índices dos aeroportos (np.ndarray) e distâncias em km (np.ndarray).
+        """
+        return self._proximidade.mais_proximos(lat, lon)
+
+    def destinos_provaveis(self, lat, lon, altitude, direcao, razao_vertical):
+        """
+        Estima, de forma vetorizada, o destino de cada aeronave: o aeroporto mais próximo à frente
+        (dentro do cone em torno da direção) e ao alcance da descida a partir da altitude atual.
+        Só aeronaves abaixo da altitude de aproximação e que não estejam subindo são consideradas.
+
+        Retorna:
+        - np.ndarray: Índice do aeroporto de destino de cada aeronave, ou -1 se não estimado.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        altitude = np.asarray(altitude, dtype=np.float64)
+        direcao = np.asarray(direcao, dtype=np.float64)
+        razao_vertical = np.nan_to_num(np.asarray(razao_vertical, dtype=np.float64), nan=0.0)
+        destinos = np.full(len(lat), -1, dtype=np.int64)
+
+        elegiveis = np.flatnonzero(
+            (altitude < ALTITUDE_MAXIMA_APROXIMACAO)
+            & (razao_vertical <= RAZAO_SUBIDA_MAXIMA_APROXIMACAO)
+            & ~np.isnan(direcao)
+        )
+        if len(elegiveis) == 0:
+            return destinos
+
+        alcance = np.maximum(
+            altitude[elegiveis] * METROS_PARA_PES / 1000.0 * MILHAS_POR_MIL_PES * MILHA_NAUTICA_EM_KM * MARGEM_ALCANCE_DESCIDA,
+            ALCANCE_MINIMO_DESCIDA_KM,
+        )
+
+        aeronaves, candidatos = self._aeroportos_ao_alcance(lat[elegiveis], lon[elegiveis], alcance)
+        if len(aeronaves) == 0:
+            return destinos
+
+        # Descarta primeiro, pelo produto escalar, os aeroportos fora do alcance
+        vetores = vetores_unitarios(lat[elegiveis], lon[elegiveis])
+        distancia = similaridade_para_km(np.einsum("ij,ij->i", vetores[aeronaves], self.vetores[candidatos]))
+        no_alcance = np.flatnonzero(distancia <= alcance[aeronaves])
+        aeronaves, candidatos, distancia = aeronaves[no_alcance], candidatos[no_alcance], distancia[no_alcance]
+
+        # Rumo da aeronave até o aeroporto e diferença angular para a direção atual
+        lat1, lon1 = np.radians(lat[elegiveis][aeronaves]), np.radians(lon[elegiveis][aeronaves])
+        lat2, lon2 = np.radians(self.lat[candidatos]), np.radians(self.lon[candidatos])
+        rumo = np.degrees(np.arctan2(
+            np.sin(lon2 - lon1) * np.cos(lat2),
+            np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lon2 - lon1),
+        ))
+        desvio = np.abs((rumo - direcao[elegiveis][aeronaves] + 180.0) % 360.0 - 180.0)
+
+        validos = np.flatnonzero(desvio <= CONE_DESTINO_GRAUS)
+        if len(validos) == 0:
+            return destinos
+
+        # Entre os aeroportos válidos, fica o mais próximo de cada aeronave
+        melhor = validos[melhor_por_grupo(aeronaves[validos], -distancia[validos])]
+        destinos[elegiveis[aeronaves[melhor]]] = candidatos[melhor]
+        return destinos
+
+    def _aeroportos_ao_alcance(self, lat, lon, alcance):
+        """
+        Retorna os pares (aeronave, aeroporto) das células da grade que podem estar ao alcance de cada aeronave.
+
+        O número de células vizinhas consultadas cresce com o alcance e, em longitude, com a
+        latitude: as células ficam mais estreitas em direção aos polos (a largura usada é a da
+        latitude mais próxima do polo dentro do alcance, com uma célula de folga). As aeronaves com
+        o mesmo número de células são consultadas juntas.
+        """
+        anel_linhas = np.ceil(alcance / (CELULA_DESTINO_GRAUS * KM_POR_GRAU)).astype(np.int64)
+        latitude_extrema = np.minimum(np.abs(lat) + alcance / KM_POR_GRAU + CELULA_DESTINO_GRAUS, 90.0)
+        largura_celula = CELULA_DESTINO_GRAUS * KM_POR_GRAU * np.cos(np.radians(latitude_extrema))
+        maximo_colunas = self._grade_destino.colunas // 2
+        with np.errstate(divide="ignore"):
+            anel_colunas = np.where(
+                largura_celula > 0, np.ceil(alcance / np.maximum(largura_celula, 1e-9)), maximo_colunas
+            )
+        anel_colunas = np.minimum(anel_colunas, maximo_colunas).astype(np.int64)
+
+        aneis, grupos = np.unique(np.stack([anel_linhas, anel_colunas], axis=1), axis=0, return_inverse=True)
+        grupos = grupos.reshape(-1)
+        aeronaves, candidatos = [], []
+        for numero, (anel, anel_coluna) in enumerate(aneis):
+            membros = np.flatnonzero(grupos == numero)
+            origens, pontos = self._grade_destino.pares_vizinhos(lat[membros], lon[membros], anel=int(anel), anel_colunas=int(anel_coluna))
+            aeronaves.append(membros[origens])
+            candidatos.append(pontos)
+        return np.concatenate(aeronaves), np.concatenate(candidatos)
+
+    def enriquecer_snapshot(self, estados):
+        """
+        Calcula o aeroporto mais próximo e o destino provável de todas as aeronaves de um snapshot.
+
+        Parâmetros:
+        - estados (list): Estados de voo no formato da OpenSky API.
+
+        Retorna:
+        - dict: icao24 -> {"aeroporto_proximo": ICAO, "distancia_km": float, "destino": ICAO ou None}.
+        """
+        com_posicao = [voo for voo in estados if len(voo) > 11 and voo[5] is not None and voo[6] is not None and not voo[8]]
+        if not com_posicao:
+            return {}
+
+        colunas = np.array(
+            [(voo[6], voo[5], _ou_nan(voo[7]), _ou_nan(voo[10]), _ou_nan(voo[11])) for voo in com_posicao],
+            dtype=np.float64,
+        )
+        lat, lon, altitude, direcao, razao_vertical = colunas.T
+
+        proximos, distancias = self.aeroportos_mais_proximos(lat, lon)
+        destinos = self.destinos_provaveis(lat, lon, altitude, direcao, razao_vertical)
+
+        resultado = {}
+        for i, voo in enumerate(com_posicao):
+            resultado[voo[0]] = {
+                "aeroporto_proximo": str(self.icao[proximos[i]]),
+                "distancia_km": float(distancias[i]),
+                "destino": str(self.icao[destinos[i]]) if destinos[i] >= 0 else None,
+            }
+        return resultado
+
+
+def _ou_nan(valor):
+    return np.nan if valor is None else valor
+
+
+_indice = None
+_lock_indice = threading.Lock()
+
+def obter_indice_aeroportos():
+    """
+    Retorna o índice de aeroportos compartilhado, construído na primeira chamada.
+    """
+    global _indice
+    if _indice is None:
+        with _lock_indice:
+            if _indice is None:
+                _indice = IndiceAeroportos(obter_geocodificador().aeroportos)
+    return _indice
+
+
+def estimar_destinos(estados):
+    """
+    Estima o destino provável de cada aeronave de um snapshot, sem requisições de rede.
+
+    Retorna:
+    - dict: Destino estimado (código ICAO do aeroporto) indexado pelo icao24, apenas para as
+      aeronaves cujo destino pôde ser estimado.
+    """
+    enriquecidos = obter_indice_aeroportos().enriquecer_snapshot(estados)
+    return {icao24: dados["destino"] for icao24, dados in enriquecidos.items() if dados["destino"]}
@@ -0,0 +1,241 @@
+from datetime import datetime, timedelta, timezone
+from registro import contexto_requisicao
+import threading
+import requests
+import logging
+import time
+import os
+
+# Custo em créditos de cada tipo de requisição à OpenSky API.
+# As buscas de estados por área custam de 1 a 4 créditos, conforme o tamanho da área (em graus²).
+CUSTO_ESTADOS_POR_AREA = [(25, 1), (100, 2), (400, 3)]
+CUSTO_ESTADOS_GLOBAL = 4
+CUSTO_HISTORICO = int(os.getenv("OPENSKY_CUSTO_HISTORICO", 4))
+CUSTO_TRAJETORIA = int(os.getenv("OPENSKY_CUSTO_TRAJETORIA", 4))
+
+# Cota diária de créditos (usuários autenticados) e resolução temporal dos dados, em segundos
+OPENSKY_CREDITOS_DIARIOS = int(os.getenv("OPENSKY_CREDITOS_DIARIOS", 4000))
+OPENSKY_RESOLUCAO = float(os.getenv("OPENSKY_RESOLUCAO", 5))
+
+# Número máximo de requisições simultâneas à OpenSky API
+OPENSKY_MAX_CONCORRENCIA = int(os.getenv("OPENSKY_MAX_CONCORRENCIA", 2))
+
+
+class CotaEsgotadaError(requests.exceptions.RequestException):
+    """
+    Erro levantado quando a OpenSky API pediu para aguardar (HTTP 429) e o prazo ainda não acabou.
+    """
+
+
+class _RequisicaoEmAndamento:
+    """
+    Requisição em curso, compartilhada por todos que pedirem a mesma URL enquanto ela não termina.
+    """
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resposta = None
+        self.erro = None
+
+
+class AgendadorOpenSky:
+    """
+    Agendador central das requisições à OpenSky API.
+
+    Todas as funcionalidades (menus e tarefas em segundo plano) passam por ele, que:
+    - envia as credenciais, para usar os limites de usuário autenticado;
+    - agrupa pedidos idênticos em andamento e reaproveita respostas mais novas que a resolução da API;
+    - limita as requisições simultâneas;
+    - acompanha os créditos restantes pelos cabeçalhos X-Rate-Limit-* e respeita os pedidos de espera (429);
+    - recomenda o intervalo de atualização que mantém o consumo dentro da cota diária.
+    """
+
+    def __init__(self, auth=None, creditos_diarios=OPENSKY_CREDITOS_DIARIOS, resolucao=OPENSKY_RESOLUCAO,
+                 max_concorrencia=OPENSKY_MAX_CONCORRENCIA):
+        self.auth = auth
+        self.creditos_diarios = creditos_diarios
+        self.resolucao = resolucao
+        self.sessao = requests.Session()
+        self._semaforo = threading.BoundedSemaphore(max(1, max_concorrencia))
+        self._lock = threading.Lock()
+        self._em_andamento = {}
+        self._recentes = {}
+        self._bloqueado_ate = 0.0
+        self._creditos_restantes = None
+        self._creditos_usados = {}
+
+    def requisitar(self, url, params=None, tipo="estados", timeout=30):
+        """
+        Faz uma requisição GET à OpenSky API passando pelo agendador.
+
+        Parâmetros:
+        - url (str): URL completa do endpoint.
+        - params (dict, opcional): Parâmetros da query string.
+        - tipo (str): Tipo da requisição ("estados", "historico" ou "trajetoria"), usado no cálculo de créditos.
+        - timeout (int): Timeout da requisição, em segundos.
+
+        Retorna:
+        - requests.Response: A resposta da API (a mesma instância pode ser compartilhada entre chamadas agrupadas).
+
+        Exceções:
+        - CotaEsgotadaError: Se a API pediu para aguardar e o prazo ainda não terminou.
+        - requests.exceptions.RequestException: Em caso de erro de rede.
+        """
+        chave = (url, tuple(sorted((params or {}).items())))
+        agora = time.time()
+
+        with self._lock:
+            recente = self._recentes.get(chave)
+            if recente and agora - recente[0] < self.resolucao:
+                return recente[1]
+
+            if self._bloqueado_ate > agora:
+                raise CotaEsgotadaError(
+                    f"Limite de requisições da OpenSky atingido. Tente novamente em {int(self._bloqueado_ate - agora)} s."
+                )
+
+            andamento = self._em_andamento.get(chave)
+            responsavel = andamento is None
+            if responsavel:
+                andamento = _RequisicaoEmAndamento()
+                self._em_andamento[chave] = andamento
+
+        # Outra thread já está buscando a mesma URL: aguarda o resultado dela
+        if not responsavel:
+            andamento.evento.wait()
+            if andamento.erro is not None:
+                raise andamento.erro
+            return andamento.resposta
+
+        inicio = time.perf_counter()
+        try:
+            with self._semaforo:
+                resposta = self.sessao.get(url, params=params, auth=self.auth, timeout=timeout)
+            self._registrar_resposta(chave, tipo, params, resposta)
+            # Cada requisição real (as reaproveitadas não) fica no log a partir do nível INFO
+            logging.log(
+                logging.INFO if resposta.ok else logging.WARNING, "Requisição à OpenSky API",
+                extra=contexto_requisicao(url, resposta, tipo=tipo),
+            )
+            andamento.resposta = resposta
+            return resposta
+        except Exception as e:
+            logging.warning(
+                f"Falha na requisição à OpenSky API: {e}",
+                extra=contexto_requisicao(url, erro=e, tipo=tipo, latencia_ms=round((time.perf_counter() - inicio) * 1000, 1)),
+            )
+            andamento.erro = e
+            raise
+        finally:
+            with self._lock:
+                del self._em_andamento[chave]
+            andamento.evento.set()
+
+    def _registrar_resposta(self, chave, tipo, params, resposta):
+        """
+        Atualiza os créditos, o bloqueio por 429 e o cache de respostas recentes.
+        """
+        agora = time.time()
+        with self._lock:
+            if resposta.status_code == 429:
+                espera = _ler_cabecalho_numerico(resposta, "X-Rate-Limit-Retry-After-Seconds")
+                if espera is None:
+                    espera = _ler_cabecalho_numerico(resposta, "Retry-After") or 60
+                self._bloqueado_ate = agora + espera
+                self._creditos_restantes = 0
+                return
+
+            custo = custo_requisicao(tipo, params)
+            self._creditos_usados[tipo] = self._creditos_usados.get(tipo, 0) + custo
+
+            restantes = _ler_cabecalho_numerico(resposta, "X-Rate-Limit-Remaining")
+            if restantes is not None:
+                self._creditos_restantes = restantes
+            elif self._creditos_restantes is not None:
+                self._creditos_restantes = max(0, self._creditos_restantes - custo)
+
+            if resposta.ok:
+                # Descarta respostas antigas antes de guardar a nova
+                for antiga in [c for c, (instante, _) in self._recentes.items() if agora - instante >= self.resolucao]:
+                    del self._recentes[antiga]
+                self._recentes[chave] = (agora, resposta)
+
+    def creditos_restantes(self):
+        """
+        Retorna os créditos restantes informados pela API (ou estimados), ou None se ainda não conhecidos.
+        """
+        with self._lock:
+            return self._creditos_restantes
+
+    def creditos_usados(self):
+        """
+        Retorna os créditos consumidos nesta execução, por tipo de requisição.
+        """
+        with self._lock:
+            return dict(self._creditos_usados)
+
+    def intervalo_recomendado(self, tipo="estados", params=None, minimo=None):
+        """
+        Calcula o intervalo de atualização que distribui os créditos restantes até a renovação da cota.
+
+        Parâmetros:
+        - tipo (str): Tipo da requisição que será repetida.
+        - params (dict, opcional): Parâmetros da requisição (a área da busca altera o custo).
+        - minimo (float, opcional): Intervalo mínimo desejado; o padrão é a resolução da API.
+
+        Retorna:
+        - float: Intervalo recomendado, em segundos.
+        """
+        minimo = self.resolucao if minimo is None else max(minimo, self.resolucao)
+        agora = time.time()
+
+        with self._lock:
+            if self._bloqueado_ate > agora:
+                return max(minimo, self._bloqueado_ate - agora)
+            restantes = self._creditos_restantes
+
+        if restantes is None:
+            restantes = self.creditos_diarios
+
+        if restantes <= 0:
+            return max(minimo, _segundos_ate_renovacao())
+
+        custo = custo_requisicao(tipo, params)
+        return max(minimo, _segundos_ate_renovacao() * custo / restantes)
+
+
+def custo_requisicao(tipo, params=None):
+    """
+    Retorna o custo em créditos de uma requisição à OpenSky API.
+    """
+    if tipo == "historico":
+        return CUSTO_HISTORICO
+    if tipo == "trajetoria":
+        return CUSTO_TRAJETORIA
+
+    params = params or {}
+    if {"lamin", "lomin", "lamax", "lomax"} <= params.keys():
+        area = abs(float(params["lamax"]) - float(params["lamin"])) * abs(float(params["lomax"]) - float(params["lomin"]))
+        for limite, custo in CUSTO_ESTADOS_POR_AREA:
+            if area <= limite:
+                return custo
+    return CUSTO_ESTADOS_GLOBAL
+
+
+def _ler_cabecalho_numerico(resposta, nome):
+    """
+    Lê um cabeçalho numérico da resposta, retornando None se ausente ou inválido.
+    """
+    try:
+        return float(resposta.headers[nome])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _segundos_ate_renovacao():
+    """
+    Retorna quantos segundos faltam para a renovação diária da cota (meia-noite UTC).
+    """
+    agora = datetime.now(timezone.utc)
+    amanha = (agora + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (amanha - agora).total_seconds()
@@ -0,0 +1,255 @@
+from rich.console import Console
+from rich.table import Table
+from snapshot import gerenciador_snapshot
+from datetime import datetime
+from collections import deque
+import threading
+import heapq
+import time
+import os
+
+# Inicializa o console do rich
+console = Console()
+
+# Códigos transponder de emergência
+SQUAWKS_EMERGENCIA = {
+    "7500": "Interferência ilícita (sequestro)",
+    "7600": "Falha de comunicação",
+    "7700": "Emergência geral",
+}
+
+# Razão de descida (m/s) a partir da qual a descida é considerada anormal (25 m/s ≈ 4900 ft/min)
+ANOMALIA_RAZAO_DESCIDA = float(os.getenv("ANOMALIA_RAZAO_DESCIDA", 25))
+
+# Variações entre duas posições consecutivas consideradas saltos: precisam passar da taxa
+# (por segundo) e também do valor absoluto, para não sinalizar ruído em intervalos curtos
+ANOMALIA_SALTO_ALTITUDE = float(os.getenv("ANOMALIA_SALTO_ALTITUDE", 100))
+SALTO_ALTITUDE_MINIMO_M = 300.0
+ANOMALIA_SALTO_VELOCIDADE = float(os.getenv("ANOMALIA_SALTO_VELOCIDADE", 20))
+SALTO_VELOCIDADE_MINIMO_M_S = 50.0
+
+# Tempo sem contato (s) após o qual uma aeronave em voo é considerada perdida
+ANOMALIA_PERDA_CONTATO = float(os.getenv("ANOMALIA_PERDA_CONTATO", 120))
+
+# Um intervalo entre snapshots maior que este múltiplo do intervalo típico (ex: atualizações pausadas
+# com o menu ocioso) descarta o histórico, que não serve mais de referência
+FATOR_INTERVALO_REINICIO = 3.0
+
+# Por quanto tempo (s) depois do último contato uma aeronave dada como sem contato é lembrada: a
+# OpenSky continua listando o estado antigo por alguns minutos, e ele não deve gerar um novo evento
+RETENCAO_SEM_CONTATO = 3600.0
+
+# Abaixo desta altitude (m) o sumiço costuma ser só a perda de cobertura no pouso
+ALTITUDE_MINIMA_PERDA_CONTATO = 600.0
+
+# Número máximo de eventos guardados para exibição
+LIMITE_EVENTOS = 500
+
+
+class _EstadoAeronave:
+    """
+    Estado mínimo guardado de cada aeronave entre um snapshot e o próximo.
+    """
+
+    __slots__ = ("ultimo_contato", "horario_posicao", "altitude", "velocidade", "squawk", "em_solo",
+                 "descida_anormal", "callsign")
+
+    def __init__(self):
+        self.ultimo_contato = None
+        self.horario_posicao = None
+        self.altitude = None
+        self.velocidade = None
+        self.squawk = None
+        self.em_solo = None
+        self.descida_anormal = False
+        self.callsign = None
+
+
+class DetectorAnomalias:
+    """
+    Detector incremental de anomalias sobre a sequência de snapshots de estados.
+
+    Guarda um estado pequeno por aeronave. Cada snapshot é percorrido uma vez, mas as aeronaves
+    sem contato novo (mesmo last_contact) custam só uma consulta ao dicionário: as regras são
+    avaliadas apenas para as que mudaram. As aeronaves sem contato são encontradas por uma fila
+    de prioridade ordenada pelo prazo de perda de contato, sem percorrer todas a cada vez.
+
+    Eventos gerados (uma vez por ocorrência, e não a cada snapshot):
+    - "squawk": código transponder de emergência (7500, 7600 ou 7700);
+    - "descida": razão de descida acima do limite;
+    - "salto_altitude" e "salto_velocidade": variação brusca entre duas posições consecutivas;
+    - "perda_contato": aeronave em voo sem contato há mais que o limite.
+    """
+
+    def __init__(self, limite_eventos=LIMITE_EVENTOS):
+        self._aeronaves = {}
+        self._prazos = []
+        # Aeronaves removidas por falta de contato: icao24 -> last_contact na remoção
+        self._sem_contato = {}
+        self._ultimo_horario = None
+        self._intervalo_tipico = None
+        self._lock = threading.Lock()
+        self._eventos = deque(maxlen=limite_eventos)
+
+    def processar(self, estados):
+        """
+        Processa um novo snapshot e retorna os eventos gerados por ele.
+
+        Parâmetros:
+        - estados (list): Estados de voo no formato da OpenSky API (de preferência um Snapshot,
+          cujo horário do servidor, na mesma base que last_contact, é usado como referência; sem
+          ele, o horário da busca ou o atual).
+
+        Retorna:
+        - list: Eventos (dicts com as chaves "tipo", "icao24", "callsign", "descricao" e "horario").
+        """
+        agora = getattr(estados, "tempo_servidor", None) or getattr(estados, "horario", None) or time.time()
+        eventos = []
+
+        with self._lock:
+            # Depois de um intervalo muito maior que o típico entre snapshots (ex: atualizações pausadas),
+            # o histórico não serve mais de referência e é descartado. O limite acompanha o intervalo
+            # real das atualizações, que cresce quando os créditos da OpenSky estão no fim
+            if self._ultimo_horario is not None:
+                intervalo = agora - self._ultimo_horario
+                if self._intervalo_tipico is None:
+                    self._intervalo_tipico = intervalo
+                elif intervalo > max(ANOMALIA_PERDA_CONTATO, FATOR_INTERVALO_REINICIO * self._intervalo_tipico):
+                    self._aeronaves.clear()
+                    self._prazos.clear()
+                else:
+                    self._intervalo_tipico = 0.8 * self._intervalo_tipico + 0.2 * intervalo
+            self._ultimo_horario = agora
+
+            for voo in estados:
+                if len(voo) < 15 or not voo[0]:
+                    continue
+                estado = self._aeronaves.get(voo[0])
+                if estado is None:
+                    # O estado antigo de uma aeronave já dada como sem contato só volta com um contato novo
+                    removida = self._sem_contato.get(voo[0])
+                    if removida is not None:
+                        if voo[4] is None or voo[4] <= removida:
+                            continue
+                        del self._sem_contato[voo[0]]
+                    estado = self._aeronaves[voo[0]] = _EstadoAeronave()
+                elif estado.ultimo_contato == voo[4]:
+                    # Nenhum dado novo desde o último snapshot
+                    continue
+                self._avaliar(voo, estado, eventos, agora)
+
+            self._verificar_perda_contato(agora, eventos)
+            self._sem_contato = {
+                icao24: contato for icao24, contato in self._sem_contato.items() if contato > agora - RETENCAO_SEM_CONTATO
+            }
+            self._eventos.extend(eventos)
+
+        return eventos
+
+    def _avaliar(self, voo, estado, eventos, agora):
+        callsign = (voo[1] or "").strip() or None
+        altitude, em_solo, velocidade, razao_vertical, squawk = voo[7], voo[8], voo[9], voo[11], voo[14]
+
+        if squawk in SQUAWKS_EMERGENCIA and squawk != estado.squawk:
+            self._registrar(eventos, "squawk", voo, f"Squawk {squawk}: {SQUAWKS_EMERGENCIA[squawk]}", agora)
+
+        descida_anormal = bool(not em_solo and razao_vertical is not None and razao_vertical <= -ANOMALIA_RAZAO_DESCIDA)
+        if descida_anormal and not estado.descida_anormal:
+            self._registrar(eventos, "descida", voo, f"Descida de {-razao_vertical:.0f} m/s ({-razao_vertical * 196.85:.0f} ft/min)", agora)
+
+        intervalo = None
+        if voo[3] is not None and estado.horario_posicao is not None:
+            intervalo = voo[3] - estado.horario_posicao
+        if intervalo and intervalo > 0:
+            if altitude is not None and estado.altitude is not None:
+                variacao = altitude - estado.altitude
+                if abs(variacao) >= SALTO_ALTITUDE_MINIMO_M and abs(variacao) / intervalo > ANOMALIA_SALTO_ALTITUDE:
+                    self._registrar(eventos, "salto_altitude", voo, f"Altitude variou {variacao:+.0f} m em {intervalo:.0f} s", agora)
+            if velocidade is not None and estado.velocidade is not None:
+                variacao = velocidade - estado.velocidade
+                if abs(variacao) >= SALTO_VELOCIDADE_MINIMO_M_S and abs(variacao) / intervalo > ANOMALIA_SALTO_VELOCIDADE:
+                    self._registrar(eventos, "salto_velocidade", voo, f"Velocidade variou {variacao:+.0f} m/s em {intervalo:.0f} s", agora)
+
+        estado.ultimo_contato = voo[4]
+        if voo[3] is not None:
+            estado.horario_posicao = voo[3]
+            estado.altitude = altitude
+            estado.velocidade = velocidade
+        estado.squawk = squawk
+        estado.em_solo = em_solo
+        estado.descida_anormal = descida_anormal
+        estado.callsign = callsign
+
+        if voo[4] is not None:
+            heapq.heappush(self._prazos, (voo[4] + ANOMALIA_PERDA_CONTATO, voo[0]))
+
+    def _verificar_perda_contato(self, agora, eventos):
+        while self._prazos and self._prazos[0][0] < agora:
+            prazo, icao24 = heapq.heappop(self._prazos)
+            estado = self._aeronaves.get(icao24)
+            # Entradas antigas da fila (a aeronave teve contato depois) são apenas descartadas
+            if estado is None or estado.ultimo_contato is None or estado.ultimo_contato + ANOMALIA_PERDA_CONTATO != prazo:
+                continue
+
+            del self._aeronaves[icao24]
+            self._sem_contato[icao24] = estado.ultimo_contato
+            if not estado.em_solo and estado.altitude is not None and estado.altitude >= ALTITUDE_MINIMA_PERDA_CONTATO:
+                eventos.append({
+                    "tipo": "perda_contato",
+                    "icao24": icao24,
+                    "callsign": estado.callsign,
+                    "descricao": f"Sem contato há {agora - estado.ultimo_contato:.0f} s, a {estado.altitude:.0f} m",
+                    "horario": agora,
+                })
+
+    def _registrar(self, eventos, tipo, voo, descricao, agora):
+        eventos.append({
+            "tipo": tipo,
+            "icao24": voo[0],
+            "callsign": (voo[1] or "").strip() or None,
+            "descricao": descricao,
+            "horario": agora,
+        })
+
+    def obter_eventos(self, desde=None):
+        """
+        Retorna os eventos guardados, opcionalmente apenas os gerados depois do horário informado.
+        """
+        with self._lock:
+            return [evento for evento in self._eventos if desde is None or evento["horario"] > desde]
+
+    def aeronaves_acompanhadas(self):
+        with self._lock:
+            return len(self._aeronaves)
+
+
+# Detector compartilhado, alimentado por cada novo snapshot obtido da API
+detector_anomalias = DetectorAnomalias()
+
+def iniciar_deteccao_anomalias():
+    """
+    Passa a processar, em segundo plano, cada novo snapshot obtido pelo gerenciador de snapshots.
+    """
+    gerenciador_snapshot.adicionar_ouvinte(detector_anomalias.processar)
+
+def exibir_eventos_anomalias(eventos):
+    """
+    Exibe os eventos de anomalia numa tabela usando rich.
+    """
+    if not eventos:
+        return
+
+    table = Table(title="🚨 Anomalias Detectadas", show_header=True, header_style="bold magenta")
+    table.add_column("Horário", style="cyan")
+    table.add_column("Código de Voo", style="green")
+    table.add_column("ICAO24", style="blue")
+    table.add_column("Anomalia", style="red")
+
+    for evento in eventos:
+        table.add_row(
+            datetime.fromtimestamp(evento["horario"]).strftime("%H:%M:%S"),
+            evento["callsign"] or "N/A",
+            evento["icao24"],
+            evento["descricao"],
+        )
+    console.print(table)
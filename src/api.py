@@ -8,23 +8,19 @@ from pathlib import Path
 import time
 import folium
 from folium import plugins
-from geopy.geocoders import Nominatim
+from geocodificador import buscar_coordenadas
 import webbrowser
 import geocoder
+from concurrent.futures import ThreadPoolExecutor
+from agendador import AgendadorOpenSky, OPENSKY_MAX_CONCORRENCIA
+from exportacao import exportador
+from registro import configurar_registro, contexto_requisicao
 
 # Inicializa o console do rich
 console = Console()
 
-# Caminho absoluto para o diretório de logs
-log_dir = os.path.join(os.path.dirname(__file__), "../logs")
-os.makedirs(log_dir, exist_ok=True)  # Garante que o diretório logs exista
-
-# Configura o logging com o caminho absoluto
-logging.basicConfig(
-    filename=os.path.join(log_dir, "erros.log"),
-    level=logging.ERROR,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+# Configura o logging (JSON, gravado em segundo plano com rotação)
+configurar_registro()
 
 # Caminho para o arquivo .env na raiz do projeto
 env_path = Path(__file__).resolve().parent.parent / '.env'
@@ -43,6 +39,7 @@ except Exception as e:
 # Configurações da OpenSky API
 OPENSKY_HISTORICAL_URL = os.getenv("OPENSKY_HISTORICAL_URL", "https://opensky-network.org/api/flights/{type}?begin={start}&end={end}")
 OPENSKY_API_URL = os.getenv("OPENSKY_API_URL", "https://opensky-network.org/api/states/all")
+OPENSKY_TRACKS_URL = os.getenv("OPENSKY_TRACKS_URL", "https://opensky-network.org/api/tracks/all")
 OPENSKY_USERNAME = os.getenv("OPENSKY_USERNAME")
 OPENSKY_PASSWORD = os.getenv("OPENSKY_PASSWORD")
 
@@ -61,6 +58,12 @@ if not ADSBEXCHANGE_API_KEY:
 
 console.log("[bold green]Credenciais carregadas com sucesso.[/bold green]")
 
+# Número máximo de buscas de cada janela de 2 horas nos períodos longos de voos históricos
+HISTORICO_TENTATIVAS_JANELA = int(os.getenv("HISTORICO_TENTATIVAS_JANELA", 2))
+
+# Agendador compartilhado por todas as requisições à OpenSky API (autenticadas)
+agendador = AgendadorOpenSky(auth=(OPENSKY_USERNAME, OPENSKY_PASSWORD))
+
 def buscar_voos_historicos(tipo, inicio_timestamp, fim_timestamp):
     """
     Busca voos históricos (chegadas ou partidas) dentro de um intervalo de tempo.
@@ -75,7 +78,7 @@ def buscar_voos_historicos(tipo, inicio_timestamp, fim_timestamp):
     """
     try:
         url = OPENSKY_HISTORICAL_URL.format(type=tipo, start=inicio_timestamp, end=fim_timestamp)
-        response = requests.get(url, auth=(OPENSKY_USERNAME, OPENSKY_PASSWORD), timeout=10)
+        response = agendador.requisitar(url, tipo="historico", timeout=10)
         
         if response.status_code == 400:
             console.print("[red]⚠️ Erro 400: Verifique o intervalo de tempo. ⚠️[/red]")
@@ -90,30 +93,151 @@ def buscar_voos_historicos(tipo, inicio_timestamp, fim_timestamp):
         return data
     except requests.exceptions.RequestException as e:
         console.print(f"[red]⚠️ Erro ao buscar voos históricos: {e} ⚠️[/red]")
-        logging.error(f"Erro ao buscar voos históricos: {e}")
+        logging.error(f"Erro ao buscar voos históricos: {e}", extra=contexto_requisicao(url, erro=e, tipo="historico"))
         return None
 
-def buscar_estados_opensky(timeout=30):
+class VoosPeriodo(list):
+    """
+    Lista de voos históricos de um período, com o número de janelas buscadas e as que não
+    puderam ser buscadas (tuplas (início, fim), em timestamps): se houver alguma, os voos estão incompletos.
+    """
+
+    def __init__(self, voos, total_janelas, janelas_com_falha):
+        super().__init__(voos)
+        self.total_janelas = total_janelas
+        self.janelas_com_falha = janelas_com_falha
+
+def buscar_voos_historicos_periodo(tipo, inicio_timestamp, fim_timestamp, janela=7200, tentativas=HISTORICO_TENTATIVAS_JANELA):
+    """
+    Busca voos históricos em um período longo (vários dias), dividindo-o em janelas de até 2 horas,
+    o maior intervalo aceito pela OpenSky API. As janelas são buscadas em paralelo pelo agendador,
+    e as que falharem são buscadas de novo, até o número de tentativas.
+
+    Args:
+        tipo (str): Tipo de voo ("arrival", "departure" ou "all").
+        inicio_timestamp (int): Timestamp de início do período.
+        fim_timestamp (int): Timestamp de fim do período.
+        janela (int): Duração de cada janela em segundos.
+        tentativas (int): Número máximo de buscas de cada janela.
+
+    Returns:
+        VoosPeriodo: Voos históricos do período, sem repetições, com as janelas que falharam em
+            todas as tentativas em `janelas_com_falha` (o chamador deve avisar que estão incompletos).
+    """
+    pendentes = [(inicio, min(inicio + janela, fim_timestamp)) for inicio in range(inicio_timestamp, fim_timestamp, janela)]
+    total_janelas = len(pendentes)
+
+    # Um voo pode aparecer em duas janelas vizinhas; (icao24, firstSeen) identifica o voo
+    voos = {}
+    with ThreadPoolExecutor(max_workers=OPENSKY_MAX_CONCORRENCIA) as executor:
+        for _ in range(max(1, tentativas)):
+            if not pendentes:
+                break
+            resultados = executor.map(lambda j: buscar_voos_historicos(tipo, j[0], j[1]), pendentes)
+            falhas = []
+            for janela_buscada, resultado in zip(pendentes, resultados):
+                if resultado is None:
+                    falhas.append(janela_buscada)
+                    continue
+                for voo in resultado:
+                    voos.setdefault((voo.get("icao24"), voo.get("firstSeen")), voo)
+            pendentes = falhas
+
+    if pendentes:
+        logging.warning(f"{len(pendentes)} de {total_janelas} janelas de voos históricos falharam em todas as tentativas.")
+    return VoosPeriodo(voos.values(), total_janelas, pendentes)
+
+def descrever_janelas_com_falha(voos, limite=3):
+    """
+    Descreve as janelas que falharam numa busca de voos históricos (ex: "01/10 10:00–12:00, ...").
+    """
+    janelas = getattr(voos, "janelas_com_falha", [])
+    descricoes = [
+        f"{datetime.fromtimestamp(inicio).strftime('%d/%m %H:%M')}–{datetime.fromtimestamp(fim).strftime('%H:%M')}"
+        for inicio, fim in janelas[:limite]
+    ]
+    if len(janelas) > limite:
+        descricoes.append(f"e mais {len(janelas) - limite}")
+    return ", ".join(descricoes)
+
+class EstadosOpenSky(list):
+    """
+    Lista de estados retornada pela OpenSky, com o horário do servidor (campo "time") a que se referem.
+    """
+
+    def __init__(self, estados, tempo):
+        super().__init__(estados)
+        self.tempo = tempo
+
+def buscar_estados_opensky(timeout=30, area=None, silencioso=False):
     """
     Busca os estados atuais dos voos usando a OpenSky API.
 
+    Args:
+        timeout (int): Timeout da requisição em segundos.
+        area (tuple, opcional): Limites (lat_min, lon_min, lat_max, lon_max) para buscar só uma área,
+            o que consome menos créditos que a busca global.
+        silencioso (bool): Se True, não escreve no console (buscas em segundo plano); erros continuam no log.
+
     Returns:
-        list: Lista de estados (voos) ou None em caso de erro.
+        EstadosOpenSky: Lista de estados (voos), com o horário do servidor em `tempo`, ou None em caso de erro.
     """
     try:
-        console.print("[yellow]Buscando dados da OpenSky API...[/yellow]")
-        response = requests.get(OPENSKY_API_URL, timeout=timeout)
+        if not silencioso:
+            console.print("[yellow]Buscando dados da OpenSky API...[/yellow]")
+        params = None
+        if area is not None:
+            params = dict(zip(("lamin", "lomin", "lamax", "lomax"), area))
+        response = agendador.requisitar(OPENSKY_API_URL, params=params, tipo="estados", timeout=timeout)
         response.raise_for_status()
         data = response.json()
 
         if not isinstance(data, dict) or "states" not in data:
-            console.print("[red]⚠️ Resposta da API inválida ou sem dados. ⚠️[/red]")
+            if not silencioso:
+                console.print("[red]⚠️ Resposta da API inválida ou sem dados. ⚠️[/red]")
             return None
 
-        return data.get("states", [])
+        estados = EstadosOpenSky(data.get("states") or [], data.get("time"))
+        # Só os snapshots globais são exportados (as buscas por área são recortes deles)
+        if area is None:
+            exportador.exportar_estados(estados, data.get("time"))
+        return estados
     except requests.exceptions.RequestException as e:
-        console.print(f"[red]Erro ao buscar dados da OpenSky API: {e}[/red]")
-        logging.error(f"Erro ao buscar dados da OpenSky API: {e}")
+        if not silencioso:
+            console.print(f"[red]Erro ao buscar dados da OpenSky API: {e}[/red]")
+        logging.error(f"Erro ao buscar dados da OpenSky API: {e}", extra=contexto_requisicao(OPENSKY_API_URL, erro=e, tipo="estados"))
+        return None
+
+def buscar_trajetoria(icao24, horario):
+    """
+    Busca a trajetória de um voo usando o endpoint /tracks da OpenSky API.
+
+    Args:
+        icao24 (str): Endereço ICAO24 da aeronave.
+        horario (int): Qualquer instante (timestamp) entre o início e o fim do voo (ex: o firstSeen).
+
+    Returns:
+        dict: Trajetória no formato da OpenSky ("path" com pontos [horário, lat, lon, altitude,
+            direção, em solo]); "path" vazio se a OpenSky não tiver a trajetória (404), ou None em caso
+            de erro, inclusive uma resposta fora do formato esperado.
+    """
+    try:
+        response = agendador.requisitar(
+            OPENSKY_TRACKS_URL, params={"icao24": icao24, "time": int(horario)}, tipo="trajetoria", timeout=15
+        )
+        if response.status_code == 404:
+            return {"icao24": icao24, "path": []}
+        response.raise_for_status()
+
+        data = response.json()
+        if not isinstance(data, dict) or not isinstance(data.get("path"), list):
+            # Uma resposta inválida é uma falha (não deve ser guardada como trajetória vazia)
+            logging.error(f"Resposta inválida ao buscar a trajetória de {icao24}.",
+                          extra=contexto_requisicao(OPENSKY_TRACKS_URL, tipo="trajetoria"))
+            return None
+        return data
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logging.error(f"Erro ao buscar a trajetória de {icao24}: {e}", extra=contexto_requisicao(OPENSKY_TRACKS_URL, erro=e, tipo="trajetoria"))
         return None
 
 def obter_destino_voo(codigo_icao):
@@ -140,7 +264,7 @@ def obter_destino_voo(codigo_icao):
             return "Desconhecido"
     except requests.exceptions.RequestException as e:
         console.print(f"[red]Erro ao buscar destino do voo: {e}[/red]")
-        logging.error(f"Erro ao buscar destino do voo: {e}")
+        logging.error(f"Erro ao buscar destino do voo: {e}", extra=contexto_requisicao(url, erro=e))
         return "Desconhecido"
 
 def monitorar_aeronaves_tempo_real(lat, lon, distancia=100, intervalo=10, max_iteracoes=10):
@@ -212,43 +336,67 @@ def buscar_aeronaves_proximas(lat, lon, distancia=100):
 
         aeronaves = dados.get("ac", [])
         aeronaves_validas = [a for a in aeronaves if a.get("lat", 0) != 0 and a.get("lon", 0) != 0]
+        exportador.exportar_aeronaves_proximas(aeronaves_validas, lat, lon, distancia)
         return aeronaves_validas
     except requests.exceptions.RequestException as e:
         console.print(f"[red]Erro ao buscar aeronaves próximas: {e}[/red]")
-        logging.error(f"Erro ao buscar aeronaves próximas: {e}")
+        logging.error(f"Erro ao buscar aeronaves próximas: {e}", extra=contexto_requisicao(url, erro=e))
+        return None
+
+def selecionar_localizacao():
+    """
+    Pergunta ao usuário se deseja usar a localização atual ou buscar por uma cidade.
+
+    Returns:
+        tuple: Latitude e longitude escolhidas, ou None se não for possível obter a localização.
+    """
+    console.print("[cyan]👉 Deseja usar sua localização atual ou buscar por uma cidade?[/cyan]")
+    console.print("[cyan]1. Usar localização atual[/cyan]")
+    console.print("[cyan]2. Buscar por uma cidade[/cyan]")
+    opcao = console.input("[cyan]👉 Escolha uma opção (1 ou 2): [/cyan]").strip()
+
+    if opcao == "1":
+        g = geocoder.ip('me')
+        if g.latlng:
+            lat, lon = g.latlng
+            console.print(f"[green]✅ Localização atual detectada: Latitude {lat}, Longitude {lon}[/green]")
+            return lat, lon
+        console.print("[red]⚠️ Não foi possível detectar a localização atual. ⚠️[/red]")
+        return None
+    elif opcao == "2":
+        cidade = console.input("[cyan]👉 Digite o nome da cidade: [/cyan]").strip()
+        resultado = buscar_coordenadas(cidade)
+        if resultado:
+            lat, lon, descricao = resultado
+            console.print(f"[green]✅ Cidade encontrada: {descricao}[/green]")
+            return lat, lon
+        console.print("[red]⚠️ Cidade não encontrada. ⚠️[/red]")
         return None
 
+    console.print("[red]⚠️ Opção inválida! ⚠️[/red]")
+    return None
+
+def abrir_no_navegador(endereco):
+    """
+    Tenta abrir um arquivo ou URL no navegador. Em máquinas sem navegador (headless), apenas
+    informa o endereço, em vez de falhar.
+    """
+    try:
+        if webbrowser.open(endereco):
+            return
+    except webbrowser.Error as e:
+        logging.error(f"Erro ao abrir o navegador: {e}")
+    console.print(f"[yellow]🌐 Abra no navegador: {endereco}[/yellow]")
+
 def exibir_aeronaves_no_mapa():
     """
     Exibe as aeronaves em um mapa interativo com base na localização atual ou em uma cidade.
     """
     try:
-        console.print("[cyan]👉 Deseja usar sua localização atual ou buscar por uma cidade?[/cyan]")
-        console.print("[cyan]1. Usar localização atual[/cyan]")
-        console.print("[cyan]2. Buscar por uma cidade[/cyan]")
-        opcao = console.input("[cyan]👉 Escolha uma opção (1 ou 2): [/cyan]").strip()
-
-        if opcao == "1":
-            g = geocoder.ip('me')
-            if g.latlng:
-                lat, lon = g.latlng
-                console.print(f"[green]✅ Localização atual detectada: Latitude {lat}, Longitude {lon}[/green]")
-            else:
-                console.print("[red]⚠️ Não foi possível detectar a localização atual. ⚠️[/red]")
-                return
-        elif opcao == "2":
-            cidade = console.input("[cyan]👉 Digite o nome da cidade: [/cyan]").strip()
-            geolocator = Nominatim(user_agent="aeronaves_map")
-            location = geolocator.geocode(cidade)
-            if location:
-                lat, lon = location.latitude, location.longitude
-                console.print(f"[green]✅ Cidade encontrada: {location.address}[/green]")
-            else:
-                console.print("[red]⚠️ Cidade não encontrada. ⚠️[/red]")
-                return
-        else:
-            console.print("[red]⚠️ Opção inválida! ⚠️[/red]")
+        localizacao = selecionar_localizacao()
+        if localizacao is None:
             return
+        lat, lon = localizacao
 
         aeronaves = buscar_aeronaves_proximas(lat, lon, 50)
         if aeronaves:
@@ -278,7 +426,7 @@ def exibir_aeronaves_no_mapa():
 
             mapa.save("../mapa_aeronaves.html")
             console.print("[green]✅ Mapa gerado com sucesso! Arquivo 'mapa_aeronaves.html' salvo.[/green]")
-            webbrowser.open("mapa_aeronaves.html")
+            abrir_no_navegador("mapa_aeronaves.html")
         else:
             console.print("[yellow]⚠️ Nenhuma aeronave encontrada para exibir no mapa. ⚠️[/yellow]")
     except Exception as e:
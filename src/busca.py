@@ -1,12 +1,154 @@
 from rich.console import Console
 from rich.prompt import Prompt
-from api import buscar_estados_opensky
+from rich.table import Table
+from snapshot import obter_estados
 from utils import exibir_lista_voos
+from geocodificador import normalizar_nome
+from collections import Counter
+import threading
 import re
 
 # Inicializa o console do rich
 console = Console()
 
+# Número máximo de sugestões exibidas quando não há correspondência exata
+LIMITE_SUGESTOES = 8
+
+# Similaridade mínima (0 a 1) para uma sugestão ser exibida
+SIMILARIDADE_MINIMA = 0.2
+
+# Campos indexados: posição no estado da OpenSky e nome exibido
+CAMPOS_BUSCA = ((1, "Código de voo"), (0, "ICAO24"), (2, "País de origem"))
+
+
+class IndiceTrigramas:
+    """
+    Índice de trigramas dos códigos de voo, endereços ICAO24 e países de origem de um snapshot.
+
+    Cada termo é dividido em sequências de 3 caracteres (com espaços nas pontas, para valorizar
+    o começo e o fim); a busca só percorre as listas dos trigramas da consulta e ordena os termos
+    pela similaridade (proporção de trigramas em comum), o que tolera erros de digitação sem
+    comparar a consulta com todos os voos.
+    """
+
+    def __init__(self, estados):
+        self.termos = []          # (texto exibido, campo, quantidade de trigramas)
+        self.voos = []            # voos de cada termo
+        self._postagens = {}      # trigrama -> índices dos termos
+        self._exatos = {}         # texto normalizado -> índice do termo, por campo
+
+        indices = {}
+        for voo in estados:
+            for posicao, campo in CAMPOS_BUSCA:
+                valor = voo[posicao] if len(voo) > posicao else None
+                chave = _normalizar(valor) if isinstance(valor, str) else ""
+                if not chave:
+                    continue
+                indice = indices.get((campo, chave))
+                if indice is None:
+                    indice = indices[(campo, chave)] = len(self.termos)
+                    trigramas = _trigramas(chave)
+                    self.termos.append((valor.strip(), campo, len(trigramas)))
+                    self.voos.append([])
+                    self._exatos.setdefault(chave, []).append(indice)
+                    for trigrama in trigramas:
+                        self._postagens.setdefault(trigrama, []).append(indice)
+                self.voos[indice].append(voo)
+
+    def exatos(self, consulta):
+        """
+        Retorna os voos cujo código de voo ou ICAO24 é igual à consulta (sem diferenciar
+        maiúsculas nem espaços nas pontas).
+        """
+        voos = []
+        for indice in self._exatos.get(_normalizar(consulta), []):
+            if self.termos[indice][1] != "País de origem":
+                voos.extend(self.voos[indice])
+        return voos
+
+    def buscar(self, consulta, limite=LIMITE_SUGESTOES, similaridade_minima=SIMILARIDADE_MINIMA):
+        """
+        Busca aproximada pelos termos mais parecidos com a consulta.
+
+        Retorna:
+        - list: Tuplas (texto, campo, similaridade, voos), da mais para a menos parecida.
+        """
+        trigramas = _trigramas(_normalizar(consulta))
+        if not trigramas:
+            return []
+
+        # Conta, para cada termo, quantos trigramas da consulta ele contém
+        comuns = Counter()
+        for trigrama in trigramas:
+            comuns.update(self._postagens.get(trigrama, ()))
+
+        resultados = []
+        for indice, quantidade in comuns.items():
+            texto, campo, total = self.termos[indice]
+            similaridade = quantidade / (len(trigramas) + total - quantidade)
+            if similaridade >= similaridade_minima:
+                resultados.append((similaridade, -len(self.voos[indice]), indice))
+
+        resultados.sort(reverse=True)
+        return [
+            (self.termos[indice][0], self.termos[indice][1], similaridade, self.voos[indice])
+            for similaridade, _, indice in resultados[:limite]
+        ]
+
+
+def _normalizar(texto):
+    # Atalho para o caso comum (códigos e nomes só com ASCII), bem mais barato que remover acentos
+    if texto.isascii():
+        return " ".join(texto.lower().split())
+    return normalizar_nome(texto)
+
+
+def _trigramas(texto):
+    if not texto:
+        return set()
+    completo = f"  {texto} "
+    return {completo[i:i + 3] for i in range(len(completo) - 2)}
+
+
+# Índice do último snapshot buscado, reaproveitado enquanto o snapshot não muda
+_indice_atual = (None, None)
+_lock_indice = threading.Lock()
+
+def obter_indice_busca(estados):
+    """
+    Retorna o índice de trigramas do snapshot, construindo-o apenas uma vez por snapshot.
+    """
+    global _indice_atual
+    chave = getattr(estados, "id", id(estados))
+    with _lock_indice:
+        if _indice_atual[0] != chave:
+            _indice_atual = (chave, IndiceTrigramas(estados))
+        return _indice_atual[1]
+
+
+def escolher_sugestao(sugestoes):
+    """
+    Exibe as sugestões da busca aproximada e pergunta qual delas exibir.
+
+    Retorna:
+    - list: Os voos da sugestão escolhida, ou None se o usuário não escolher nenhuma.
+    """
+    table = Table(title="🔎 Você quis dizer:", show_header=True, header_style="bold magenta")
+    table.add_column("Nº", style="cyan")
+    table.add_column("Sugestão", style="green")
+    table.add_column("Tipo", style="blue")
+    table.add_column("Voos", style="yellow")
+    table.add_column("Similaridade", style="purple")
+    for numero, (texto, campo, similaridade, voos) in enumerate(sugestoes, start=1):
+        table.add_row(str(numero), texto, campo, str(len(voos)), f"{similaridade:.0%}")
+    console.print(table)
+
+    opcoes = [str(numero) for numero in range(1, len(sugestoes) + 1)]
+    escolha = Prompt.ask("👉 Escolha uma sugestão (ou Enter para nenhuma)", default="").strip()
+    if escolha not in opcoes:
+        return None
+    return sugestoes[int(escolha) - 1][3]
+
 def buscar_voo_especifico():
     """
     Permite ao usuário buscar um voo específico pelo código ICAO.
@@ -16,9 +158,11 @@ def buscar_voo_especifico():
     o código ICAO seja inválido, o sistema fornecerá feedback adequado.
 
     Processos da função:
-    - Solicita ao usuário um código ICAO válido.
-    - Valida o código para garantir que ele contenha entre 4 e 7 caracteres alfanuméricos.
-    - Realiza uma busca utilizando a função 'buscar_estados_opensky()'.
+    - Solicita ao usuário um código de voo, um endereço ICAO24 ou um país de origem.
+    - Valida a entrada para garantir que ela contenha entre 2 e 40 letras, números ou espaços.
+    - Obtém os estados dos voos com a função 'obter_estados()' (último snapshot disponível).
+    - Procura uma correspondência exata no índice de trigramas do snapshot e, se não houver,
+      sugere os termos mais parecidos ("Você quis dizer"), sem buscar o snapshot de novo.
     - Exibe os detalhes do voo, se encontrado, ou uma mensagem informando que o voo não foi localizado.
     - Permite ao usuário realizar outra busca ou retornar ao menu principal.
 
@@ -30,37 +174,49 @@ def buscar_voo_especifico():
     
     Exemplo de uso:
     >>> buscar_voo_especifico()
-    Digite o código do voo (ICAO, ex: SWA3220): SWA3220
-    Detalhes do voo SWA3220:
-    [Detalhes do voo aqui]
-    🔁 Realizar outra busca? (s/n): n
+    👉 Digite o código do voo, o ICAO24 ou o país de origem (ex: SWA3220): S
+    ⚠️ Código inválido. Use entre 2 e 40 letras, números ou espaços.
+    👉 Digite o código do voo, o ICAO24 ou o país de origem (ex: SWA3220): swa3220
+    ✅ Detalhes do voo SWA3220:
+    [Tabela com o voo aqui]
+    🔁 Deseja realizar outra busca? [s/n] (n): n
     🚪 Retornando ao menu principal...
     """
     while True:  # Loop principal para permitir múltiplas buscas
-        # Solicita o código ICAO ao usuário e faz a validação
-        codigo_voo = Prompt.ask("👉 Digite o código do voo (ICAO, ex: SWA3220)").strip().upper()
-        
-        # Validação do código ICAO (4 a 7 caracteres alfanuméricos)
-        if not re.match(r"^[A-Z0-9]{3,8}$", codigo_voo):
-            console.print("⚠️ Código ICAO inválido. Deve conter entre 3 e 8 caracteres alfanuméricos.", style="bold red")
+        # Solicita o código ao usuário e faz a validação
+        codigo_voo = Prompt.ask("👉 Digite o código do voo, o ICAO24 ou o país de origem (ex: SWA3220)").strip().upper()
+
+        # Validação: letras, números e espaços (nomes de países), entre 2 e 40 caracteres
+        if not re.match(r"^[\w ]{2,40}$", codigo_voo):
+            console.print("⚠️ Código inválido. Use entre 2 e 40 letras, números ou espaços.", style="bold red")
             continue  # Volta ao início do loop para pedir o código novamente
 
-        # Busca os estados dos voos na API OpenSky
-        estados = buscar_estados_opensky()
+        # Obtém os estados dos voos (último snapshot disponível)
+        estados = obter_estados()
 
         # Verifica se a busca retornou dados válidos
         if estados is None:
             console.print("⚠️ Não foi possível buscar os dados dos voos. Tente novamente mais tarde.", style="bold red")
             return  # Retorna ao menu principal
 
-        # Procura o voo pelo código ICAO fornecido
-        voo_encontrado = next((voo for voo in estados if voo[1] and voo[1].strip().upper() == codigo_voo), None)
+        # Procura o voo pelo código fornecido e, se não houver correspondência exata, sugere os mais parecidos
+        indice = obter_indice_busca(estados)
+        voos_encontrados = indice.exatos(codigo_voo)
+
+        if not voos_encontrados:
+            sugestoes = indice.buscar(codigo_voo)
+            if sugestoes:
+                console.print(f"⚠️ Nenhum voo encontrado com o código {codigo_voo}.", style="bold yellow")
+                voos_encontrados = escolher_sugestao(sugestoes)
 
-        # Exibe o resultado da busca
-        if voo_encontrado:
+        # Exibe o resultado da busca (os destinos das linhas exibidas são buscados em lote pela tabela)
+        if voos_encontrados and len(voos_encontrados) == 1:
             console.print(f"✅ Detalhes do voo {codigo_voo}:", style="bold green")
-            exibir_lista_voos([voo_encontrado])
-        else:
+            exibir_lista_voos(voos_encontrados)
+        elif voos_encontrados:
+            console.print(f"✅ {len(voos_encontrados)} voos encontrados:", style="bold green")
+            exibir_lista_voos(voos_encontrados)
+        elif voos_encontrados is not None:
             console.print(f"⚠️ Nenhum voo encontrado com o código {codigo_voo}.", style="bold yellow")
 
         # Pergunta ao usuário se deseja realizar outra busca
@@ -0,0 +1,331 @@
+import argparse
+import logging
+import shutil
+import time
+import os
+import re
+from datetime import datetime, timezone
+from rich.console import Console
+from exportacao import EXPORTACAO_DIR, ESQUEMAS, pa
+import numpy as np
+
+if pa is not None:
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+
+# Inicializa o console do rich
+console = Console()
+
+# Níveis de retenção dos dados exportados, por idade da partição (hora):
+# - até RETENCAO_COMPLETA_HORAS: resolução completa, como gravado;
+# - até RETENCAO_MINUTO_DIAS: um ponto por minuto por aeronave (mais os pontos de curva);
+# - até RETENCAO_MAXIMA_DIAS: um ponto a cada 10 minutos por aeronave (mais os pontos de curva),
+#   com as horas de cada dia unidas num único arquivo diário;
+# - depois disso, a partição é apagada (0 = nunca apagar).
+RETENCAO_COMPLETA_HORAS = float(os.getenv("RETENCAO_COMPLETA_HORAS", 24))
+RETENCAO_MINUTO_DIAS = float(os.getenv("RETENCAO_MINUTO_DIAS", 7))
+RETENCAO_MAXIMA_DIAS = float(os.getenv("RETENCAO_MAXIMA_DIAS", 90))
+
+# Resolução (s) de cada nível compactado. A de 10 minutos é múltiplo da de um minuto, para que
+# os intervalos de 10 minutos comecem junto com intervalos de um minuto (ver simplificar_trajetorias)
+RESOLUCAO_MINUTO = 60
+RESOLUCAO_DEZ_MINUTOS = 600
+
+# Na simplificação da trajetória, um ponto também é mantido quando a direção ou a altitude
+# mudam mais que isto em relação ao ponto anterior da mesma aeronave
+LIMITE_CURVA_GRAUS = 15.0
+
+# Linhas por bloco (row group) dos arquivos compactados: blocos menores deixam as consultas por
+# aeronave pularem mais dados usando as estatísticas de mínimo/máximo de cada bloco
+LINHAS_POR_BLOCO = 10000
+
+# Colunas usadas na simplificação de cada conjunto de dados: (identificador, direção, altitude, limite de altitude)
+CONJUNTOS = {
+    "estados": ("icao24", "true_track", "baro_altitude", 300.0),
+    "aeronaves_proximas": ("icao", "direcao", "altitude_pes", 1000.0),
+}
+
+PADRAO_PARTICAO = re.compile(r"^data=(\d{4}-\d{2}-\d{2})$")
+PADRAO_HORA = re.compile(r"^hora=(\d{2})$")
+
+# Extensões dos arquivos de dados (os arquivos ".tmp" ainda estão sendo gravados e ficam de fora)
+EXTENSOES = (".parquet", ".arrow", ".csv.gz")
+
+
+def compactar(diretorio=EXPORTACAO_DIR, agora=None):
+    """
+    Aplica os níveis de retenção a todas as partições dos dados exportados (colunares e CSV).
+
+    Cada partição horária antiga é reduzida por aeronave a um ponto por minuto e todos os arquivos
+    dela são unidos num único arquivo, ordenado por aeronave e horário: as consultas de trajetória
+    (filtro por icao24) leem só os blocos da aeronave. Quando o dia inteiro passa do nível de um
+    minuto, as horas dele são reduzidas a um ponto a cada 10 minutos e unidas num único arquivo
+    diário, gravado no diretório do dia. A operação pode ser repetida sem efeito em partições já
+    compactadas.
+
+    Parâmetros:
+    - diretorio (str): Raiz dos dados exportados.
+    - agora (float, opcional): Horário de referência (padrão: o atual).
+
+    Retorna:
+    - dict: Quantidade de partições compactadas e apagadas.
+    """
+    agora = agora or time.time()
+    resumo = {"compactadas": 0, "apagadas": 0}
+
+    for raiz in (diretorio, os.path.join(diretorio, "csv")):
+        for conjunto in CONJUNTOS:
+            base = os.path.join(raiz, conjunto)
+            dias = {}
+            for caminho, inicio, duracao in listar_particoes(base):
+                if not os.path.isdir(caminho):
+                    continue  # Já apagada junto com o dia
+                idade = agora - (inicio + duracao)
+                if RETENCAO_MAXIMA_DIAS and idade > RETENCAO_MAXIMA_DIAS * 86400:
+                    shutil.rmtree(caminho, ignore_errors=True)
+                    resumo["apagadas"] += 1
+                    continue
+
+                caminho_dia = caminho if duracao == 86400 else os.path.dirname(caminho)
+                inicio_dia = inicio - inicio % 86400
+                if agora - (inicio_dia + 86400) > RETENCAO_MINUTO_DIAS * 86400:
+                    # O dia inteiro passou do nível de um minuto: as horas são unidas no arquivo diário
+                    horas = dias.setdefault(caminho_dia, [])
+                    if duracao == 3600:
+                        horas.append(caminho)
+                elif duracao == 3600 and idade > RETENCAO_COMPLETA_HORAS * 3600:
+                    try:
+                        if _compactar_particao(caminho, conjunto, RESOLUCAO_MINUTO):
+                            resumo["compactadas"] += 1
+                    except Exception as e:
+                        logging.error(f"Erro ao compactar a partição {caminho}: {e}")
+
+            for caminho_dia, horas in dias.items():
+                try:
+                    if _unir_dia(caminho_dia, horas, conjunto, RESOLUCAO_DEZ_MINUTOS):
+                        resumo["compactadas"] += 1
+                except Exception as e:
+                    logging.error(f"Erro ao unir as partições do dia {caminho_dia}: {e}")
+
+            # Remove os diretórios de dias que ficaram vazios
+            if os.path.isdir(base):
+                for dia in os.listdir(base):
+                    caminho_dia = os.path.join(base, dia)
+                    if os.path.isdir(caminho_dia) and not os.listdir(caminho_dia):
+                        os.rmdir(caminho_dia)
+
+    return resumo
+
+
+def listar_particoes(base):
+    """
+    Lista as partições de um conjunto de dados: as horárias ("data=.../hora=...") e os dias que
+    têm um arquivo diário compactado (arquivos direto em "data=...").
+
+    Retorna:
+    - list: Tuplas (caminho, horário UTC de início, duração em segundos).
+    """
+    if not os.path.isdir(base):
+        return []
+    particoes = []
+    for dia in sorted(os.listdir(base)):
+        encontrado_dia = PADRAO_PARTICAO.match(dia)
+        if not encontrado_dia:
+            continue
+        caminho_dia = os.path.join(base, dia)
+        inicio_dia = datetime.strptime(encontrado_dia.group(1), "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+        nomes = sorted(os.listdir(caminho_dia))
+        if listar_arquivos_dados(caminho_dia):
+            particoes.append((caminho_dia, inicio_dia, 86400))
+        for hora in nomes:
+            encontrado_hora = PADRAO_HORA.match(hora)
+            if encontrado_hora:
+                particoes.append((os.path.join(caminho_dia, hora), inicio_dia + int(encontrado_hora.group(1)) * 3600, 3600))
+    return particoes
+
+
+def listar_arquivos_dados(caminho, extensoes=EXTENSOES):
+    """
+    Lista (ordenados) os nomes dos arquivos de dados já fechados de uma partição.
+    """
+    return sorted(nome for nome in os.listdir(caminho) if nome.endswith(extensoes))
+
+
+def _compactar_particao(caminho, conjunto, resolucao):
+    """
+    Reduz e une os arquivos de uma partição horária num único arquivo "compactado-<resolução>s".
+
+    Retorna:
+    - bool: True se a partição foi reescrita, False se já estava compactada nessa resolução (ou mais).
+    """
+    if pa is None:
+        logging.error("A compactação dos dados exportados requer o pacote pyarrow.")
+        return False
+
+    arquivos = listar_arquivos_dados(caminho)
+    if not arquivos:
+        return False
+
+    compactados = [re.match(r"^compactado-(\d+)s\.", nome) for nome in arquivos]
+    if len(arquivos) == 1 and compactados[0] and int(compactados[0].group(1)) >= resolucao:
+        return False
+
+    tabela = pa.concat_tables(
+        [_ler(os.path.join(caminho, nome), conjunto) for nome in arquivos], promote_options="default"
+    )
+    destino = os.path.join(caminho, f"compactado-{resolucao}s{_extensao(arquivos)}")
+    _gravar(simplificar_trajetorias(tabela, conjunto, resolucao), destino)
+
+    # Só apaga os arquivos originais depois que o novo arquivo está completo
+    for nome in arquivos:
+        if os.path.join(caminho, nome) != destino:
+            os.remove(os.path.join(caminho, nome))
+    return True
+
+
+def _unir_dia(caminho_dia, horas, conjunto, resolucao):
+    """
+    Reduz os arquivos das partições horárias de um dia e os une no arquivo diário "compactado-<resolução>s".
+
+    As horas são reduzidas juntas (as trajetórias continuam de uma hora para a outra) e
+    acrescentadas ao arquivo diário que já existir, sem reduzi-lo de novo.
+
+    Retorna:
+    - bool: True se o arquivo diário foi reescrito, False se não havia horas a unir.
+    """
+    if pa is None:
+        logging.error("A compactação dos dados exportados requer o pacote pyarrow.")
+        return False
+
+    arquivos_horas = [os.path.join(hora, nome) for hora in horas for nome in listar_arquivos_dados(hora)]
+    if not arquivos_horas:
+        # Horas sem arquivos de dados (ex: vazias) são só removidas
+        for hora in horas:
+            if not os.listdir(hora):
+                os.rmdir(hora)
+        return False
+
+    diarios = [os.path.join(caminho_dia, nome) for nome in listar_arquivos_dados(caminho_dia)]
+    novos = simplificar_trajetorias(
+        pa.concat_tables([_ler(arquivo, conjunto) for arquivo in arquivos_horas], promote_options="default"),
+        conjunto, resolucao,
+    )
+    tabela = novos
+    if diarios:
+        identificador = CONJUNTOS[conjunto][0]
+        tabela = pa.concat_tables([_ler(arquivo, conjunto) for arquivo in diarios] + [novos], promote_options="default")
+        tabela = tabela.sort_by([(identificador, "ascending"), ("horario", "ascending")])
+
+    destino = os.path.join(caminho_dia, f"compactado-{resolucao}s{_extensao(arquivos_horas + diarios)}")
+    _gravar(tabela, destino)
+
+    # Só apaga os arquivos das horas (e os diários anteriores) depois que o arquivo diário está completo
+    for arquivo in arquivos_horas + diarios:
+        if arquivo != destino:
+            os.remove(arquivo)
+    for hora in horas:
+        if not os.listdir(hora):
+            os.rmdir(hora)
+    return True
+
+
+def _extensao(arquivos):
+    """
+    Extensão do arquivo compactado: a dos arquivos originais quando todos têm a mesma, senão Parquet.
+    """
+    for extensao in (".arrow", ".csv.gz"):
+        if all(nome.endswith(extensao) for nome in arquivos):
+            return extensao
+    return ".parquet"
+
+
+def _ler(caminho, conjunto):
+    if caminho.endswith(".arrow"):
+        with pa_ipc.open_file(caminho) as leitor:
+            return leitor.read_all()
+    if caminho.endswith(".csv.gz"):
+        # O CSV não guarda os tipos: as colunas são lidas com os tipos do esquema da exportação
+        tipos = {nome: pa.type_for_alias(tipo) for nome, tipo in ESQUEMAS[conjunto]}
+        return pa_csv.read_csv(caminho, convert_options=pa_csv.ConvertOptions(column_types=tipos, strings_can_be_null=True))
+    return pq.read_table(caminho)
+
+
+def _gravar(tabela, destino):
+    """
+    Grava a tabela compactada num temporário e o renomeia para o destino.
+    """
+    temporario = f"{destino}.tmp"
+    if destino.endswith(".parquet"):
+        pq.write_table(tabela, temporario, compression="zstd", row_group_size=LINHAS_POR_BLOCO)
+    elif destino.endswith(".arrow"):
+        with pa_ipc.new_file(temporario, tabela.schema, options=pa_ipc.IpcWriteOptions(compression="zstd")) as escritor:
+            escritor.write_table(tabela, max_chunksize=LINHAS_POR_BLOCO)
+    else:
+        with pa.CompressedOutputStream(temporario, "gzip") as saida:
+            pa_csv.write_csv(tabela, saida)
+    os.replace(temporario, destino)
+
+
+def simplificar_trajetorias(tabela, conjunto, resolucao):
+    """
+    Reduz a resolução das trajetórias de uma tabela de pontos, por aeronave.
+
+    De cada aeronave são mantidos o primeiro ponto de cada intervalo de `resolucao` segundos,
+    o último ponto e os pontos em que a direção ou a altitude mudaram bruscamente em relação
+    ao ponto anterior (curvas, subidas e descidas), preservando a forma da trajetória.
+
+    A redução a 10 minutos normalmente parte de pontos já reduzidos a um minuto (os originais
+    não são guardados). Como os intervalos de 10 minutos começam junto com intervalos de um
+    minuto, o primeiro ponto de cada intervalo e o último ponto são os mesmos de uma redução dos
+    dados originais; já as curvas são comparadas entre os pontos que sobraram, de minuto em
+    minuto: curvas suaves que não passavam do limite entre pontos originais seguidos podem ser
+    mantidas, e pontos de curva muito próximos podem ser descartados.
+
+    Retorna:
+    - pyarrow.Table: Os pontos mantidos, ordenados por aeronave e horário.
+    """
+    identificador, coluna_direcao, coluna_altitude, limite_altitude = CONJUNTOS[conjunto]
+    tabela = tabela.filter(pc.is_valid(tabela.column(identificador)))
+    tabela = tabela.sort_by([(identificador, "ascending"), ("horario", "ascending")])
+    if tabela.num_rows == 0:
+        return tabela
+
+    aeronaves = tabela.column(identificador).combine_chunks().dictionary_encode().indices.to_numpy()
+    horarios = tabela.column("horario").to_numpy()
+    direcoes = tabela.column(coluna_direcao).to_numpy(zero_copy_only=False).astype(np.float64)
+    altitudes = tabela.column(coluna_altitude).to_numpy(zero_copy_only=False).astype(np.float64)
+
+    mesma_aeronave = np.r_[False, aeronaves[1:] == aeronaves[:-1]]
+    ultima_da_aeronave = np.r_[aeronaves[1:] != aeronaves[:-1], True]
+    baldes = horarios // resolucao
+    novo_balde = ~mesma_aeronave | np.r_[True, baldes[1:] != baldes[:-1]]
+
+    # Comparações com NaN (dados ausentes) resultam em False e não mantêm o ponto
+    with np.errstate(invalid="ignore"):
+        curva = np.r_[False, np.abs((direcoes[1:] - direcoes[:-1] + 180.0) % 360.0 - 180.0) > LIMITE_CURVA_GRAUS]
+        variacao_altitude = np.r_[False, np.abs(altitudes[1:] - altitudes[:-1]) > limite_altitude]
+
+    manter = novo_balde | ultima_da_aeronave | (mesma_aeronave & (curva | variacao_altitude))
+    return tabela.filter(pa.array(manter))
+
+
+def main():
+    """
+    Executa a compactação pela linha de comando (ex: agendada no cron).
+    """
+    parser = argparse.ArgumentParser(description="Aplica os níveis de retenção aos dados exportados.")
+    parser.add_argument("--diretorio", default=EXPORTACAO_DIR, help="Raiz dos dados exportados.")
+    args = parser.parse_args()
+
+    inicio = time.time()
+    resumo = compactar(args.diretorio)
+    console.print(
+        f"[green]✅ {resumo['compactadas']} partições compactadas e {resumo['apagadas']} apagadas "
+        f"em {time.time() - inicio:.1f} s.[/green]"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+from rich.console import Console
+from rich.table import Table
+from geocodificador import RAIO_TERRA_KM
+from utils import exibir_lista_voos
+import numpy as np
+import itertools
+import os
+
+# Inicializa o console do rich
+console = Console()
+
+# Separações mínimas entre aeronaves: abaixo das duas ao mesmo tempo, o par é sinalizado
+SEPARACAO_HORIZONTAL_NM = float(os.getenv("SEPARACAO_HORIZONTAL_NM", 5))
+SEPARACAO_VERTICAL_PES = float(os.getenv("SEPARACAO_VERTICAL_PES", 1000))
+
+# Número máximo de pares listados a cada verificação (os mais próximos primeiro)
+LIMITE_CONFLITOS_EXIBIDOS = 20
+
+MILHA_NAUTICA_EM_KM = 1.852
+PES_PARA_METROS = 0.3048
+
+# Deslocamentos até as células vizinhas nas quatro dimensões do hash (x, y, z e altitude): a própria
+# célula e a metade "positiva" da vizinhança (a outra metade é simétrica)
+VIZINHANCA_POSITIVA = np.array([d for d in itertools.product((-1, 0, 1), repeat=4) if d >= (0, 0, 0, 0)], dtype=np.int64)
+
+
+def detectar_conflitos(estados, separacao_horizontal_nm=SEPARACAO_HORIZONTAL_NM, separacao_vertical_pes=SEPARACAO_VERTICAL_PES):
+    """
+    Encontra os pares de aeronaves em voo mais próximas que as separações mínimas, em todo o snapshot.
+
+    As posições são distribuídas num hash espacial uniforme: cada aeronave cai numa célula do
+    tamanho das separações mínimas (em coordenadas 3D sobre a esfera, sem distorção perto dos
+    polos ou da linha de data, e na altitude barométrica). Só aeronaves da mesma célula ou de
+    células vizinhas podem estar em conflito, o que evita comparar todos os pares.
+
+    Parâmetros:
+    - estados (list): Estados de voo no formato da OpenSky API.
+    - separacao_horizontal_nm (float): Separação horizontal mínima, em milhas náuticas.
+    - separacao_vertical_pes (float): Separação vertical mínima, em pés.
+
+    Retorna:
+    - list: Tuplas (voo_a, voo_b, distância em NM, diferença de altitude em pés), da mais próxima à mais distante.
+    """
+    em_voo = [
+        voo for voo in estados
+        if len(voo) > 8 and voo[5] is not None and voo[6] is not None and voo[7] is not None and not voo[8]
+    ]
+    if len(em_voo) < 2:
+        return []
+
+    posicoes = np.array([(voo[6], voo[5], voo[7]) for voo in em_voo], dtype=np.float64)
+    lat, lon, altitude = np.radians(posicoes[:, 0]), np.radians(posicoes[:, 1]), posicoes[:, 2]
+    vetores = np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+    # Tamanho das células: a corda correspondente à separação horizontal e a separação vertical em metros
+    angulo = separacao_horizontal_nm * MILHA_NAUTICA_EM_KM / RAIO_TERRA_KM
+    corda = 2 * np.sin(angulo / 2)
+    separacao_vertical_m = separacao_vertical_pes * PES_PARA_METROS
+
+    celulas = np.floor(np.column_stack((vetores / corda, altitude / separacao_vertical_m))).astype(np.int64)
+    # Uma célula de folga de cada lado para que os vizinhos também caibam na numeração
+    celulas -= celulas.min(axis=0) - 1
+    dimensoes = celulas.max(axis=0) + 2
+    pesos = np.array([dimensoes[1] * dimensoes[2] * dimensoes[3], dimensoes[2] * dimensoes[3], dimensoes[3], 1], dtype=np.int64)
+
+    chaves = celulas @ pesos
+    ordem = np.argsort(chaves, kind="stable")
+    chaves_ordenadas = chaves[ordem]
+
+    # Basta olhar metade da vizinhança: o par (A, B) achado a partir de A não precisa ser
+    # procurado de novo a partir de B. Na própria célula, cada par é contado uma única vez.
+    primeiros, segundos = [], []
+    for deslocamento in VIZINHANCA_POSITIVA @ pesos:
+        # As chaves consultadas também estão em ordem, o que torna a busca binária bem mais rápida
+        vizinhas = chaves_ordenadas + deslocamento
+        inicio = np.searchsorted(chaves_ordenadas, vizinhas, side="left")
+        fim = np.searchsorted(chaves_ordenadas, vizinhas, side="right")
+        quantidades = fim - inicio
+        total = int(quantidades.sum())
+        if total == 0:
+            continue
+
+        # Expande cada faixa [inicio, fim) em pares (posição da aeronave, posição da aeronave vizinha)
+        posicoes = np.repeat(np.arange(len(chaves)), quantidades)
+        deslocamentos = np.arange(total) - np.repeat(np.cumsum(quantidades) - quantidades, quantidades)
+        outras = np.repeat(inicio, quantidades) + deslocamentos
+        if deslocamento == 0:
+            unicos = posicoes < outras
+            posicoes, outras = posicoes[unicos], outras[unicos]
+        primeiros.append(ordem[posicoes])
+        segundos.append(ordem[outras])
+
+    if not primeiros:
+        return []
+    a, b = np.concatenate(primeiros), np.concatenate(segundos)
+
+    produto = np.clip(np.einsum("ij,ij->i", vetores[a], vetores[b]), -1.0, 1.0)
+    distancia_nm = RAIO_TERRA_KM * np.arccos(produto) / MILHA_NAUTICA_EM_KM
+    diferenca_m = np.abs(altitude[a] - altitude[b])
+
+    conflitos = np.flatnonzero((distancia_nm < separacao_horizontal_nm) & (diferenca_m < separacao_vertical_m))
+    conflitos = conflitos[np.argsort(distancia_nm[conflitos], kind="stable")]
+
+    return [
+        (em_voo[a[i]], em_voo[b[i]], float(distancia_nm[i]), float(diferenca_m[i] / PES_PARA_METROS))
+        for i in conflitos
+    ]
+
+
+def exibir_conflitos(conflitos, limite=LIMITE_CONFLITOS_EXIBIDOS):
+    """
+    Exibe os pares de aeronaves em conflito numa tabela e as aeronaves envolvidas na lista de voos.
+    """
+    if not conflitos:
+        console.print("[green]✅ Nenhum par de aeronaves abaixo das separações mínimas.[/green]")
+        return
+
+    console.print(
+        f"[red]⚠️ {len(conflitos)} pares de aeronaves abaixo das separações mínimas "
+        f"({SEPARACAO_HORIZONTAL_NM:g} NM / {SEPARACAO_VERTICAL_PES:g} ft). ⚠️[/red]"
+    )
+
+    table = Table(title="⚠️ Conflitos de Separação", show_header=True, header_style="bold magenta")
+    table.add_column("Aeronave A", style="cyan")
+    table.add_column("Aeronave B", style="cyan")
+    table.add_column("Distância (NM)", style="yellow")
+    table.add_column("Diferença de Altitude (ft)", style="red")
+
+    exibidos = conflitos[:limite]
+    for voo_a, voo_b, distancia, diferenca in exibidos:
+        table.add_row(
+            (voo_a[1] or voo_a[0]).strip(),
+            (voo_b[1] or voo_b[0]).strip(),
+            f"{distancia:.2f}",
+            f"{diferenca:.0f}",
+        )
+    console.print(table)
+
+    if len(conflitos) > limite:
+        console.print(f"[yellow]Exibindo os {limite} pares mais próximos.[/yellow]")
+
+    # Cada aeronave aparece uma única vez na lista, mesmo que esteja em mais de um par
+    envolvidas = {}
+    for voo_a, voo_b, _, _ in exibidos:
+        envolvidas.setdefault(voo_a[0], voo_a)
+        envolvidas.setdefault(voo_b[0], voo_b)
+    exibir_lista_voos(list(envolvidas.values()))
@@ -0,0 +1,407 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from rich.console import Console
+from exportacao import EXPORTACAO_DIR, ESQUEMAS, pa
+from compactacao import listar_particoes, listar_arquivos_dados
+from geocodificador import RAIO_TERRA_KM
+from lote import ler_horario
+from densidade import calcular_grade, grade_vazia, pesos_por_tempo, DENSIDADE_RESOLUCAO_GRAUS
+import numpy as np
+import itertools
+import heapq
+import time
+import os
+
+if pa is not None:
+    import pyarrow.compute as pc
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+
+# Inicializa o console do rich (as consultas rodam no modo em lote, com as mensagens em stderr)
+console = Console(stderr=True)
+
+# Número de processos que leem os arquivos em paralelo (padrão: um por núcleo)
+CONSULTA_PROCESSOS = int(os.getenv("CONSULTA_PROCESSOS", 0)) or os.cpu_count() or 1
+
+MILHA_NAUTICA_EM_KM = 1.852
+
+# Filtros de faixa aceitos nas consultas: (chave, coluna, operador)
+FILTROS_FAIXA = [
+    ("altitude_minima", "baro_altitude", ">="),
+    ("altitude_maxima", "baro_altitude", "<="),
+    ("velocidade_minima", "velocity", ">="),
+    ("velocidade_maxima", "velocity", "<="),
+]
+
+# Filtros de igualdade aceitos nas consultas: (chave, coluna)
+FILTROS_IGUALDADE = [("icao24", "icao24"), ("callsign", "callsign"), ("pais", "origin_country"), ("em_solo", "on_ground")]
+
+# Agrupamentos aceitos: por período (hora ou dia, em segundos) ou por coluna
+AGRUPAMENTOS = {"hora": 3600, "dia": 86400, "icao24": "icao24", "callsign": "callsign", "pais": "origin_country"}
+
+
+def consultar_exportacao(consulta, diretorio=EXPORTACAO_DIR, processos=CONSULTA_PROCESSOS):
+    """
+    Executa uma consulta sobre os snapshots de estados exportados (exportacao.py), em paralelo.
+
+    A mesma consulta é aplicada a cada arquivo por um conjunto de processos, e os resultados
+    parciais são unidos ao final. Antes de ler os dados, são descartadas as partições (horas) fora
+    do período e, em cada arquivo Parquet, os blocos (row groups) cujo mínimo/máximo das colunas
+    filtradas não pode satisfazer a consulta: um período curto, uma aeronave (nos arquivos
+    compactados, ordenados por icao24) ou uma altitude alta leem só uma fração dos dados.
+
+    Parâmetros:
+    - consulta (dict): Filtros, todos opcionais e combinados com "e": inicio e fim (timestamp ou
+      DD/MM/AAAA HH:MM), icao24, callsign, pais, em_solo, altitude_minima, altitude_maxima,
+      velocidade_minima, velocidade_maxima, retangulo ({"lat_min", "lat_max", "lon_min", "lon_max"})
+      e area ({"lat", "lon", "raio_nm"}). Com "agrupar" (hora, dia, icao24, callsign ou pais, ou uma
+      lista deles), retorna por grupo o número de registros e de aeronaves distintas; sem ele,
+      retorna os registros (só as "colunas" pedidas, se informadas), até "limite".
+    - diretorio (str): Raiz dos dados exportados.
+    - processos (int): Número de processos de leitura.
+
+    Retorna:
+    - iterator: Linhas do resultado (dicts), em ordem cronológica ou de grupo.
+
+    Exceções:
+    - ValueError: Se a consulta for inválida ou o pyarrow não estiver instalado.
+    """
+    if pa is None:
+        raise ValueError("as consultas aos dados exportados requerem o pacote pyarrow")
+
+    predicados, periodo = _ler_predicados(consulta)
+    agrupar = consulta.get("agrupar") or []
+    agrupar = [agrupar] if isinstance(agrupar, str) else list(agrupar)
+    for chave in agrupar:
+        if chave not in AGRUPAMENTOS:
+            raise ValueError(f"agrupamento inválido: {chave}")
+    limite = int(consulta.get("limite") or 0)
+
+    # Cada processo lê só as colunas usadas nos filtros e no resultado
+    colunas = consulta.get("colunas") or [nome for nome, _ in ESQUEMAS["estados"]]
+    desconhecidas = set(colunas) - {nome for nome, _ in ESQUEMAS["estados"]}
+    if desconhecidas:
+        raise ValueError(f"colunas desconhecidas: {', '.join(sorted(desconhecidas))}")
+    if agrupar:
+        colunas = ["horario", "icao24"] + [AGRUPAMENTOS[chave] for chave in agrupar if not isinstance(AGRUPAMENTOS[chave], int)]
+    # O horário é sempre lido, para ordenar os registros
+    leitura = _colunas_lidas(predicados, list(colunas) + ["horario"])
+
+    arquivos = _listar_arquivos(os.path.join(diretorio, "estados"), *periodo)
+    tarefas = [(caminho, predicados, agrupar, limite, leitura, colunas) for caminho in arquivos]
+    parciais = _executar(_consultar_arquivo, tarefas, processos)
+
+    if not agrupar:
+        # Cada arquivo devolve os seus registros já em ordem de horário: basta intercalá-los
+        ordenadas = heapq.merge(*(zip(parcial["horarios"], parcial["linhas"]) for parcial in parciais),
+                                key=lambda item: item[0])
+        return itertools.islice((linha for _, linha in ordenadas), limite or None)
+    return _unir_grupos(parciais, agrupar)
+
+
+def calcular_densidade_exportacao(consulta, resolucao=DENSIDADE_RESOLUCAO_GRAUS, ponderar=True,
+                                  diretorio=EXPORTACAO_DIR, processos=CONSULTA_PROCESSOS):
+    """
+    Calcula a grade de densidade de tráfego dos snapshots exportados, em paralelo.
+
+    Cada processo calcula a grade (densidade.calcular_grade) das posições de um arquivo que
+    satisfazem os filtros da consulta (os mesmos de consultar_exportacao), e as grades são somadas.
+
+    Parâmetros:
+    - consulta (dict): Filtros da consulta (ex: inicio e fim).
+    - resolucao (float): Tamanho da célula, em graus.
+    - ponderar (bool): Se True, cada posição vale o tempo até a seguinte da mesma aeronave e a
+      grade é dada em aeronaves-hora; senão, em número de posições.
+    - diretorio (str): Raiz dos dados exportados.
+    - processos (int): Número de processos de leitura.
+
+    Retorna:
+    - numpy.ndarray: A grade de densidade.
+    """
+    if pa is None:
+        raise ValueError("as consultas aos dados exportados requerem o pacote pyarrow")
+
+    predicados, periodo = _ler_predicados(consulta)
+    leitura = _colunas_lidas(predicados, ["horario", "icao24", "latitude", "longitude"])
+    arquivos = _listar_arquivos(os.path.join(diretorio, "estados"), *periodo)
+    tarefas = [(caminho, predicados, leitura, resolucao, ponderar) for caminho in arquivos]
+
+    grade = grade_vazia(resolucao)
+    celulas = grade.reshape(-1)
+    for parcial in _executar(_densidade_arquivo, tarefas, processos):
+        if parcial["celulas"] is not None:
+            celulas[parcial["celulas"]] += parcial["valores"]
+    return grade / 3600 if ponderar else grade
+
+
+def _executar(funcao, tarefas, processos):
+    """
+    Executa a função de leitura sobre cada arquivo, num conjunto de processos, e retorna os resultados parciais.
+    """
+    inicio = time.perf_counter()
+    if processos > 1 and len(tarefas) > 1:
+        with ProcessPoolExecutor(max_workers=min(processos, len(tarefas))) as executor:
+            parciais = list(executor.map(funcao, tarefas))
+    else:
+        parciais = [funcao(tarefa) for tarefa in tarefas]
+
+    lidos = sum(parcial["blocos_lidos"] for parcial in parciais)
+    total = sum(parcial["blocos"] for parcial in parciais)
+    console.print(
+        f"[cyan]{len(tarefas)} arquivos consultados em {time.perf_counter() - inicio:.2f} s "
+        f"({lidos} de {total} blocos lidos).[/cyan]"
+    )
+    return parciais
+
+
+def _colunas_lidas(predicados, colunas):
+    """
+    Retorna as colunas que precisam ser lidas: as do resultado e as usadas nos filtros.
+    """
+    filtradas = []
+    for coluna, _, _ in predicados:
+        filtradas.extend(["latitude", "longitude"] if coluna == "area" else [coluna])
+    return list(dict.fromkeys(list(colunas) + filtradas))
+
+
+def _ler_predicados(consulta):
+    """
+    Converte os filtros da consulta em predicados (coluna, operador, valor), que podem ser enviados
+    aos processos e comparados com as estatísticas dos blocos, e no período (início, fim) consultado.
+    """
+    predicados = []
+    inicio = ler_horario(consulta["inicio"]) if consulta.get("inicio") is not None else None
+    fim = ler_horario(consulta["fim"]) if consulta.get("fim") is not None else None
+    if inicio is not None and fim is not None and fim <= inicio:
+        raise ValueError("o fim deve ser posterior ao início")
+    if inicio is not None:
+        predicados.append(("horario", ">=", inicio))
+    if fim is not None:
+        predicados.append(("horario", "<=", fim))
+
+    for chave, coluna, operador in FILTROS_FAIXA:
+        if consulta.get(chave) is not None:
+            predicados.append((coluna, operador, float(consulta[chave])))
+
+    for chave, coluna in FILTROS_IGUALDADE:
+        if consulta.get(chave) is None:
+            continue
+        valor = consulta[chave]
+        if chave == "em_solo":
+            valor = bool(valor)
+        elif chave == "icao24":
+            valor = str(valor).strip().lower()
+        elif chave == "callsign":
+            valor = str(valor).strip().upper()
+        else:
+            valor = str(valor).strip()
+        predicados.append((coluna, "==", valor))
+
+    if consulta.get("retangulo") is not None:
+        retangulo = consulta["retangulo"]
+        predicados.append(("latitude", ">=", float(retangulo["lat_min"])))
+        predicados.append(("latitude", "<=", float(retangulo["lat_max"])))
+        predicados.append(("longitude", ">=", float(retangulo["lon_min"])))
+        predicados.append(("longitude", "<=", float(retangulo["lon_max"])))
+
+    if consulta.get("area") is not None:
+        area = consulta["area"]
+        lat, lon, raio_nm = float(area["lat"]), float(area["lon"]), float(area["raio_nm"])
+        # O retângulo que envolve o círculo permite descartar blocos; a distância exata é verificada depois
+        graus = raio_nm * MILHA_NAUTICA_EM_KM / (RAIO_TERRA_KM * np.pi / 180)
+        predicados.append(("latitude", ">=", lat - graus))
+        predicados.append(("latitude", "<=", lat + graus))
+        # Perto dos polos ou do antimeridiano, o retângulo não se aplica à longitude
+        if abs(lat) + graus < 89:
+            graus_lon = graus / np.cos(np.radians(abs(lat) + graus))
+            if -180 <= lon - graus_lon and lon + graus_lon <= 180:
+                predicados.append(("longitude", ">=", lon - graus_lon))
+                predicados.append(("longitude", "<=", lon + graus_lon))
+        predicados.append(("area", "<=", (lat, lon, raio_nm)))
+
+    return predicados, (inicio, fim)
+
+
+def _listar_arquivos(base, inicio, fim):
+    """
+    Lista os arquivos das partições (horárias ou diárias) que têm dados no período (None = sem limite).
+    """
+    arquivos = []
+    for caminho, inicio_particao, duracao in listar_particoes(base):
+        if (fim is not None and inicio_particao > fim) or (inicio is not None and inicio_particao + duracao <= inicio):
+            continue
+        # Arquivos ".tmp" ainda estão sendo gravados e ficam de fora
+        arquivos.extend(os.path.join(caminho, nome) for nome in listar_arquivos_dados(caminho, (".parquet", ".arrow")))
+    return arquivos
+
+
+def _consultar_arquivo(tarefa):
+    """
+    Aplica a consulta a um arquivo (executada nos processos de leitura).
+
+    Retorna:
+    - dict: Os registros ("linhas", em ordem de horário, com os horários em "horarios") ou os
+      grupos ("grupos": chave -> [registros, conjunto de aeronaves]) do arquivo, e quantos blocos
+      ele tem e quantos foram lidos.
+    """
+    caminho, predicados, agrupar, limite, leitura, colunas = tarefa
+    resultado = {"linhas": [], "horarios": [], "grupos": {}, "blocos": 0, "blocos_lidos": 0}
+
+    tabela = _ler_arquivo(caminho, predicados, leitura, resultado)
+    if tabela is None:
+        return resultado
+    if not agrupar:
+        # Os arquivos compactados são ordenados por aeronave: os registros são ordenados por horário
+        # antes do limite, que vale para a consulta inteira (nenhum arquivo precisa devolver mais que ele)
+        tabela = tabela.sort_by([("horario", "ascending")])
+        if limite:
+            tabela = tabela.slice(0, limite)
+        resultado["linhas"] = tabela.select(colunas).to_pylist()
+        resultado["horarios"] = tabela.column("horario").to_pylist()
+        return resultado
+
+    chaves = {}
+    for numero, chave in enumerate(agrupar):
+        origem = AGRUPAMENTOS[chave]
+        if isinstance(origem, int):
+            chaves[f"grupo{numero}"] = pc.multiply(pc.divide(tabela.column("horario"), origem), origem)
+        else:
+            chaves[f"grupo{numero}"] = tabela.column(origem)
+    chaves["icao24"] = tabela.column("icao24")
+    nomes = [f"grupo{numero}" for numero in range(len(agrupar))]
+    agregado = pa.table(chaves).group_by(nomes).aggregate([
+        ("icao24", "count", pc.CountOptions(mode="all")),
+        ("icao24", "distinct"),
+    ]).to_pydict()
+    resultado["grupos"] = {
+        chave: [registros, set(aeronaves)]
+        for chave, registros, aeronaves in zip(
+            zip(*(agregado[nome] for nome in nomes)), agregado["icao24_count"], agregado["icao24_distinct"]
+        )
+    }
+    return resultado
+
+
+def _densidade_arquivo(tarefa):
+    """
+    Calcula a grade de densidade das posições de um arquivo (executada nos processos de leitura).
+
+    Retorna:
+    - dict: As células não vazias da grade ("celulas", índices da grade achatada) e seus
+      "valores", e quantos blocos o arquivo tem e quantos foram lidos.
+    """
+    caminho, predicados, leitura, resolucao, ponderar = tarefa
+    resultado = {"celulas": None, "valores": None, "blocos": 0, "blocos_lidos": 0}
+
+    tabela = _ler_arquivo(caminho, predicados, leitura, resultado)
+    if tabela is None or tabela.num_rows == 0:
+        return resultado
+    pesos = None
+    if ponderar:
+        pesos = pesos_por_tempo(tabela.column("icao24").to_numpy(zero_copy_only=False), tabela.column("horario").to_numpy())
+    grade = calcular_grade(
+        tabela.column("latitude").to_numpy(zero_copy_only=False), tabela.column("longitude").to_numpy(zero_copy_only=False),
+        pesos, resolucao,
+    ).ravel()
+    # Só as células com tráfego voltam ao processo principal, e não a grade inteira
+    resultado["celulas"] = np.flatnonzero(grade)
+    resultado["valores"] = grade[resultado["celulas"]]
+    return resultado
+
+
+def _ler_arquivo(caminho, predicados, leitura, resultado):
+    """
+    Lê de um arquivo as colunas pedidas das linhas que satisfazem os predicados.
+
+    Nos arquivos Parquet, só são lidos os blocos que podem satisfazer os predicados. Atualiza
+    "blocos" e "blocos_lidos" no resultado e retorna None se nenhum bloco precisar ser lido.
+    """
+    if caminho.endswith(".parquet"):
+        arquivo = pq.ParquetFile(caminho)
+        resultado["blocos"] = arquivo.num_row_groups
+        blocos = [
+            indice for indice in range(arquivo.num_row_groups)
+            if _bloco_pode_satisfazer(arquivo.metadata.row_group(indice), arquivo.schema_arrow.names, predicados)
+        ]
+        resultado["blocos_lidos"] = len(blocos)
+        if not blocos:
+            return None
+        tabela = arquivo.read_row_groups(blocos, columns=leitura)
+    else:
+        # Os arquivos Arrow IPC não guardam estatísticas: todos os blocos são lidos
+        with pa.memory_map(caminho) as origem, pa_ipc.open_file(origem) as leitor:
+            resultado["blocos"] = resultado["blocos_lidos"] = leitor.num_record_batches
+            tabela = leitor.read_all().select(leitura)
+    return tabela.filter(_mascara(tabela, predicados))
+
+
+def _bloco_pode_satisfazer(metadados, colunas, predicados):
+    """
+    Verifica pelas estatísticas (mínimo/máximo) de um bloco se alguma linha dele pode satisfazer os predicados.
+    """
+    for coluna, operador, valor in predicados:
+        if coluna not in colunas:
+            continue
+        estatisticas = metadados.column(colunas.index(coluna)).statistics
+        if estatisticas is None or not estatisticas.has_min_max:
+            continue
+        minimo, maximo = estatisticas.min, estatisticas.max
+        if operador == ">=" and maximo < valor:
+            return False
+        if operador == "<=" and minimo > valor:
+            return False
+        if operador == "==" and not (minimo <= valor <= maximo):
+            return False
+    return True
+
+
+def _mascara(tabela, predicados):
+    """
+    Calcula, de forma vetorizada, quais linhas da tabela satisfazem todos os predicados.
+    """
+    mascara = np.ones(tabela.num_rows, dtype=bool)
+    for coluna, operador, valor in predicados:
+        if coluna == "area":
+            lat, lon, raio_nm = valor
+            latitudes = tabela.column("latitude").to_numpy(zero_copy_only=False).astype(np.float64)
+            longitudes = tabela.column("longitude").to_numpy(zero_copy_only=False).astype(np.float64)
+            with np.errstate(invalid="ignore"):
+                mascara &= _distancia_nm(lat, lon, latitudes, longitudes) <= raio_nm
+            continue
+        comparar = {">=": pc.greater_equal, "<=": pc.less_equal, "==": pc.equal}[operador]
+        # Valores ausentes (null) não satisfazem nenhum filtro
+        mascara &= pc.fill_null(comparar(tabela.column(coluna), valor), False).to_numpy(zero_copy_only=False)
+    return pa.array(mascara)
+
+
+def _distancia_nm(lat, lon, latitudes, longitudes):
+    fi1, fi2 = np.radians(lat), np.radians(latitudes)
+    a = np.sin((fi2 - fi1) / 2) ** 2 + np.cos(fi1) * np.cos(fi2) * np.sin(np.radians(longitudes - lon) / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.minimum(1.0, np.sqrt(a))) / MILHA_NAUTICA_EM_KM
+
+
+def _unir_grupos(parciais, agrupar):
+    """
+    Une os grupos calculados em cada arquivo e gera uma linha por grupo.
+    """
+    grupos = {}
+    for parcial in parciais:
+        for chave, (registros, aeronaves) in parcial["grupos"].items():
+            grupo = grupos.get(chave)
+            if grupo is None:
+                grupos[chave] = [registros, aeronaves]
+            else:
+                grupo[0] += registros
+                grupo[1] |= aeronaves
+
+    # Os grupos sem valor (ex: callsign ausente) ficam por último
+    for chave in sorted(grupos, key=lambda chave: tuple((valor is None, "" if valor is None else valor) for valor in chave)):
+        registros, aeronaves = grupos[chave]
+        linha = {}
+        for nome, valor in zip(agrupar, chave):
+            if isinstance(AGRUPAMENTOS[nome], int):
+                valor = datetime.fromtimestamp(valor, timezone.utc).isoformat()
+            linha[nome] = valor
+        linha["registros"] = registros
+        linha["aeronaves"] = len(aeronaves)
+        yield linha
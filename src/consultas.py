@@ -1,5 +1,6 @@
-from datetime import datetime, timedelta
-from geopy.geocoders import Nominatim
+from datetime import timedelta
+from geocodificador import descrever_localizacao
+from utils import cache_filtros
 from rich.console import Console
 from rich.prompt import Prompt
 
@@ -27,7 +28,8 @@ def buscar_voos_por_pais(estados, pais):
         return []
 
     # Filtra os estados (voos) onde o valor de 'estado[2]' corresponde ao nome do país.
-    voos_filtrados = [estado for estado in estados if estado[2] == pais]
+    # O resultado fica no cache de filtros enquanto o snapshot não mudar.
+    voos_filtrados = list(cache_filtros.filtrar(estados, "pais", (pais,), lambda estado: estado[2] == pais))
 
     # Retorna a lista de voos filtrados.
     return voos_filtrados
@@ -52,45 +54,39 @@ def buscar_voos_por_horario(estados, horario):
     if not estados:
         return []
 
-    # Inicializa uma lista para armazenar os voos filtrados.
-    voos_filtrados = []
-    
-    # Itera sobre todos os estados (voos) e verifica se o horário de partida está disponível.
-    for estado in estados:
-        if estado[3]:  # Verifica se o horário de partida (estado[3]) existe.
-            # Converte o horário de partida, que está no formato de timestamp, para um objeto datetime.
-            hora_partida = datetime.fromtimestamp(estado[3])
-            
-            # Verifica se o voo está partindo dentro de uma janela de uma hora em relação ao horário fornecido.
-            if horario <= hora_partida <= horario + timedelta(hours=1):
-                # Se o voo satisfizer a condição, adiciona o voo à lista filtrada.
-                voos_filtrados.append(estado)
+    # A janela de uma hora em relação ao horário fornecido, convertida uma única vez para timestamp.
+    inicio = horario.timestamp()
+    fim = (horario + timedelta(hours=1)).timestamp()
+
+    # Verifica se o horário de partida (estado[3]) existe e está dentro da janela.
+    # O resultado fica no cache de filtros enquanto o snapshot não mudar.
+    voos_filtrados = list(cache_filtros.filtrar(
+        estados, "horario_partida", (inicio,), lambda estado: bool(estado[3]) and inicio <= estado[3] <= fim
+    ))
     
     # Retorna a lista de voos que atendem à condição do horário.
     return voos_filtrados
 
 def obter_endereco(lat, lon):
     """
-    Obtém o endereço completo a partir das coordenadas de latitude e longitude.
+    Obtém a descrição do lugar a partir das coordenadas de latitude e longitude.
+
+    A busca é feita na base offline (cidade mais próxima); o Nominatim só é consultado
+    se a geocodificação online estiver ativada (GEOCODIFICACAO_ONLINE no .env).
     
     Parâmetros:
     - lat (float): Latitude das coordenadas.
     - lon (float): Longitude das coordenadas.
     
     Retorna:
-    - str: O endereço completo ou uma mensagem de erro caso o endereço não possa ser encontrado.
+    - str: A descrição do lugar ou uma mensagem de erro caso ele não possa ser encontrado.
     """
     # Verifica se as coordenadas são válidas
     if lat is None or lon is None or lat == 0 or lon == 0:
         return "Coordenadas inválidas"
 
-    geolocator = Nominatim(user_agent="meu_app")
     try:
-        location = geolocator.reverse((lat, lon), language='pt', timeout=10)
-        if location:
-            return location.address
-        else:
-            return "Destino não encontrado"
+        return descrever_localizacao(lat, lon)
     except Exception as e:
         console.print(f"[red]⚠️ Erro ao obter endereço: {e} ⚠️[/red]")
         return f"Erro ao obter endereço: {e}"
\ No newline at end of file
@@ -0,0 +1,194 @@
+from rich.console import Console
+from rich.prompt import Prompt
+from branca.colormap import LinearColormap
+import numpy as np
+import folium
+import os
+
+# Inicializa o console do rich
+console = Console()
+
+# Tamanho (em graus) de cada célula da grade de densidade
+DENSIDADE_RESOLUCAO_GRAUS = float(os.getenv("DENSIDADE_RESOLUCAO_GRAUS", 0.25))
+
+# Na ponderação por tempo, cada posição vale o tempo até a posição seguinte da mesma aeronave,
+# limitado a este intervalo (s), para que lacunas na cobertura não pesem como tempo de voo
+DENSIDADE_INTERVALO_MAXIMO = float(os.getenv("DENSIDADE_INTERVALO_MAXIMO", 600))
+
+# Latitude máxima da grade: a projeção do mapa (Web Mercator) não vai além disso
+LATITUDE_MAXIMA = 85.0
+
+# Arquivo do mapa gerado
+MAPA_DENSIDADE = os.path.join(os.path.dirname(__file__), "..", "mapa_densidade.html")
+
+# Cores da escala, da menor para a maior densidade
+CORES_ESCALA = ["#0000ff", "#00ffff", "#00ff00", "#ffff00", "#ff0000"]
+
+
+def calcular_grade(latitudes, longitudes, pesos=None, resolucao=DENSIDADE_RESOLUCAO_GRAUS):
+    """
+    Distribui as posições numa grade de latitude/longitude com um histograma 2D do numpy.
+
+    Parâmetros:
+    - latitudes, longitudes (array): Posições (valores ausentes, NaN, são ignorados).
+    - pesos (array, opcional): Peso de cada posição (ex: segundos); sem pesos, cada posição conta 1.
+    - resolucao (float): Tamanho da célula, em graus.
+
+    Retorna:
+    - numpy.ndarray: Grade (linhas = latitude, de sul para norte; colunas = longitude, de oeste
+      para leste) cobrindo de -LATITUDE_MAXIMA a LATITUDE_MAXIMA e de -180 a 180.
+    """
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    validos = ~(np.isnan(latitudes) | np.isnan(longitudes))
+    if pesos is not None:
+        pesos = np.asarray(pesos, dtype=np.float64)[validos]
+    grade, _, _ = np.histogram2d(
+        latitudes[validos], longitudes[validos], bins=_bordas(resolucao),
+        range=[[-LATITUDE_MAXIMA, LATITUDE_MAXIMA], [-180, 180]], weights=pesos,
+    )
+    return grade
+
+
+def _bordas(resolucao):
+    return [int(round(2 * LATITUDE_MAXIMA / resolucao)), int(round(360 / resolucao))]
+
+
+def grade_vazia(resolucao=DENSIDADE_RESOLUCAO_GRAUS):
+    """
+    Retorna uma grade zerada com a forma das calculadas por calcular_grade.
+    """
+    return np.zeros(_bordas(resolucao))
+
+
+def pesos_por_tempo(icao24, horarios, intervalo_maximo=DENSIDADE_INTERVALO_MAXIMO):
+    """
+    Calcula o peso de cada posição como o tempo (s) até a posição seguinte da mesma aeronave.
+
+    Assim a grade mede o tempo passado em cada célula (aeronaves-hora), e não o número de
+    amostras, que depende da frequência dos snapshots (e da compactação dos dados antigos). A
+    última posição de cada aeronave recebe o intervalo típico entre as posições.
+    """
+    horarios = np.asarray(horarios, dtype=np.float64)
+    if len(horarios) == 0:
+        return horarios
+    _, aeronaves = np.unique(np.asarray(icao24, dtype=object).astype(str), return_inverse=True)
+    ordem = np.lexsort((horarios, aeronaves))
+    intervalos = np.diff(horarios[ordem])
+    mesma_aeronave = aeronaves[ordem][1:] == aeronaves[ordem][:-1]
+    validos = intervalos[mesma_aeronave & (intervalos > 0)]
+    tipico = float(np.median(validos)) if len(validos) else 0.0
+
+    pesos_ordenados = np.full(len(horarios), tipico)
+    pesos_ordenados[:-1][mesma_aeronave] = intervalos[mesma_aeronave]
+    pesos = np.empty(len(horarios))
+    pesos[ordem] = np.minimum(pesos_ordenados, intervalo_maximo)
+    return pesos
+
+
+def grade_do_snapshot(estados, resolucao=DENSIDADE_RESOLUCAO_GRAUS):
+    """
+    Calcula a grade de densidade (número de aeronaves por célula) de um snapshot de estados.
+    """
+    estados = [voo for voo in estados if len(voo) > 6]
+    if not estados:
+        return grade_vazia(resolucao)
+    colunas = list(zip(*estados))
+    # None vira NaN na conversão para float e a posição é ignorada
+    return calcular_grade(
+        np.array(colunas[6], dtype=np.float64), np.array(colunas[5], dtype=np.float64), resolucao=resolucao
+    )
+
+
+def _imagem(grade):
+    """
+    Converte a grade numa imagem RGBA (escala logarítmica; células vazias transparentes).
+    """
+    intensidade = np.log1p(grade)
+    maximo = intensidade.max() or 1.0
+    normalizada = intensidade / maximo
+
+    paradas = np.linspace(0, 1, len(CORES_ESCALA))
+    componentes = np.array([[int(cor[i:i + 2], 16) for i in (1, 3, 5)] for cor in CORES_ESCALA], dtype=np.float64)
+    imagem = np.zeros(grade.shape + (4,), dtype=np.uint8)
+    for canal in range(3):
+        imagem[..., canal] = np.interp(normalizada, paradas, componentes[:, canal])
+    imagem[..., 3] = np.where(grade > 0, 80 + 140 * normalizada, 0)
+    # A primeira linha da imagem é o norte
+    return imagem[::-1]
+
+
+def exibir_densidade_trafego():
+    """
+    Gera o mapa de densidade de tráfego do snapshot atual ou dos snapshots exportados de um período.
+    """
+    # Importados aqui para que os processos de consulta aos dados exportados não carreguem a API
+    from snapshot import obter_estados
+    from consulta_exportacao import calcular_densidade_exportacao
+    from lote import ler_horario
+
+    fonte = Prompt.ask(
+        "👉 Fonte dos dados (atual para o snapshot atual, exportados para um período dos dados exportados)",
+        choices=["atual", "exportados"], default="atual",
+    )
+    try:
+        if fonte == "atual":
+            estados = obter_estados()
+            if not estados:
+                console.print("[red]⚠️ Nenhum dado de voo disponível. ⚠️[/red]")
+                return
+            exibir_mapa_densidade(grade_do_snapshot(estados), titulo="Aeronaves no snapshot atual")
+            return
+
+        inicio = ler_horario(Prompt.ask("👉 Digite a data e hora de início (formato: DD/MM/AAAA HH:MM)"))
+        fim = ler_horario(Prompt.ask("👉 Digite a data e hora de fim (formato: DD/MM/AAAA HH:MM)"))
+        ponderar = Prompt.ask("👉 Ponderar pelo tempo passado em cada célula?", choices=["s", "n"], default="s") == "s"
+        console.print("[yellow]🔎 Calculando a densidade dos dados exportados...[/yellow]")
+        grade = calcular_densidade_exportacao({"inicio": inicio, "fim": fim}, ponderar=ponderar)
+        exibir_mapa_densidade(
+            grade, unidade="aeronaves-hora" if ponderar else "posições", titulo="Densidade de tráfego no período",
+        )
+    except ValueError as e:
+        console.print(f"[red]⚠️ Entrada inválida: {e} ⚠️[/red]")
+
+
+def exibir_mapa_densidade(grade, resolucao=DENSIDADE_RESOLUCAO_GRAUS, unidade="aeronaves", titulo="Densidade de tráfego"):
+    """
+    Desenha a grade de densidade como uma camada de imagem num mapa folium e abre no navegador.
+
+    O mapa recebe só a imagem da grade (recortada à região com tráfego), e não as posições: o
+    tamanho do HTML depende da grade, não do número de aeronaves ou de snapshots.
+    """
+    from api import abrir_no_navegador
+
+    linhas, colunas = np.nonzero(grade)
+    if not len(linhas):
+        console.print("[yellow]⚠️ Nenhuma posição para exibir no mapa. ⚠️[/yellow]")
+        return
+
+    # Recorta a grade à região com tráfego, com uma célula de margem
+    lin_ini, lin_fim = max(linhas.min() - 1, 0), min(linhas.max() + 2, grade.shape[0])
+    col_ini, col_fim = max(colunas.min() - 1, 0), min(colunas.max() + 2, grade.shape[1])
+    recorte = grade[lin_ini:lin_fim, col_ini:col_fim]
+    sul, norte = -LATITUDE_MAXIMA + lin_ini * resolucao, -LATITUDE_MAXIMA + lin_fim * resolucao
+    oeste, leste = -180 + col_ini * resolucao, -180 + col_fim * resolucao
+
+    mapa = folium.Map(location=[(sul + norte) / 2, (oeste + leste) / 2], zoom_start=3)
+    folium.raster_layers.ImageOverlay(
+        _imagem(recorte), bounds=[[sul, oeste], [norte, leste]], mercator_project=True, name=titulo,
+    ).add_to(mapa)
+    mapa.fit_bounds([[sul, oeste], [norte, leste]])
+
+    maximo = float(grade.max())
+    escala = LinearColormap(CORES_ESCALA, vmin=0, vmax=np.log1p(maximo),
+                            caption=f"{titulo}: log(1 + {unidade} por célula de {resolucao}°), máximo {maximo:,.1f}")
+    escala.add_to(mapa)
+    folium.LayerControl().add_to(mapa)
+
+    mapa.save(MAPA_DENSIDADE)
+    tamanho = os.path.getsize(MAPA_DENSIDADE) / 1024
+    console.print(
+        f"[green]✅ Mapa de densidade ({recorte.shape[0]}x{recorte.shape[1]} células, {tamanho:,.0f} KB) "
+        f"salvo em '{os.path.abspath(MAPA_DENSIDADE)}'.[/green]"
+    )
+    abrir_no_navegador(os.path.abspath(MAPA_DENSIDADE))
@@ -0,0 +1,109 @@
+from concurrent.futures import ThreadPoolExecutor
+from rich.console import Console
+from api import obter_destino_voo
+import threading
+import time
+import os
+
+# Inicializa o console do rich
+console = Console()
+
+# Tempo de vida de um destino em cache, em segundos. O destino não muda durante uma perna de voo,
+# então o valor pode ser longo; destinos desconhecidos expiram antes para serem buscados de novo.
+DESTINO_CACHE_TTL = float(os.getenv("DESTINO_CACHE_TTL", 12 * 3600))
+DESTINO_CACHE_TTL_DESCONHECIDO = float(os.getenv("DESTINO_CACHE_TTL_DESCONHECIDO", 300))
+
+# Número máximo de requisições simultâneas à ADS-B Exchange
+DESTINO_MAX_CONCORRENCIA = int(os.getenv("DESTINO_MAX_CONCORRENCIA", 8))
+
+# Número máximo de voos exibidos numa lista cujos destinos são consultados na ADS-B Exchange;
+# em listas maiores, só os destinos já em cache são usados e os demais são estimados localmente
+DESTINO_LIMITE_LISTA = int(os.getenv("DESTINO_LIMITE_LISTA", 50))
+
+# Quantidade de entradas a partir da qual os destinos expirados são removidos do cache
+DESTINO_CACHE_LIMPEZA = 10000
+
+# Cache de destinos: (icao24, callsign) -> (destino, instante de expiração)
+_cache_destinos = {}
+_lock_cache = threading.Lock()
+
+def chave_destino(voo):
+    """
+    Retorna o código ICAO (icao24) normalizado que indexa o resultado de buscar_destinos.
+    """
+    return str(voo[0]).strip().lower()
+
+def _chave_perna(voo):
+    """
+    Identifica a perna de voo de um estado: a mesma aeronave com outro callsign é outra perna.
+    """
+    callsign = str(voo[1]).strip().upper() if voo[1] else ""
+    return chave_destino(voo), callsign
+
+def buscar_destinos(voos, max_concorrencia=DESTINO_MAX_CONCORRENCIA, somente_cache=False):
+    """
+    Busca os destinos de uma lista de voos em uma única chamada.
+
+    Os códigos ICAO repetidos são consultados uma só vez, os destinos já conhecidos vêm do
+    cache e os demais são buscados em paralelo na ADS-B Exchange, respeitando o limite de
+    requisições simultâneas.
+
+    Parâmetros:
+    - voos (list): Lista de estados de voo (formato da OpenSky API).
+    - max_concorrencia (int): Número máximo de requisições simultâneas.
+    - somente_cache (bool): Se True, retorna só os destinos já em cache, sem requisições.
+
+    Retorna:
+    - dict: Destino de cada voo, indexado pelo código ICAO normalizado (veja chave_destino).
+    """
+    agora = time.time()
+    destinos = {}
+    pendentes = {}
+
+    with _lock_cache:
+        for voo in voos:
+            if not voo[0]:
+                continue
+            chave = _chave_perna(voo)
+            if chave[0] in destinos or chave[0] in pendentes:
+                continue
+
+            em_cache = _cache_destinos.get(chave)
+            if em_cache and em_cache[1] > agora:
+                destinos[chave[0]] = em_cache[0]
+            else:
+                pendentes[chave[0]] = chave
+
+    if pendentes and not somente_cache:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concorrencia, len(pendentes)))) as executor:
+            resultados = dict(zip(pendentes, executor.map(obter_destino_voo, pendentes)))
+
+        expiracao = time.time()
+        with _lock_cache:
+            if len(_cache_destinos) > DESTINO_CACHE_LIMPEZA:
+                _remover_expirados(expiracao)
+
+            for icao24, destino in resultados.items():
+                ttl = DESTINO_CACHE_TTL if destino and destino != "Desconhecido" else DESTINO_CACHE_TTL_DESCONHECIDO
+                _cache_destinos[pendentes[icao24]] = (destino, expiracao + ttl)
+                destinos[icao24] = destino
+
+    return destinos
+
+def _remover_expirados(agora):
+    """
+    Remove do cache os destinos expirados. Deve ser chamada com o lock do cache adquirido.
+    """
+    for chave in [chave for chave, (_, expira) in _cache_destinos.items() if expira <= agora]:
+        del _cache_destinos[chave]
+
+def buscar_destinos_lista(voos, limite=DESTINO_LIMITE_LISTA, lista_maior=False):
+    """
+    Busca os destinos das linhas exibidas numa lista de voos.
+
+    Até o limite, os destinos que faltam no cache são consultados na ADS-B Exchange numa única
+    chamada em lote; acima dele (ex: todos os voos do snapshot), só o cache é usado, para que
+    exibir uma lista grande não dispare milhares de requisições. Com lista_maior=True (um bloco
+    de uma lista exibida em partes), a lista é considerada acima do limite.
+    """
+    return buscar_destinos(voos, somente_cache=lista_maior or len(voos) > limite)
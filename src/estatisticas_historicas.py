@@ -0,0 +1,101 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+import os
+
+# Abaixo deste número de voos a agregação roda no próprio processo, sem o custo de criar o pool
+MINIMO_VOOS_PARALELO = 50000
+
+def _compactar_voo(voo):
+    """
+    Reduz um voo histórico (dict da OpenSky) a uma tupla com apenas os campos usados nas
+    estatísticas, para diminuir o custo de envio aos processos do pool.
+    """
+    return (
+        voo.get("estDepartureAirport"),
+        voo.get("estArrivalAirport"),
+        voo.get("firstSeen"),
+        voo.get("lastSeen"),
+        voo.get("callsign"),
+    )
+
+def _prefixo_companhia(callsign):
+    """
+    Extrai o designador ICAO da companhia aérea (3 letras iniciais do callsign), ou None.
+    """
+    if not callsign:
+        return None
+    prefixo = callsign.strip()[:3].upper()
+    return prefixo if len(prefixo) == 3 and prefixo.isalpha() else None
+
+def _agregar_bloco(voos):
+    """
+    Agrega um bloco de voos compactados. Executada nos processos do pool.
+
+    Retorna:
+    - tuple: Contadores de movimentos por (aeroporto, hora UTC), de rotas (origem, destino)
+      e de voos por prefixo de companhia.
+    """
+    # Cada contagem é feita com Counter sobre um gerador, que conta em C e é bem mais rápido
+    # que incrementar o contador voo a voo
+    movimentos = Counter((origem, (partida // 3600) % 24) for origem, _, partida, _, _ in voos if origem and partida)
+    movimentos.update((destino, (chegada // 3600) % 24) for _, destino, _, chegada, _ in voos if destino and chegada)
+    rotas = Counter((origem, destino) for origem, destino, _, _, _ in voos if origem and destino)
+
+    # Conta os callsigns distintos primeiro, para extrair o prefixo uma vez por callsign
+    companhias = Counter()
+    for callsign, total in Counter(callsign for _, _, _, _, callsign in voos).items():
+        prefixo = _prefixo_companhia(callsign)
+        if prefixo:
+            companhias[prefixo] += total
+
+    return movimentos, rotas, companhias
+
+def calcular_estatisticas_trafego(voos, processos=None, tamanho_bloco=None):
+    """
+    Calcula as estatísticas de tráfego de uma lista de voos históricos.
+
+    A lista é dividida em blocos agregados em paralelo por um pool de processos, e os
+    resultados parciais são somados no final.
+
+    Parâmetros:
+    - voos (list): Voos históricos, como retornados por buscar_voos_historicos.
+    - processos (int, opcional): Número de processos do pool (padrão: número de CPUs).
+    - tamanho_bloco (int, opcional): Número de voos por bloco (padrão: divide igualmente entre os processos).
+
+    Retorna:
+    - dict: Com as chaves:
+        - "movimentos_por_hora" (dict): Aeroporto -> lista com os 24 totais de movimentos por hora (UTC).
+        - "rotas" (Counter): (origem, destino) -> número de voos.
+        - "companhias" (Counter): Prefixo do callsign -> número de voos.
+        - "total_voos" (int): Número de voos analisados.
+    """
+    compactados = [_compactar_voo(voo) for voo in voos]
+    processos = processos or os.cpu_count() or 1
+
+    if len(compactados) < MINIMO_VOOS_PARALELO or processos == 1:
+        parciais = [_agregar_bloco(compactados)]
+    else:
+        # Alguns blocos por processo equilibram a carga quando um bloco demora mais que outro
+        tamanho_bloco = tamanho_bloco or max(1, -(-len(compactados) // (processos * 4)))
+        blocos = [compactados[i:i + tamanho_bloco] for i in range(0, len(compactados), tamanho_bloco)]
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            parciais = list(executor.map(_agregar_bloco, blocos))
+
+    movimentos = Counter()
+    rotas = Counter()
+    companhias = Counter()
+    for movimentos_bloco, rotas_bloco, companhias_bloco in parciais:
+        movimentos.update(movimentos_bloco)
+        rotas.update(rotas_bloco)
+        companhias.update(companhias_bloco)
+
+    movimentos_por_hora = {}
+    for (aeroporto, hora), total in movimentos.items():
+        movimentos_por_hora.setdefault(aeroporto, [0] * 24)[hora] += total
+
+    return {
+        "movimentos_por_hora": movimentos_por_hora,
+        "rotas": rotas,
+        "companhias": companhias,
+        "total_voos": len(compactados),
+    }
@@ -0,0 +1,351 @@
+from datetime import datetime, timezone
+import threading
+import logging
+import atexit
+import queue
+import gzip
+import time
+import csv
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Formato dos arquivos exportados: "parquet", "arrow" (Arrow IPC/Feather) ou vazio para desativar
+EXPORTACAO_FORMATO = os.getenv("EXPORTACAO_FORMATO", "").lower()
+
+# Se ativado, grava também uma cópia em CSV compactado (gzip)
+EXPORTACAO_CSV = os.getenv("EXPORTACAO_CSV", "0").lower() in ("1", "true", "sim", "s")
+
+# Diretório raiz dos dados exportados
+EXPORTACAO_DIR = os.getenv("EXPORTACAO_DIR", os.path.join(os.path.dirname(__file__), '..', 'exportacao'))
+
+# Linhas acumuladas por conjunto de dados antes de gravar um bloco (row group) no arquivo
+EXPORTACAO_LINHAS_LOTE = int(os.getenv("EXPORTACAO_LINHAS_LOTE", 100000))
+
+# Intervalo máximo (s) que as linhas ficam em memória antes de serem gravadas
+EXPORTACAO_INTERVALO_GRAVACAO = float(os.getenv("EXPORTACAO_INTERVALO_GRAVACAO", 60))
+
+# Tempo máximo (s) e número máximo de linhas de um arquivo aberto: ao passar de qualquer um deles, o
+# arquivo é fechado e recebe o nome final, e as linhas seguintes vão para um novo arquivo da partição.
+# Um arquivo ainda aberto não pode ser lido, então este é o máximo de dados perdidos se o programa cair
+EXPORTACAO_INTERVALO_ARQUIVO = float(os.getenv("EXPORTACAO_INTERVALO_ARQUIVO", 300))
+EXPORTACAO_LINHAS_ARQUIVO = int(os.getenv("EXPORTACAO_LINHAS_ARQUIVO", 1000000))
+
+# Número máximo de lotes aguardando gravação; se a fila encher, os lotes novos são descartados
+EXPORTACAO_FILA_MAXIMA = int(os.getenv("EXPORTACAO_FILA_MAXIMA", 64))
+
+# Se ativado, aplica os níveis de retenção (compactacao.py) a cada troca de hora, em segundo plano
+COMPACTACAO_AUTOMATICA = os.getenv("COMPACTACAO_AUTOMATICA", "0").lower() in ("1", "true", "sim", "s")
+
+# Colunas de cada conjunto de dados exportado e o tipo Arrow de cada uma
+ESQUEMAS = {
+    "estados": [
+        ("horario", "int64"),
+        ("icao24", "string"),
+        ("callsign", "string"),
+        ("origin_country", "string"),
+        ("time_position", "int64"),
+        ("last_contact", "int64"),
+        ("longitude", "float64"),
+        ("latitude", "float64"),
+        ("baro_altitude", "float64"),
+        ("on_ground", "bool"),
+        ("velocity", "float64"),
+        ("true_track", "float64"),
+        ("vertical_rate", "float64"),
+        ("geo_altitude", "float64"),
+        ("squawk", "string"),
+        ("spi", "bool"),
+        ("position_source", "int8"),
+    ],
+    "aeronaves_proximas": [
+        ("horario", "int64"),
+        ("centro_lat", "float64"),
+        ("centro_lon", "float64"),
+        ("distancia_nm", "float64"),
+        ("icao", "string"),
+        ("callsign", "string"),
+        ("lat", "float64"),
+        ("lon", "float64"),
+        ("altitude_pes", "float64"),
+        ("velocidade", "float64"),
+        ("direcao", "float64"),
+    ],
+}
+
+
+class _ArquivoParticao:
+    """
+    Arquivo de uma parte de uma partição (conjunto de dados + hora) aberto para acréscimo.
+
+    Os arquivos Parquet e Arrow são gravados com a extensão ".tmp" e renomeados ao serem
+    fechados, para que as ferramentas de leitura nunca encontrem um arquivo incompleto. O
+    exportador fecha cada parte depois de alguns minutos ou linhas (e na troca de hora), então
+    uma queda do programa perde só a parte aberta; a compactação une as partes de cada hora
+    depois. O CSV recebe um novo bloco gzip a cada gravação.
+    """
+
+    def __init__(self, raiz, conjunto, particao, formato, csv_ativo, esquema):
+        nome = f"parte-{int(time.time() * 1000)}-{os.getpid()}"
+        diretorio = os.path.join(raiz, conjunto, *particao.split("/"))
+        self.conjunto = conjunto
+        self.esquema = esquema
+        self.aberto_em = time.time()
+        self.linhas = 0
+        self._escritor = None
+        self._caminho = None
+        self._csv = None
+
+        # O CSV fica numa árvore separada, para que as leituras do diretório colunar não encontrem outro formato
+        if csv_ativo:
+            diretorio_csv = os.path.join(raiz, "csv", conjunto, *particao.split("/"))
+            os.makedirs(diretorio_csv, exist_ok=True)
+            self._csv = os.path.join(diretorio_csv, f"{nome}.csv.gz")
+
+        if formato:
+            os.makedirs(diretorio, exist_ok=True)
+        if formato == "parquet":
+            self._caminho = os.path.join(diretorio, f"{nome}.parquet")
+            self._escritor = pq.ParquetWriter(f"{self._caminho}.tmp", esquema, compression="zstd")
+        elif formato == "arrow":
+            self._caminho = os.path.join(diretorio, f"{nome}.arrow")
+            opcoes = pa_ipc.IpcWriteOptions(compression="zstd")
+            self._escritor = pa_ipc.new_file(f"{self._caminho}.tmp", esquema, options=opcoes)
+
+    def gravar(self, colunas):
+        self.linhas += len(colunas[0])
+        if self._escritor is not None:
+            tabela = pa.Table.from_pydict(dict(zip(self.esquema.names, colunas)), schema=self.esquema)
+            self._escritor.write_table(tabela)
+
+        if self._csv is not None:
+            novo = not os.path.exists(self._csv)
+            with gzip.open(self._csv, "at", newline="", encoding="utf-8") as arquivo:
+                escritor = csv.writer(arquivo)
+                if novo:
+                    escritor.writerow([nome for nome, _ in ESQUEMAS[self.conjunto]])
+                escritor.writerows(zip(*colunas))
+
+    def fechar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+            os.replace(f"{self._caminho}.tmp", self._caminho)
+            self._escritor = None
+
+
+class ExportadorSnapshots:
+    """
+    Exporta os snapshots de estados e os resultados do monitoramento para arquivos colunares
+    compactados (Parquet ou Arrow IPC) e, opcionalmente, CSV.
+
+    Os dados são particionados por hora (UTC) no formato "conjunto/data=AAAA-MM-DD/hora=HH/"
+    (e "csv/conjunto/..." para o CSV),
+    lido diretamente por pandas, pyarrow e DuckDB (ex: read_parquet('exportacao/estados/**/*.parquet',
+    hive_partitioning=true)). Quem busca os dados só coloca o lote numa fila limitada, sem
+    esperar pela gravação nem montar as linhas; uma thread monta as linhas, acumula e grava em
+    blocos, fechando um arquivo (parte) a cada EXPORTACAO_INTERVALO_ARQUIVO segundos ou
+    EXPORTACAO_LINHAS_ARQUIVO linhas.
+    """
+
+    def __init__(self, diretorio=EXPORTACAO_DIR, formato=EXPORTACAO_FORMATO, csv_ativo=EXPORTACAO_CSV,
+                 linhas_lote=EXPORTACAO_LINHAS_LOTE, intervalo_gravacao=EXPORTACAO_INTERVALO_GRAVACAO,
+                 intervalo_arquivo=EXPORTACAO_INTERVALO_ARQUIVO, linhas_arquivo=EXPORTACAO_LINHAS_ARQUIVO,
+                 fila_maxima=EXPORTACAO_FILA_MAXIMA):
+        if formato in ("parquet", "arrow") and pa is None:
+            logging.error("Exportação em Parquet/Arrow requer o pacote pyarrow; exportando apenas em CSV.")
+            formato, csv_ativo = "", True
+        self.diretorio = diretorio
+        self.formato = formato if formato in ("parquet", "arrow") else ""
+        self.csv_ativo = csv_ativo
+        self.linhas_lote = linhas_lote
+        self.intervalo_gravacao = intervalo_gravacao
+        self.intervalo_arquivo = intervalo_arquivo
+        self.linhas_arquivo = linhas_arquivo
+        self.descartados = 0
+        self._fila = queue.Queue(maxsize=fila_maxima)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._compactacao = None
+        self._ultimo_snapshot = None
+        self._esquemas = {}
+        if pa is not None:
+            self._esquemas = {
+                conjunto: pa.schema([(nome, pa.type_for_alias(tipo)) for nome, tipo in colunas])
+                for conjunto, colunas in ESQUEMAS.items()
+            }
+
+    @property
+    def ativo(self):
+        return bool(self.formato or self.csv_ativo)
+
+    def exportar_estados(self, estados, horario=None):
+        """
+        Enfileira um snapshot de estados (formato da OpenSky API) para exportação.
+
+        O mesmo snapshot (mesmo horário) é exportado uma única vez, mesmo que a resposta da API
+        seja reaproveitada por várias buscas. Só a referência ao snapshot vai para a fila; as
+        linhas são montadas pela thread de gravação.
+        """
+        horario = int(horario or time.time())
+        if not self.ativo or not estados or horario == self._ultimo_snapshot:
+            return
+        self._ultimo_snapshot = horario
+        self._enfileirar("estados", horario, _linhas_estados, (estados,))
+
+    def exportar_aeronaves_proximas(self, aeronaves, lat, lon, distancia, horario=None):
+        """
+        Enfileira o resultado de uma busca de aeronaves próximas (formato da ADS-B Exchange) para exportação.
+        """
+        horario = int(horario or time.time())
+        if not self.ativo or not aeronaves:
+            return
+        self._enfileirar("aeronaves_proximas", horario, _linhas_aeronaves_proximas, (aeronaves, lat, lon, distancia))
+
+    def _enfileirar(self, conjunto, horario, montar_linhas, dados):
+        self._iniciar()
+        try:
+            self._fila.put_nowait((conjunto, horario, montar_linhas, dados))
+        except queue.Full:
+            # Nunca bloqueia quem está buscando os dados: se a gravação estiver atrasada, o lote é descartado
+            self.descartados += 1
+            logging.error(f"Fila de exportação cheia; lote de {conjunto} descartado ({self.descartados} até agora).")
+
+    def _iniciar(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, daemon=True)
+                self._thread.start()
+                atexit.register(self.encerrar)
+
+    def encerrar(self):
+        """
+        Grava as linhas pendentes e fecha os arquivos abertos.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._fila.put(None)
+            thread.join()
+
+    def _executar(self):
+        pendentes = {}   # conjunto -> (partição, linhas acumuladas)
+        arquivos = {}    # conjunto -> (partição, _ArquivoParticao)
+        ultima_gravacao = time.time()
+
+        while True:
+            try:
+                item = self._fila.get(timeout=1)
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                break
+
+            if item:
+                conjunto, horario, montar_linhas, dados = item
+                try:
+                    linhas = montar_linhas(horario, *dados)
+                except Exception as e:
+                    logging.error(f"Erro ao preparar as linhas de {conjunto} para exportação: {e}")
+                    continue
+                particao = datetime.fromtimestamp(horario, timezone.utc).strftime("data=%Y-%m-%d/hora=%H")
+                atual = pendentes.get(conjunto)
+                # Mudou a hora: grava o que havia da hora anterior e fecha o arquivo dela
+                if atual is not None and atual[0] != particao:
+                    self._gravar(conjunto, atual, arquivos)
+                    self._fechar(conjunto, arquivos)
+                    self._compactar()
+                    atual = None
+                if atual is None:
+                    atual = pendentes[conjunto] = (particao, [])
+                atual[1].extend(linhas)
+                if len(atual[1]) >= self.linhas_lote:
+                    self._gravar(conjunto, atual, arquivos)
+
+            if time.time() - ultima_gravacao >= self.intervalo_gravacao:
+                for conjunto, atual in pendentes.items():
+                    self._gravar(conjunto, atual, arquivos)
+                ultima_gravacao = time.time()
+
+            # Fecha as partes abertas há muito tempo ou já grandes, para que os dados fiquem legíveis
+            for conjunto, (_, aberto) in list(arquivos.items()):
+                if time.time() - aberto.aberto_em >= self.intervalo_arquivo or aberto.linhas >= self.linhas_arquivo:
+                    self._fechar(conjunto, arquivos)
+
+        for conjunto, atual in pendentes.items():
+            self._gravar(conjunto, atual, arquivos)
+        for conjunto in list(arquivos):
+            self._fechar(conjunto, arquivos)
+
+    def _gravar(self, conjunto, pendente, arquivos):
+        particao, linhas = pendente
+        if not linhas:
+            return
+        try:
+            aberto = arquivos.get(conjunto)
+            if aberto is None or aberto[0] != particao:
+                self._fechar(conjunto, arquivos)
+                aberto = arquivos[conjunto] = (particao, _ArquivoParticao(
+                    self.diretorio, conjunto, particao, self.formato, self.csv_ativo, self._esquemas.get(conjunto)))
+            aberto[1].gravar([list(coluna) for coluna in zip(*linhas)])
+        except Exception as e:
+            logging.error(f"Erro ao exportar {len(linhas)} linhas de {conjunto}: {e}")
+        finally:
+            linhas.clear()
+
+    def _compactar(self):
+        """
+        Dispara a compactação dos dados antigos numa thread própria, sem atrasar as gravações.
+        """
+        if not COMPACTACAO_AUTOMATICA or not self.formato:
+            return
+        if self._compactacao is not None and self._compactacao.is_alive():
+            return
+        # Importado aqui porque o módulo de compactação depende deste
+        from compactacao import compactar
+        self._compactacao = threading.Thread(target=compactar, args=(self.diretorio,), daemon=True)
+        self._compactacao.start()
+
+    def _fechar(self, conjunto, arquivos):
+        aberto = arquivos.pop(conjunto, None)
+        if aberto is not None:
+            try:
+                aberto[1].fechar()
+            except Exception as e:
+                logging.error(f"Erro ao fechar o arquivo exportado de {conjunto}: {e}")
+
+
+def _linhas_estados(horario, estados):
+    return [
+        (horario, voo[0], (voo[1] or "").strip() or None, voo[2], voo[3], voo[4], voo[5], voo[6], voo[7],
+         voo[8], voo[9], voo[10], voo[11], voo[13], voo[14], voo[15], voo[16])
+        for voo in estados if len(voo) > 16
+    ]
+
+
+def _linhas_aeronaves_proximas(horario, aeronaves, lat, lon, distancia):
+    return [
+        (horario, float(lat), float(lon), float(distancia), a.get("hex") or a.get("icao"),
+         (a.get("call") or "").strip() or None, _numero(a.get("lat")), _numero(a.get("lon")),
+         _numero(a.get("alt")), _numero(a.get("spd")), _numero(a.get("trak")))
+        for a in aeronaves
+    ]
+
+
+def _numero(valor):
+    """
+    Converte um campo numérico da ADS-B Exchange (que pode vir como texto) em float, ou None.
+    """
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+# Exportador compartilhado pelas buscas da API
+exportador = ExportadorSnapshots()
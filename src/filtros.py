@@ -1,7 +1,10 @@
 from rich.console import Console
-from api import buscar_estados_opensky, monitorar_aeronaves_tempo_real, buscar_aeronaves_proximas
+from api import monitorar_aeronaves_tempo_real, buscar_aeronaves_proximas
+from snapshot import obter_estados
+from conflitos import detectar_conflitos, exibir_conflitos
+from anomalias import detector_anomalias, exibir_eventos_anomalias
 from consultas import buscar_voos_por_pais
-from utils import exibir_lista_voos, tentar_novamente, filtrar_voos
+from utils import exibir_lista_voos, tentar_novamente, cache_filtros, espiar_voos
 from menus import exibir_menu_origem
 import time
 
@@ -14,7 +17,7 @@ def filtrar_por_altitude(estados=None):
     """
     while True:
         if estados is None:
-            estados = buscar_estados_opensky()
+            estados = obter_estados()
 
         if estados is None:
             console.print("[red]⚠️ Nenhum dado de voo disponível. ⚠️[/red]")
@@ -30,9 +33,10 @@ def filtrar_por_altitude(estados=None):
                 continue
 
             # Filtra os voos com base na altitude
-            voos_filtrados = filtrar_voos(estados, lambda voo: voo[7] and voo[7] >= altitude_minima)
+            voos_filtrados = espiar_voos(cache_filtros.filtrar(
+                estados, "altitude_minima", (altitude_minima,), lambda voo: voo[7] and voo[7] >= altitude_minima))
 
-            if not voos_filtrados:
+            if voos_filtrados is None:
                 console.print("[yellow]⚠️ Nenhum voo encontrado com a altitude solicitada. ⚠️[/yellow]")
             else:
                 console.print(f"[green]✈️ Exibindo voos com altitude mínima de {altitude_minima} metros:[/green]")
@@ -50,7 +54,7 @@ def filtrar_por_origem():
     Filtra os voos por origem (nacional ou internacional).
     """
     while True:
-        estados = buscar_estados_opensky()
+        estados = obter_estados()
 
         if estados is None:
             console.print("[red]⚠️ Nenhum dado de voo disponível. ⚠️[/red]")
@@ -60,16 +64,16 @@ def filtrar_por_origem():
         opcao = console.input("[cyan]👉 Escolha uma opção (1 a 3): [/cyan]").strip()
 
         if opcao == "1":
-            voos_internacionais = [voo for voo in estados if voo[2] != 'Brazil']
-            if voos_internacionais:
+            voos_internacionais = espiar_voos(cache_filtros.filtrar(estados, "pais_diferente", ("Brazil",), lambda voo: voo[2] != 'Brazil'))
+            if voos_internacionais is not None:
                 console.print("[green]✈️ Exibindo voos internacionais:[/green]")
                 exibir_lista_voos(voos_internacionais)
             else:
                 console.print("[yellow]⚠️ Nenhum voo internacional encontrado. ⚠️[/yellow]")
 
         elif opcao == "2":
-            voos_nacionais = buscar_voos_por_pais(estados, "Brazil")
-            if voos_nacionais:
+            voos_nacionais = espiar_voos(buscar_voos_por_pais(estados, "Brazil"))
+            if voos_nacionais is not None:
                 console.print("[green]✈️ Exibindo voos nacionais (do Brasil):[/green]")
                 exibir_lista_voos(voos_nacionais)
             else:
@@ -90,7 +94,7 @@ def mostrar_voos_com_altitude_conhecida():
     Filtra e exibe apenas os voos que possuem uma altitude conhecida.
     """
     while True:
-        estados = buscar_estados_opensky()
+        estados = obter_estados()
 
         if estados is None:
             console.print("[red]⚠️ Nenhum dado de voo disponível. ⚠️[/red]")
@@ -99,9 +103,9 @@ def mostrar_voos_com_altitude_conhecida():
             else:
                 continue
 
-        voos_com_altitude_conhecida = filtrar_voos(estados, lambda voo: voo[7] is not None)
+        voos_com_altitude_conhecida = espiar_voos(cache_filtros.filtrar(estados, "altitude_conhecida", (), lambda voo: voo[7] is not None))
 
-        if not voos_com_altitude_conhecida:
+        if voos_com_altitude_conhecida is None:
             console.print("[yellow]⚠️ Nenhum voo com altitude conhecida encontrado. ⚠️[/yellow]")
         else:
             console.print("[green]✈️ Exibindo voos com altitude conhecida:[/green]")
@@ -115,15 +119,15 @@ def mostrar_voos_com_altitude_desconhecida():
     Filtra e exibe apenas os voos que possuem uma altitude desconhecida.
     """
     while True:
-        estados = buscar_estados_opensky()
+        estados = obter_estados()
 
         if estados is None:
             console.print("[red]⚠️ Nenhum dado de voo disponível. ⚠️[/red]")
             return
 
-        voos_com_altitude_desconhecida = filtrar_voos(estados, lambda voo: voo[7] is None)
+        voos_com_altitude_desconhecida = espiar_voos(cache_filtros.filtrar(estados, "altitude_desconhecida", (), lambda voo: voo[7] is None))
 
-        if not voos_com_altitude_desconhecida:
+        if voos_com_altitude_desconhecida is None:
             console.print("[yellow]⚠️ Nenhum voo com altitude desconhecida encontrado. ⚠️[/yellow]")
         else:
             console.print("[green]✈️ Exibindo voos com altitude desconhecida:[/green]")
@@ -137,7 +141,7 @@ def filtrar_por_velocidade():
     Filtra os voos com base na velocidade mínima ou máxima fornecida pelo usuário.
     """
     while True:
-        estados = buscar_estados_opensky()
+        estados = obter_estados()
 
         if estados is None:
             console.print("[red]⚠️ Nenhum dado de voo disponível. ⚠️[/red]")
@@ -158,11 +162,12 @@ def filtrar_por_velocidade():
                 continue
 
             if tipo_velocidade == "min":
-                voos_filtrados = filtrar_voos(estados, lambda voo: voo[9] and voo[9] >= velocidade)
+                voos_filtrados = cache_filtros.filtrar(estados, "velocidade_minima", (velocidade,), lambda voo: voo[9] and voo[9] >= velocidade)
             else:
-                voos_filtrados = filtrar_voos(estados, lambda voo: voo[9] and voo[9] <= velocidade)
+                voos_filtrados = cache_filtros.filtrar(estados, "velocidade_maxima", (velocidade,), lambda voo: voo[9] and voo[9] <= velocidade)
+            voos_filtrados = espiar_voos(voos_filtrados)
 
-            if not voos_filtrados:
+            if voos_filtrados is None:
                 console.print("[yellow]⚠️ Nenhum voo encontrado com a velocidade solicitada. ⚠️[/yellow]")
             else:
                 console.print(f"[green]✈️ Exibindo voos com velocidade {'mínima' if tipo_velocidade == 'min' else 'máxima'} de {velocidade} km/h:[/green]")
@@ -179,7 +184,7 @@ def filtrar_por_direcao():
     Filtra os voos com base na direção (norte, sul, leste, oeste).
     """
     while True:
-        estados = buscar_estados_opensky()
+        estados = obter_estados()
 
         if estados is None:
             console.print("[red]⚠️ Nenhum dado de voo disponível. ⚠️[/red]")
@@ -203,9 +208,9 @@ def filtrar_por_direcao():
             elif direcao == "oeste":
                 condicao = lambda voo: voo[10] is not None and (225 <= voo[10] < 315)
 
-            voos_filtrados = [voo for voo in estados if condicao(voo)]
+            voos_filtrados = espiar_voos(cache_filtros.filtrar(estados, "direcao", (direcao,), condicao))
 
-            if not voos_filtrados:
+            if voos_filtrados is None:
                 console.print(f"[yellow]⚠️ Nenhum voo encontrado na direção {direcao}. ⚠️[/yellow]")
             else:
                 console.print(f"[green]✈️ Exibindo voos na direção {direcao}:[/green]")
@@ -241,6 +246,7 @@ def monitorar_aeronaves():
         console.print("[yellow]Iniciando monitoramento de aeronaves...[/yellow]")
         console.print(f"[cyan]Latitude: {lat}, Longitude: {lon}, Distância: {distancia} NM, Intervalo: {intervalo} segundos[/cyan]")
 
+        ultimo_evento = None
         while True:
             console.print("[yellow]Buscando aeronaves próximas...[/yellow]")
             aeronaves = buscar_aeronaves_proximas(lat, lon, distancia)
@@ -265,6 +271,17 @@ def monitorar_aeronaves():
             else:
                 console.print("[yellow]Nenhuma aeronave encontrada.[/yellow]")
 
+            # Verifica, a cada atualização, os pares de aeronaves abaixo das separações mínimas em todo o snapshot
+            estados = obter_estados()
+            if estados:
+                exibir_conflitos(detectar_conflitos(estados))
+
+            # Exibe as anomalias detectadas desde a última atualização (o detector processa cada novo snapshot em segundo plano)
+            eventos = detector_anomalias.obter_eventos(desde=ultimo_evento)
+            if eventos:
+                exibir_eventos_anomalias(eventos)
+                ultimo_evento = eventos[-1]["horario"]
+
             # Pergunta ao usuário se deseja continuar
             continuar = console.input("[cyan]👉 Deseja continuar o monitoramento? (s/n): [/cyan]").strip().lower()
             if continuar != 's':
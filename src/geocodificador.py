@@ -0,0 +1,419 @@
+from geopy.geocoders import Nominatim
+from rich.console import Console
+import unicodedata
+import threading
+import logging
+import numpy as np
+import csv
+import os
+
+# Inicializa o console do rich
+console = Console()
+
+# Diretório com o gazetteer incluído no projeto (cidades, países e aeroportos)
+DADOS_DIR = os.path.join(os.path.dirname(__file__), '..', 'dados')
+
+# Se ativado, o Nominatim é consultado quando a base offline não tem uma resposta boa o bastante
+GEOCODIFICACAO_ONLINE = os.getenv("GEOCODIFICACAO_ONLINE", "0").lower() in ("1", "true", "sim", "s")
+
+# Distância máxima, em km, para descrever um ponto apenas pelo nome da cidade mais próxima
+RAIO_CIDADE_KM = 30.0
+
+RAIO_TERRA_KM = 6371.0
+
+
+class GradeEsferica:
+    """
+    Grade de células de latitude/longitude com os pontos de cada célula em faixas contíguas
+    (formato CSR), para montar de forma vetorizada os pares (posição, ponto) das células vizinhas.
+    """
+
+    def __init__(self, lat, lon, tamanho_celula):
+        self.tamanho = tamanho_celula
+        self.linhas = int(np.ceil(180.0 / tamanho_celula))
+        self.colunas = int(np.ceil(360.0 / tamanho_celula))
+
+        celulas = self._celula(*self._indices(lat, lon))
+        self.ordem = np.argsort(celulas, kind="stable")
+        self.celulas_ordenadas = celulas[self.ordem]
+
+    def _indices(self, lat, lon):
+        linha = np.clip(((lat + 90.0) // self.tamanho).astype(np.int64), 0, self.linhas - 1)
+        coluna = (((lon + 180.0) // self.tamanho).astype(np.int64)) % self.colunas
+        return linha, coluna
+
+    def _celula(self, linha, coluna):
+        return linha * self.colunas + coluna
+
+    def pares_vizinhos(self, lat, lon, anel=1, anel_colunas=None):
+        """
+        Retorna os pares (índice da posição, índice do ponto) para todos os pontos nas células
+        até `anel` células de distância da célula de cada posição (em longitude, até `anel_colunas`
+        células, se informado: as células ficam mais estreitas em direção aos polos).
+        """
+        anel_colunas = min(anel if anel_colunas is None else anel_colunas, self.colunas // 2)
+        linha, coluna = self._indices(lat, lon)
+        deslocamentos_linhas = np.arange(-anel, anel + 1)
+        deslocamentos_colunas = np.arange(-anel_colunas, anel_colunas + 1)
+        linhas_vizinhas = np.clip(linha[:, None, None] + deslocamentos_linhas[None, :, None], 0, self.linhas - 1)
+        colunas_vizinhas = (coluna[:, None, None] + deslocamentos_colunas[None, None, :]) % self.colunas
+        vizinhas = self._celula(linhas_vizinhas, colunas_vizinhas).reshape(len(lat), -1)
+
+        # Perto dos polos o clip repete células; cada célula deve contar uma única vez por posição
+        vizinhas.sort(axis=1)
+        repetidas = np.zeros(vizinhas.shape, dtype=bool)
+        repetidas[:, 1:] = vizinhas[:, 1:] == vizinhas[:, :-1]
+
+        inicio = np.searchsorted(self.celulas_ordenadas, vizinhas, side="left")
+        fim = np.searchsorted(self.celulas_ordenadas, vizinhas, side="right")
+        contagem = np.where(repetidas, 0, fim - inicio).ravel()
+
+        total = int(contagem.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        # Expande cada faixa [inicio, fim) em índices individuais sem laço em Python
+        origens = np.repeat(np.repeat(np.arange(len(lat)), vizinhas.shape[1]), contagem)
+        deslocamento_faixa = np.repeat(np.cumsum(contagem) - contagem, contagem)
+        posicoes = np.repeat(inicio.ravel(), contagem) + (np.arange(total) - deslocamento_faixa)
+        return origens, self.ordem[posicoes]
+
+
+class IndiceProximidade:
+    """
+    Índice vetorizado (numpy) do ponto mais próximo de cada uma de muitas posições de uma vez.
+
+    As posições perto de algum ponto são resolvidas por grades finas: cada posição só é comparada
+    com os pontos das células vizinhas. As demais (ex: sobre o oceano) usam uma grade grossa em
+    que cada célula guarda a lista dos únicos pontos que podem ser o mais próximo de alguma
+    posição dentro dela: os que estão a no máximo (distância do centro da célula ao ponto mais
+    próximo) + 2 × (raio da célula) do centro. Essas listas são calculadas na primeira vez que uma
+    célula é consultada e reaproveitadas depois. As comparações usam vetores unitários na esfera,
+    sem distorções perto dos polos ou da linha de data.
+    """
+
+    def __init__(self, lat, lon, tamanhos_celula=(0.5, 1.0), tamanho_celula_remota=2.0):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.vetores = vetores_unitarios(self.lat, self.lon)
+        self._grades = [GradeEsferica(self.lat, self.lon, tamanho) for tamanho in tamanhos_celula]
+        self._grade_remota = GradeEsferica(self.lat, self.lon, tamanho_celula_remota)
+        celulas = self._grade_remota.linhas * self._grade_remota.colunas
+        # Listas de candidatos das células grossas já calculadas, em faixas contíguas (formato CSR)
+        self._inicio_remoto = np.full(celulas, -1, dtype=np.int64)
+        self._fim_remoto = np.full(celulas, -1, dtype=np.int64)
+        self._candidatos_remotos = np.empty(0, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def mais_proximos(self, lat, lon):
+        """
+        Calcula, de forma vetorizada, o ponto mais próximo de cada posição.
+
+        Retorna:
+        - tuple: Índices dos pontos (np.ndarray) e distâncias em km (np.ndarray).
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        vetores = vetores_unitarios(lat, lon)
+        melhores = np.full(len(lat), -1, dtype=np.int64)
+        distancias = np.full(len(lat), np.inf)
+        pendentes = np.arange(len(lat))
+
+        for grade in self._grades:
+            posicoes, candidatos = grade.pares_vizinhos(lat[pendentes], lon[pendentes], anel=1)
+            self._escolher(vetores, pendentes, posicoes, candidatos, melhores, distancias)
+
+            # O resultado da vizinhança só é garantido se o ponto estiver mais perto que a borda
+            # das células vizinhas; as demais posições seguem para a próxima etapa
+            raio_garantido = RAIO_TERRA_KM * np.radians(grade.tamanho) * np.maximum(np.cos(np.radians(np.abs(lat[pendentes]) + grade.tamanho)), 0.0)
+            pendentes = pendentes[distancias[pendentes] > raio_garantido]
+            if len(pendentes) == 0:
+                return melhores, distancias
+
+        # Posições longe de qualquer ponto: candidatos da célula grossa de cada uma
+        linha, coluna = self._grade_remota._indices(lat[pendentes], lon[pendentes])
+        celulas = self._grade_remota._celula(linha, coluna)
+        inicio, fim, candidatos_remotos = self._listas_remotas(celulas)
+        contagem = fim - inicio
+        total = int(contagem.sum())
+        posicoes = np.repeat(np.arange(len(pendentes)), contagem)
+        deslocamento_faixa = np.repeat(np.cumsum(contagem) - contagem, contagem)
+        candidatos = candidatos_remotos[np.repeat(inicio, contagem) + (np.arange(total) - deslocamento_faixa)]
+        self._escolher(vetores, pendentes, posicoes, candidatos, melhores, distancias)
+        return melhores, distancias
+
+    def _escolher(self, vetores, pendentes, posicoes, candidatos, melhores, distancias):
+        """
+        Entre os pares (posição pendente, ponto candidato), guarda o ponto mais próximo de cada posição.
+        """
+        if len(posicoes) == 0:
+            return
+        produto = np.einsum("ij,ij->i", vetores[pendentes[posicoes]], self.vetores[candidatos])
+        melhor = melhor_por_grupo(posicoes, produto)
+        resolvidas = pendentes[posicoes[melhor]]
+        melhores[resolvidas] = candidatos[melhor]
+        distancias[resolvidas] = similaridade_para_km(produto[melhor])
+
+    def _listas_remotas(self, celulas):
+        """
+        Retorna as faixas (início, fim) das listas de candidatos das células e o vetor com as listas,
+        calculando antes as listas das células ainda não consultadas.
+        """
+        with self._lock:
+            novas = np.unique(celulas[self._inicio_remoto[celulas] < 0])
+            if len(novas):
+                self._calcular_listas_remotas(novas)
+            return self._inicio_remoto[celulas], self._fim_remoto[celulas], self._candidatos_remotos
+
+    def _calcular_listas_remotas(self, celulas):
+        grade = self._grade_remota
+        metade = grade.tamanho / 2
+        lat_centro = np.minimum(-90.0 + (celulas // grade.colunas + 0.5) * grade.tamanho, 90.0)
+        lon_centro = -180.0 + (celulas % grade.colunas + 0.5) * grade.tamanho
+        centros = vetores_unitarios(lat_centro, lon_centro)
+
+        # Raio da célula: maior distância do centro até um dos cantos
+        raio = np.zeros(len(celulas))
+        for dlat in (-metade, metade):
+            for dlon in (-metade, metade):
+                cantos = vetores_unitarios(np.clip(lat_centro + dlat, -90.0, 90.0), lon_centro + dlon)
+                raio = np.maximum(raio, similaridade_para_km(np.einsum("ij,ij->i", centros, cantos)))
+
+        listas = [self._candidatos_remotos]
+        total = len(self._candidatos_remotos)
+        for inicio in range(0, len(celulas), 128):
+            bloco = slice(inicio, inicio + 128)
+            produto = centros[bloco] @ self.vetores.T
+            mais_proximo = similaridade_para_km(produto.max(axis=1))
+            # Pontos a até (mais próximo + 2 raios) do centro, com uma pequena folga numérica
+            angulo = np.minimum((mais_proximo + 2 * raio[bloco] + 1.0) / RAIO_TERRA_KM, np.pi)
+            linhas, candidatos = np.nonzero(produto >= np.cos(angulo)[:, None])
+            contagem = np.bincount(linhas, minlength=produto.shape[0])
+            self._inicio_remoto[celulas[bloco]] = total + np.cumsum(contagem) - contagem
+            self._fim_remoto[celulas[bloco]] = total + np.cumsum(contagem)
+            listas.append(candidatos.astype(np.int64))
+            total += len(candidatos)
+        self._candidatos_remotos = np.concatenate(listas)
+
+
+class GeocodificadorOffline:
+    """
+    Geocodificação sem rede, a partir do gazetteer incluído no diretório dados/.
+
+    - Busca reversa (coordenadas -> lugar) por índices vetorizados de cidades e de aeroportos,
+      que resolvem uma posição ou um lote inteiro de posições de uma vez.
+    - Busca direta (nome -> coordenadas) por um índice de nomes normalizados
+      (sem acentos e sem diferenciar maiúsculas) de cidades, países e aeroportos.
+    """
+
+    def __init__(self, diretorio=DADOS_DIR):
+        self.paises = {}
+        self.cidades = []
+        self.aeroportos = []
+        self._indice_nomes = {}
+
+        with open(os.path.join(diretorio, "paises.csv"), encoding="utf-8") as arquivo:
+            for linha in csv.DictReader(arquivo):
+                self.paises[linha["codigo"]] = linha["nome"]
+                lugar = {"tipo": "pais", "nome": linha["nome"], "pais": linha["nome"], "codigo_pais": linha["codigo"],
+                         "lat": float(linha["lat"]), "lon": float(linha["lon"]), "populacao": float("inf")}
+                self._indexar(linha["nome"], lugar)
+                self._indexar(linha["codigo"], lugar)
+
+        with open(os.path.join(diretorio, "cidades.csv"), encoding="utf-8") as arquivo:
+            for linha in csv.DictReader(arquivo):
+                lugar = {"tipo": "cidade", "nome": linha["nome"], "pais": self.paises.get(linha["pais"], linha["pais"]),
+                         "codigo_pais": linha["pais"], "lat": float(linha["lat"]), "lon": float(linha["lon"]),
+                         "populacao": int(linha["populacao"])}
+                self.cidades.append(lugar)
+                self._indexar(linha["nome"], lugar)
+
+        with open(os.path.join(diretorio, "aeroportos.csv"), encoding="utf-8") as arquivo:
+            for linha in csv.DictReader(arquivo):
+                lugar = {"tipo": "aeroporto", "nome": linha["nome"], "icao": linha["icao"], "iata": linha["iata"],
+                         "cidade": linha["cidade"], "pais": self.paises.get(linha["pais"], linha["pais"]),
+                         "codigo_pais": linha["pais"], "lat": float(linha["lat"]), "lon": float(linha["lon"]),
+                         "elevacao": float(linha["elevacao"] or 0), "populacao": 0}
+                self.aeroportos.append(lugar)
+                self._indexar(linha["nome"], lugar)
+                self._indexar(linha["icao"], lugar)
+                self._indexar(linha["iata"], lugar)
+
+        # Em nomes repetidos, o lugar mais importante (país, depois cidade mais populosa) vem primeiro
+        for lugares in self._indice_nomes.values():
+            lugares.sort(key=lambda lugar: lugar["populacao"], reverse=True)
+
+        self.indice_cidades = IndiceProximidade([c["lat"] for c in self.cidades], [c["lon"] for c in self.cidades])
+        self.indice_aeroportos = IndiceProximidade([a["lat"] for a in self.aeroportos], [a["lon"] for a in self.aeroportos])
+
+    def _indexar(self, nome, lugar):
+        chave = normalizar_nome(nome)
+        if chave:
+            self._indice_nomes.setdefault(chave, []).append(lugar)
+
+    def cidade_mais_proxima(self, lat, lon):
+        """
+        Retorna a cidade mais próxima das coordenadas e a distância até ela, em km.
+        """
+        indices, distancias = self.indice_cidades.mais_proximos([lat], [lon])
+        return self.cidades[indices[0]], float(distancias[0])
+
+    def aeroporto_mais_proximo(self, lat, lon):
+        """
+        Retorna o aeroporto mais próximo das coordenadas e a distância até ele, em km.
+        """
+        indices, distancias = self.indice_aeroportos.mais_proximos([lat], [lon])
+        return self.aeroportos[indices[0]], float(distancias[0])
+
+    def reverso(self, lat, lon):
+        """
+        Descreve as coordenadas pelo nome da cidade mais próxima.
+
+        Retorna:
+        - tuple: Descrição do lugar (ex: "Campinas, Brazil" ou "45 km de Campinas, Brazil")
+          e a distância até a cidade, em km.
+        """
+        return self.reverso_em_lote([lat], [lon])[0]
+
+    def reverso_em_lote(self, lat, lon):
+        """
+        Descreve várias coordenadas de uma vez pelo nome da cidade mais próxima de cada uma.
+
+        Parâmetros:
+        - lat, lon (array): Latitudes e longitudes das posições.
+
+        Retorna:
+        - list: (descrição, distância em km) de cada posição, na mesma ordem.
+        """
+        indices, distancias = self.indice_cidades.mais_proximos(lat, lon)
+        resultado = []
+        for indice, distancia in zip(indices.tolist(), distancias.tolist()):
+            cidade = self.cidades[indice]
+            descricao = f"{cidade['nome']}, {cidade['pais']}"
+            if distancia > RAIO_CIDADE_KM:
+                descricao = f"{distancia:.0f} km de {descricao}"
+            resultado.append((descricao, distancia))
+        return resultado
+
+    def direto(self, consulta):
+        """
+        Busca um lugar pelo nome: cidade, país ou aeroporto (nome, código ICAO ou IATA).
+
+        O país pode ser informado após uma vírgula para desempatar nomes repetidos
+        (ex: "Santiago, CL" ou "Santiago, Chile").
+
+        Retorna:
+        - dict: O lugar encontrado (com as chaves "nome", "pais", "lat", "lon" e "tipo"), ou None.
+        """
+        partes = [parte.strip() for parte in consulta.split(",")]
+        lugares = self._indice_nomes.get(normalizar_nome(partes[0]), [])
+        if not lugares:
+            return None
+
+        if len(partes) > 1:
+            pais = normalizar_nome(partes[-1])
+            filtrados = [l for l in lugares if pais in (normalizar_nome(l["pais"]), normalizar_nome(l["codigo_pais"]))]
+            lugares = filtrados or lugares
+
+        return lugares[0]
+
+
+def normalizar_nome(nome):
+    """
+    Normaliza um nome para busca: remove acentos, espaços extras e diferença entre maiúsculas e minúsculas.
+    """
+    if not nome:
+        return ""
+    sem_acentos = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode("ascii")
+    return " ".join(sem_acentos.lower().split())
+
+
+def melhor_por_grupo(grupos, valores):
+    """
+    Dado um vetor de grupos em ordem não decrescente, retorna a posição do maior valor de cada grupo.
+    """
+    inicios = np.flatnonzero(np.r_[True, grupos[1:] != grupos[:-1]])
+    maximos = np.maximum.reduceat(valores, inicios)
+    posicoes = np.flatnonzero(valores == np.repeat(maximos, np.diff(np.r_[inicios, len(valores)])))
+    # Em caso de empate, fica a primeira posição de cada grupo
+    return posicoes[np.r_[True, grupos[posicoes][1:] != grupos[posicoes][:-1]]]
+
+
+def vetores_unitarios(lat, lon):
+    phi, lam = np.radians(lat), np.radians(lon)
+    return np.column_stack((np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)))
+
+
+def similaridade_para_km(produto):
+    """
+    Converte o produto escalar entre vetores unitários em distância sobre a superfície, em km.
+    """
+    return RAIO_TERRA_KM * np.arccos(np.clip(produto, -1.0, 1.0))
+
+
+_geocodificador = None
+_lock_geocodificador = threading.Lock()
+
+def obter_geocodificador():
+    """
+    Retorna o geocodificador offline compartilhado, carregando o gazetteer na primeira chamada.
+    """
+    global _geocodificador
+    if _geocodificador is None:
+        with _lock_geocodificador:
+            if _geocodificador is None:
+                _geocodificador = GeocodificadorOffline()
+    return _geocodificador
+
+
+def descrever_localizacoes(lat, lon):
+    """
+    Descreve um lote de coordenadas pela cidade mais próxima de cada uma, só com a base offline.
+
+    Retorna:
+    - list: Descrição do lugar de cada posição, na mesma ordem.
+    """
+    return [descricao for descricao, _ in obter_geocodificador().reverso_em_lote(lat, lon)]
+
+
+def descrever_localizacao(lat, lon):
+    """
+    Descreve as coordenadas pelo lugar mais próximo, usando a base offline e, se ativado e o
+    ponto estiver longe de qualquer cidade conhecida, o Nominatim como alternativa.
+
+    Retorna:
+    - str: Descrição do lugar.
+    """
+    descricao, distancia = obter_geocodificador().reverso(lat, lon)
+    if distancia <= RAIO_CIDADE_KM or not GEOCODIFICACAO_ONLINE:
+        return descricao
+
+    try:
+        location = Nominatim(user_agent="meu_app").reverse((lat, lon), language='pt', timeout=10)
+        if location:
+            return location.address
+    except Exception as e:
+        logging.error(f"Erro ao consultar o Nominatim: {e}")
+    return descricao
+
+
+def buscar_coordenadas(nome):
+    """
+    Busca as coordenadas de um lugar pelo nome, usando a base offline e, se ativado e o nome
+    não for encontrado, o Nominatim como alternativa.
+
+    Retorna:
+    - tuple: (latitude, longitude, descrição do lugar), ou None se não encontrado.
+    """
+    lugar = obter_geocodificador().direto(nome)
+    if lugar:
+        return lugar["lat"], lugar["lon"], f"{lugar['nome']}, {lugar['pais']}"
+
+    if GEOCODIFICACAO_ONLINE:
+        try:
+            location = Nominatim(user_agent="aeronaves_map").geocode(nome)
+            if location:
+                return location.latitude, location.longitude, location.address
+        except Exception as e:
+            logging.error(f"Erro ao consultar o Nominatim: {e}")
+    return None
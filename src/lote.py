@@ -0,0 +1,378 @@
+from datetime import datetime
+from contextlib import redirect_stdout
+from rich.console import Console
+from geocodificador import RAIO_TERRA_KM
+from utils import cache_filtros, ordenar_voos
+import itertools
+import argparse
+import logging
+import math
+import json
+import time
+import csv
+import sys
+import os
+
+# Inicializa o console do rich (no modo em lote, as mensagens vão para stderr)
+console = Console(stderr=True)
+
+# Nomes dos campos dos estados da OpenSky API nos resultados (o índice 12, "sensors", não é exportado)
+CAMPOS_ESTADO = [
+    (0, "icao24"), (1, "callsign"), (2, "origin_country"), (3, "time_position"), (4, "last_contact"),
+    (5, "longitude"), (6, "latitude"), (7, "baro_altitude"), (8, "on_ground"), (9, "velocity"),
+    (10, "true_track"), (11, "vertical_rate"), (13, "geo_altitude"), (14, "squawk"), (15, "spi"),
+    (16, "position_source"),
+]
+
+# Faixas de direção (em graus) aceitas no filtro "direcao", as mesmas do menu de filtros
+FAIXAS_DIRECAO = {
+    "norte": ((0, 45), (315, 360)),
+    "sul": ((135, 225),),
+    "leste": ((45, 135),),
+    "oeste": ((225, 315),),
+}
+
+MILHA_NAUTICA_EM_KM = 1.852
+
+
+def executar_lote(consultas, escritor, idade_maxima=None):
+    """
+    Executa uma lista de consultas sobre um único snapshot de estados.
+
+    O snapshot salvo em disco é usado se for mais novo que a idade máxima; senão, ele vem do
+    serviço local de snapshots, se configurado, ou de uma única busca na OpenSky API (e o novo
+    snapshot é salvo para as próximas execuções). Todas as
+    consultas de voos usam esse mesmo snapshot e o cache de filtros. As consultas "arquivo" leem
+    os snapshots exportados (consulta_exportacao.py) e não precisam do snapshot atual.
+
+    Parâmetros:
+    - consultas (list): Consultas (dicts) com a chave "consulta" ("voos", "busca", "historico" ou "arquivo").
+    - escritor (EscritorResultados): Destino das linhas de resultado.
+    - idade_maxima (float, opcional): Idade máxima (s) do snapshot salvo (padrão: SNAPSHOT_IDADE_MAXIMA).
+
+    Retorna:
+    - int: Número de consultas que falharam.
+    """
+    # Importado aqui para que as mensagens exibidas ao carregar o .env (api.py) também vão para stderr
+    from snapshot import (
+        Snapshot, carregar_snapshot, salvar_snapshot, buscar_snapshot_servico, SNAPSHOT_IDADE_MAXIMA, SERVICO_SNAPSHOT_URL
+    )
+    from api import buscar_estados_opensky
+    import requests
+
+    idade_maxima = SNAPSHOT_IDADE_MAXIMA if idade_maxima is None else idade_maxima
+    estados = None
+    if any(consulta.get("consulta", "voos") not in ("historico", "arquivo") for consulta in consultas):
+        estados = carregar_snapshot()
+        do_servico = False
+        if SERVICO_SNAPSHOT_URL and (estados is None or estados.idade() > idade_maxima):
+            try:
+                # Se o serviço estiver com o mesmo snapshot salvo em disco, ele não é reenviado
+                estados = buscar_snapshot_servico(atual=estados)
+                do_servico = True
+            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                logging.warning(f"Serviço de snapshots indisponível ({e}); buscando na OpenSky API.",
+                                extra={"endpoint": SERVICO_SNAPSHOT_URL})
+        # O snapshot do serviço é usado mesmo que antigo: é o serviço quem decide quando buscar um novo
+        if estados is None or (not do_servico and estados.idade() > idade_maxima):
+            novos = buscar_estados_opensky(silencioso=True)
+            if novos is not None:
+                estados = Snapshot(novos, time.time(), "api", getattr(novos, "tempo", None))
+                try:
+                    salvar_snapshot(estados)
+                except OSError as e:
+                    logging.error(f"Erro ao salvar o snapshot: {e}", extra={"snapshot_id": estados.id})
+        if estados is None:
+            console.print("[red]⚠️ Nenhum dado de voo disponível. ⚠️[/red]")
+        else:
+            console.print(f"[green]✈️ Snapshot com {len(estados)} aeronaves ({estados.origem}).[/green]")
+
+    falhas = 0
+    for numero, consulta in enumerate(consultas, start=1):
+        identificador = str(consulta.get("id") or f"consulta-{numero}")
+        tipo = consulta.get("consulta", "voos")
+        try:
+            if tipo == "historico":
+                linhas = _consultar_historico(consulta)
+            elif tipo == "arquivo":
+                # Importado aqui porque o módulo de consulta aos dados exportados depende deste
+                from consulta_exportacao import consultar_exportacao
+                linhas = consultar_exportacao(consulta)
+            elif estados is None:
+                raise ValueError("nenhum dado de voo disponível")
+            elif tipo == "voos":
+                linhas = (_estado_para_dict(voo) for voo in consultar_voos(estados, consulta))
+            elif tipo == "busca":
+                linhas = (_estado_para_dict(voo) for voo in consultar_busca(estados, consulta))
+            else:
+                raise ValueError(f"tipo de consulta desconhecido: {tipo}")
+            total = escritor.escrever(identificador, linhas)
+            console.print(f"[cyan]{identificador}: {total} resultados[/cyan]")
+        except (ValueError, TypeError, KeyError) as e:
+            falhas += 1
+            console.print(f"[red]⚠️ Erro na consulta {identificador}: {e} ⚠️[/red]")
+            logging.error(f"Erro na consulta em lote {identificador}: {e}")
+    return falhas
+
+
+def consultar_voos(estados, consulta):
+    """
+    Aplica os filtros, a ordenação e o limite de uma consulta "voos".
+
+    Filtros aceitos (todos opcionais e combinados com "e"): altitude_minima, altitude_maxima,
+    velocidade_minima, velocidade_maxima, direcao (norte, sul, leste, oeste), pais (país de origem),
+    internacional (true/false, em relação ao Brasil), altitude_conhecida (true/false), em_solo
+    (true/false) e area ({"lat", "lon", "raio_nm"}). Também aceita ordenar (altitude, velocidade
+    ou callsign) e limite.
+    """
+    condicoes = []
+    parametros = []
+
+    for chave, posicao, comparar in (
+        ("altitude_minima", 7, lambda valor, limite: valor >= limite),
+        ("altitude_maxima", 7, lambda valor, limite: valor <= limite),
+        ("velocidade_minima", 9, lambda valor, limite: valor >= limite),
+        ("velocidade_maxima", 9, lambda valor, limite: valor <= limite),
+    ):
+        if consulta.get(chave) is not None:
+            limite = float(consulta[chave])
+            condicoes.append(lambda voo, p=posicao, c=comparar, l=limite: voo[p] is not None and c(voo[p], l))
+            parametros.append((chave, limite))
+
+    if consulta.get("direcao") is not None:
+        direcao = str(consulta["direcao"]).strip().lower()
+        if direcao not in FAIXAS_DIRECAO:
+            raise ValueError(f"direção inválida: {direcao}")
+        faixas = FAIXAS_DIRECAO[direcao]
+        condicoes.append(lambda voo: voo[10] is not None and any(inicio <= voo[10] < fim for inicio, fim in faixas))
+        parametros.append(("direcao", direcao))
+
+    if consulta.get("pais") is not None:
+        pais = str(consulta["pais"]).strip()
+        condicoes.append(lambda voo: voo[2] == pais)
+        parametros.append(("pais", pais))
+
+    for chave, condicao in (
+        ("internacional", lambda voo: voo[2] != "Brazil"),
+        ("altitude_conhecida", lambda voo: voo[7] is not None),
+        ("em_solo", lambda voo: bool(voo[8])),
+    ):
+        if consulta.get(chave) is not None:
+            esperado = bool(consulta[chave])
+            condicoes.append(lambda voo, c=condicao, e=esperado: c(voo) == e)
+            parametros.append((chave, esperado))
+
+    if consulta.get("area") is not None:
+        area = consulta["area"]
+        lat, lon, raio_nm = float(area["lat"]), float(area["lon"]), float(area["raio_nm"])
+        condicoes.append(lambda voo: voo[5] is not None and voo[6] is not None
+                         and _distancia_nm(lat, lon, voo[6], voo[5]) <= raio_nm)
+        parametros.append(("area", (lat, lon, raio_nm)))
+
+    # Consultas com os mesmos filtros (mesmo em ordem diferente) reaproveitam o resultado do cache
+    voos = cache_filtros.filtrar(
+        estados, "lote", tuple(sorted(parametros)), lambda voo: all(condicao(voo) for condicao in condicoes)
+    )
+
+    limite = int(consulta.get("limite") or 0)
+    criterio = consulta.get("ordenar")
+    if criterio is not None:
+        if criterio not in ("altitude", "velocidade", "callsign"):
+            raise ValueError(f"critério de ordenação inválido: {criterio}")
+        return ordenar_voos(voos, criterio, limite=limite)
+    return itertools.islice(voos, limite or None)
+
+
+def consultar_busca(estados, consulta):
+    """
+    Busca voos pelo código de voo ou ICAO24 ("termo"). Sem resultado exato, usa a sugestão
+    mais parecida da busca aproximada, a menos que "aproximada" seja false.
+    """
+    from busca import obter_indice_busca
+
+    termo = str(consulta["termo"]).strip()
+    indice = obter_indice_busca(estados)
+    voos = indice.exatos(termo)
+    if not voos and consulta.get("aproximada", True):
+        sugestoes = indice.buscar(termo, limite=1)
+        if sugestoes:
+            voos = sugestoes[0][3]
+    return voos
+
+
+def _consultar_historico(consulta):
+    """
+    Busca voos históricos ("tipo": arrival, departure ou all) entre "inicio" e "fim", informados
+    como timestamp ou no formato DD/MM/AAAA HH:MM. Períodos longos são divididos em janelas; as
+    que falharem em todas as tentativas são avisadas (o resultado fica incompleto).
+    """
+    from api import buscar_voos_historicos_periodo, descrever_janelas_com_falha
+
+    tipo = consulta.get("tipo", "arrival")
+    if tipo not in ("arrival", "departure", "all"):
+        raise ValueError(f"tipo de voo inválido: {tipo}")
+    inicio, fim = ler_horario(consulta["inicio"]), ler_horario(consulta["fim"])
+    if fim <= inicio:
+        raise ValueError("o fim deve ser posterior ao início")
+    voos = buscar_voos_historicos_periodo(tipo, inicio, fim)
+    if voos.janelas_com_falha:
+        console.print(
+            f"[yellow]⚠️ {len(voos.janelas_com_falha)} de {voos.total_janelas} janelas de 2 horas não puderam ser "
+            f"buscadas ({descrever_janelas_com_falha(voos)}); o resultado está incompleto. ⚠️[/yellow]"
+        )
+    return voos
+
+
+def ler_horario(valor):
+    if isinstance(valor, (int, float)):
+        return int(valor)
+    return int(datetime.strptime(str(valor).strip(), "%d/%m/%Y %H:%M").timestamp())
+
+
+def _distancia_nm(lat1, lon1, lat2, lon2):
+    fi1, fi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((fi2 - fi1) / 2) ** 2 + math.cos(fi1) * math.cos(fi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * RAIO_TERRA_KM * math.asin(min(1.0, math.sqrt(a))) / MILHA_NAUTICA_EM_KM
+
+
+def _estado_para_dict(voo):
+    linha = {nome: (voo[posicao] if len(voo) > posicao else None) for posicao, nome in CAMPOS_ESTADO}
+    if isinstance(linha["callsign"], str):
+        linha["callsign"] = linha["callsign"].strip() or None
+    return linha
+
+
+class EscritorResultados:
+    """
+    Grava as linhas de resultado das consultas em JSON Lines ou CSV, num único arquivo (ou na
+    saída padrão) ou num arquivo por consulta.
+
+    Cada linha recebe o campo "consulta" com o id da consulta. Em JSON Lines, as linhas são
+    gravadas à medida que são produzidas; num CSV único, as colunas dependem de todas as
+    consultas, então as linhas são guardadas e gravadas ao final.
+    """
+
+    def __init__(self, formato="jsonl", saida=None, diretorio=None):
+        if formato not in ("jsonl", "csv"):
+            raise ValueError(f"formato inválido: {formato}")
+        self.formato = formato
+        self.diretorio = diretorio
+        self._saida = saida
+        self._pendentes = []
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+    def escrever(self, identificador, linhas):
+        """
+        Grava as linhas de uma consulta e retorna quantas foram gravadas.
+        """
+        linhas = ({"consulta": identificador, **linha} for linha in linhas)
+        if self.diretorio:
+            nome = "".join(c if c.isalnum() or c in "-_." else "_" for c in identificador)
+            with open(os.path.join(self.diretorio, f"{nome}.{self.formato}"), "w", newline="", encoding="utf-8") as arquivo:
+                if self.formato == "jsonl":
+                    return _gravar_jsonl(arquivo, linhas)
+                return _gravar_csv(arquivo, list(linhas))
+        if self.formato == "jsonl":
+            return _gravar_jsonl(self._saida, linhas)
+        quantidade = len(self._pendentes)
+        self._pendentes.extend(linhas)
+        return len(self._pendentes) - quantidade
+
+    def fechar(self):
+        if self._pendentes:
+            _gravar_csv(self._saida, self._pendentes)
+            self._pendentes = []
+        if self._saida is not None:
+            self._saida.flush()
+
+
+def _gravar_jsonl(arquivo, linhas):
+    total = 0
+    for linha in linhas:
+        arquivo.write(json.dumps(linha, ensure_ascii=False, default=str))
+        arquivo.write("\n")
+        total += 1
+    return total
+
+
+def _gravar_csv(arquivo, linhas):
+    colunas = list(dict.fromkeys(chave for linha in linhas for chave in linha))
+    escritor = csv.DictWriter(arquivo, fieldnames=colunas)
+    escritor.writeheader()
+    escritor.writerows(linhas)
+    return len(linhas)
+
+
+def _ler_consultas(caminhos, textos):
+    """
+    Lê as consultas dos arquivos (JSON Lines ou uma lista JSON; "-" para a entrada padrão) e
+    das consultas informadas na linha de comando.
+    """
+    conteudos = []
+    for caminho in caminhos:
+        if caminho == "-":
+            conteudos.append(sys.stdin.read())
+        else:
+            with open(caminho, encoding="utf-8") as arquivo:
+                conteudos.append(arquivo.read())
+
+    consultas = []
+    for conteudo in conteudos:
+        conteudo = conteudo.strip()
+        if conteudo.startswith("["):
+            consultas.extend(json.loads(conteudo))
+        else:
+            consultas.extend(json.loads(linha) for linha in conteudo.splitlines() if linha.strip())
+    consultas.extend(json.loads(texto) for texto in textos)
+
+    if not all(isinstance(consulta, dict) for consulta in consultas):
+        raise ValueError("cada consulta deve ser um objeto JSON")
+    return consultas
+
+
+def main():
+    """
+    Executa consultas em lote, sem o menu interativo (ex: agendadas no cron ou chamadas por outras ferramentas).
+    """
+    parser = argparse.ArgumentParser(
+        description="Executa uma lista de consultas sobre um único snapshot e grava os resultados em JSON Lines ou CSV."
+    )
+    parser.add_argument("arquivos", nargs="*", help="Arquivos de consultas (JSON Lines ou lista JSON; '-' para a entrada padrão).")
+    parser.add_argument("-c", "--consulta", action="append", default=[], help="Consulta em JSON (pode ser repetida).")
+    parser.add_argument("-f", "--formato", choices=["jsonl", "csv"], help="Formato dos resultados (padrão: pela extensão da saída, ou jsonl).")
+    parser.add_argument("-o", "--saida", default="-", help="Arquivo de resultados ('-' para a saída padrão).")
+    parser.add_argument("-d", "--diretorio", help="Grava um arquivo por consulta neste diretório, em vez de um único arquivo.")
+    parser.add_argument("--idade-maxima", type=float, help="Idade máxima (s) do snapshot salvo para não buscar um novo.")
+    args = parser.parse_args()
+
+    try:
+        consultas = _ler_consultas(args.arquivos, args.consulta)
+    except (OSError, ValueError) as e:
+        console.print(f"[red]⚠️ Erro ao ler as consultas: {e} ⚠️[/red]")
+        sys.exit(2)
+    if not consultas:
+        parser.error("informe ao menos um arquivo de consultas ou uma consulta (-c)")
+
+    formato = args.formato or ("csv" if args.saida.endswith(".csv") else "jsonl")
+    saida = sys.stdout if args.saida == "-" or args.diretorio else open(args.saida, "w", newline="", encoding="utf-8")
+    escritor = EscritorResultados(formato, None if args.diretorio else saida, args.diretorio)
+
+    try:
+        # A saída padrão fica só com os resultados: o que o restante do programa exibir vai para stderr
+        with redirect_stdout(sys.stderr):
+            falhas = executar_lote(consultas, escritor, args.idade_maxima)
+        escritor.fechar()
+    except BrokenPipeError:
+        # Quem lia os resultados parou antes do fim (ex: "| head"); evita um segundo erro ao fechar a saída
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,22 @@
 from rich.console import Console
 from menus import exibir_menu_principal_interativo, exibir_menu_ordenacao
-from api import buscar_estados_opensky, monitorar_aeronaves_tempo_real, exibir_aeronaves_no_mapa
-from utils import exibir_lista_voos, tentar_novamente, ordenar_voos
+from api import monitorar_aeronaves_tempo_real, exibir_aeronaves_no_mapa
+from snapshot import iniciar_snapshot, obter_estados, registrar_atividade, gerenciador_snapshot
+from utils import exibir_lista_voos, tentar_novamente, ordenar_voos, MODO_MEMORIA_REDUZIDA
 from filtros import (
     filtrar_por_altitude, filtrar_por_origem, mostrar_voos_com_altitude_conhecida,
     mostrar_voos_com_altitude_desconhecida, filtrar_por_velocidade, filtrar_por_direcao
 )
-from busca import buscar_voo_especifico
-from voos_historicos import exibir_voos_historicos
-import logging
-import os
+from busca import buscar_voo_especifico, obter_indice_busca
+from voos_historicos import exibir_voos_historicos, exibir_estatisticas_trafego
+from mapa_ao_vivo import exibir_mapa_ao_vivo
+from resumo import obter_resumo, exibir_resumo
+from densidade import exibir_densidade_trafego
+from anomalias import iniciar_deteccao_anomalias
+from registro import configurar_registro
 
-# Configura o logging
-# Caminho absoluto para o diretório de logs
-log_dir = os.path.join(os.path.dirname(__file__), "../logs")
-os.makedirs(log_dir, exist_ok=True)  # Garante que o diretório logs exista
-
-# Configura o logging com o caminho absoluto
-logging.basicConfig(
-    filename=os.path.join(log_dir, "erros.log"),
-    level=logging.ERROR,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+# Configura o logging (JSON, gravado em segundo plano com rotação)
+configurar_registro()
 
 # Cria uma instância do console
 console = Console()
@@ -31,7 +26,7 @@ def realizar_consulta():
     Função responsável por realizar a consulta de voos ativos.
     """
     while True:
-        estados = buscar_estados_opensky()
+        estados = obter_estados()
 
         # Verifica se a busca retornou dados válidos
         if estados is None:
@@ -62,7 +57,7 @@ def ordenar_voos_menu():
     Função responsável por ordenar a lista de voos.
     """
     while True:
-        estados = buscar_estados_opensky()
+        estados = obter_estados()
 
         # Verifica se a busca retornou dados válidos
         if estados is None:
@@ -72,6 +67,9 @@ def ordenar_voos_menu():
             else:
                 continue  # Tenta novamente
 
+        # No modo de memória reduzida a ordenação guarda só as primeiras posições; o total vem do snapshot
+        total = len(estados)
+
         # Exibe o submenu de ordenação
         escolha_ordenacao = exibir_menu_ordenacao()
         if escolha_ordenacao == "1":
@@ -91,20 +89,30 @@ def ordenar_voos_menu():
         console.print()  # Linha em branco
         # Exibe os voos ordenados
         console.print("[green]✈️  Exibindo voos ordenados:[/green]")
-        exibir_lista_voos(estados)
+        exibir_lista_voos(estados, total=total)
 
 def main():
     """
     Função principal que gerencia o fluxo do menu e interage com o usuário.
     """
+    # Carrega o último snapshot salvo e mantém os dados atualizados em segundo plano enquanto o menu é usado,
+    # procurando anomalias em cada novo snapshot
+    iniciar_deteccao_anomalias()
+    # O índice da busca de voos também é montado em segundo plano a cada novo snapshot
+    # (no modo de memória reduzida, só quando uma busca for feita)
+    if not MODO_MEMORIA_REDUZIDA:
+        gerenciador_snapshot.adicionar_ouvinte(obter_indice_busca)
+    iniciar_snapshot()
+
     while True:
         escolha = exibir_menu_principal_interativo()
+        registrar_atividade()
 
         # Lógica para cada opção do menu
         if escolha == "1":
             realizar_consulta()
         elif escolha == "2":
-            estados = buscar_estados_opensky()
+            estados = obter_estados()
             if estados:
                 filtrar_por_altitude(estados)
             else:
@@ -131,6 +139,18 @@ def main():
         elif escolha == "12":
             ordenar_voos_menu()  # Nova opção de ordenação
         elif escolha == "13":
+            exibir_estatisticas_trafego()
+        elif escolha == "14":
+            exibir_mapa_ao_vivo()
+        elif escolha == "15":
+            estados = obter_estados()
+            if estados:
+                exibir_resumo(obter_resumo(estados))
+            else:
+                console.print("[red]⚠️ Nenhum dado de voo disponível. ⚠️[/red]")
+        elif escolha == "16":
+            exibir_densidade_trafego()
+        elif escolha == "17":
             console.print("[yellow]🌟 Obrigado por usar o sistema! Até a próxima! 🌟[/yellow]")
             console.print("[cyan]✈️ ============================== ✈️[/cyan]")
             break  # Sai do loop e encerra o programa
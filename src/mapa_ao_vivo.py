@@ -0,0 +1,245 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from rich.console import Console
+from api import buscar_aeronaves_proximas, selecionar_localizacao, abrir_no_navegador
+import threading
+import logging
+import queue
+import json
+import time
+import os
+
+# Inicializa o console do rich
+console = Console()
+
+# Porta do servidor local do mapa ao vivo
+MAPA_AO_VIVO_PORTA = int(os.getenv("MAPA_AO_VIVO_PORTA", 8765))
+
+# Campos de cada aeronave enviados ao navegador
+CAMPOS_AERONAVE = ("call", "lat", "lon", "alt", "spd", "trak")
+
+# Caminho do ícone usado nos marcadores
+ICONE_AVIAO_PATH = os.path.join(os.path.dirname(__file__), '..', 'img', 'airplane.png')
+
+# Página servida uma única vez: cria o mapa e move os marcadores conforme os eventos (SSE) chegam
+PAGINA_MAPA = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8" />
+    <title>Check_Voo - Mapa ao vivo</title>
+    <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.css" />
+    <script src="https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.js"></script>
+    <style>html, body, #map {width: 100%; height: 100%; margin: 0; padding: 0;}</style>
+</head>
+<body>
+<div id="map"></div>
+<script>
+    var mapa = L.map("map").setView([__LAT__, __LON__], 10);
+    L.tileLayer("https://tile.openstreetmap.org/{z}/{x}/{y}.png", {
+        maxZoom: 19, attribution: "&copy; OpenStreetMap"
+    }).addTo(mapa);
+
+    var icone = L.icon({iconUrl: "/img/airplane.png", iconSize: [20, 20]});
+    var marcadores = {};
+
+    function descricao(a) {
+        return "Call Sign: " + (a.call || "Desconhecido") + "<br>" +
+               "Altitude: " + (a.alt == null ? "Desconhecido" : a.alt) + " ft<br>" +
+               "Velocidade: " + (a.spd == null ? "Desconhecido" : a.spd) + " km/h<br>" +
+               "Direção: " + (a.trak == null ? "Desconhecido" : a.trak) + "°";
+    }
+
+    var eventos = new EventSource("/eventos");
+    eventos.onmessage = function (evento) {
+        var delta = JSON.parse(evento.data);
+        if (delta.completo) {
+            Object.keys(marcadores).forEach(function (id) { mapa.removeLayer(marcadores[id]); });
+            marcadores = {};
+        }
+        Object.keys(delta.atualizadas).forEach(function (id) {
+            var a = delta.atualizadas[id];
+            if (marcadores[id]) {
+                marcadores[id].setLatLng([a.lat, a.lon]).setPopupContent(descricao(a));
+            } else {
+                marcadores[id] = L.marker([a.lat, a.lon], {icon: icone}).bindPopup(descricao(a)).addTo(mapa);
+            }
+        });
+        delta.removidas.forEach(function (id) {
+            if (marcadores[id]) {
+                mapa.removeLayer(marcadores[id]);
+                delete marcadores[id];
+            }
+        });
+    };
+</script>
+</body>
+</html>
+"""
+
+
+class ServidorMapaAoVivo(ThreadingHTTPServer):
+    """
+    Servidor local que entrega a página do mapa e envia aos navegadores conectados apenas
+    as aeronaves que mudaram desde a última atualização (Server-Sent Events).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, endereco, lat, lon):
+        super().__init__(endereco, ManipuladorMapaAoVivo)
+        self.pagina = PAGINA_MAPA.replace("__LAT__", str(lat)).replace("__LON__", str(lon)).encode("utf-8")
+        self._lock = threading.Lock()
+        self._clientes = []
+        self._aeronaves = {}
+
+    def publicar(self, aeronaves):
+        """
+        Compara as aeronaves recebidas com as da atualização anterior e envia o delta aos clientes.
+
+        Parâmetros:
+        - aeronaves (list): Aeronaves no formato da ADS-B Exchange.
+
+        Retorna:
+        - tuple: Quantidade de aeronaves atualizadas (novas ou que mudaram) e removidas.
+        """
+        novas = {}
+        for aeronave in aeronaves:
+            identificador = aeronave.get("hex") or aeronave.get("icao")
+            if identificador:
+                novas[identificador] = {campo: aeronave.get(campo) for campo in CAMPOS_AERONAVE}
+
+        with self._lock:
+            atualizadas = {id_: dados for id_, dados in novas.items() if self._aeronaves.get(id_) != dados}
+            removidas = [id_ for id_ in self._aeronaves if id_ not in novas]
+            self._aeronaves = novas
+
+            if atualizadas or removidas:
+                mensagem = json.dumps({"completo": False, "atualizadas": atualizadas, "removidas": removidas})
+                for fila in self._clientes:
+                    fila.put(mensagem)
+
+        return len(atualizadas), len(removidas)
+
+    def registrar_cliente(self):
+        """
+        Registra um navegador e já enfileira o estado completo atual, para que ele comece sincronizado.
+        """
+        fila = queue.Queue()
+        with self._lock:
+            fila.put(json.dumps({"completo": True, "atualizadas": self._aeronaves, "removidas": []}))
+            self._clientes.append(fila)
+        return fila
+
+    def remover_cliente(self, fila):
+        with self._lock:
+            if fila in self._clientes:
+                self._clientes.remove(fila)
+
+    def encerrar(self):
+        """
+        Encerra o servidor e as conexões de eventos abertas.
+        """
+        with self._lock:
+            for fila in self._clientes:
+                fila.put(None)
+        self.shutdown()
+        self.server_close()
+
+
+class ManipuladorMapaAoVivo(BaseHTTPRequestHandler):
+    """
+    Atende a página do mapa, o ícone dos marcadores e o fluxo de eventos.
+    """
+
+    # Silencia o log padrão de cada requisição do http.server
+    def log_message(self, formato, *args):
+        pass
+
+    def do_GET(self):
+        if self.path in ("/", "/index.html"):
+            self._responder(200, "text/html; charset=utf-8", self.server.pagina)
+        elif self.path == "/img/airplane.png":
+            with open(ICONE_AVIAO_PATH, "rb") as arquivo:
+                self._responder(200, "image/png", arquivo.read())
+        elif self.path == "/eventos":
+            self._transmitir_eventos()
+        else:
+            self._responder(404, "text/plain; charset=utf-8", "Não encontrado".encode("utf-8"))
+
+    def _responder(self, status, tipo, dados):
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _transmitir_eventos(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        fila = self.server.registrar_cliente()
+        try:
+            while True:
+                try:
+                    mensagem = fila.get(timeout=15)
+                    if mensagem is None:
+                        break
+                    self.wfile.write(f"data: {mensagem}\n\n".encode("utf-8"))
+                except queue.Empty:
+                    # Comentário SSE que mantém a conexão aberta
+                    self.wfile.write(b": keepalive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server.remover_cliente(fila)
+
+
+def exibir_mapa_ao_vivo():
+    """
+    Abre um mapa no navegador servido localmente e o mantém atualizado em tempo real.
+
+    A página é entregue uma única vez; a cada busca de aeronaves próximas, apenas as aeronaves
+    que mudaram são enviadas ao navegador, que move os marcadores no lugar.
+    """
+    localizacao = selecionar_localizacao()
+    if localizacao is None:
+        return
+    lat, lon = localizacao
+
+    try:
+        distancia = int(console.input("[cyan]👉 Digite a distância em milhas náuticas (máximo 100, ex: 50): [/cyan]").strip() or 50)
+        intervalo = float(console.input("[cyan]👉 Digite o intervalo de atualização em segundos (ex: 5): [/cyan]").strip().replace(",", ".") or 5)
+    except ValueError:
+        console.print("[red]⚠️ Entrada inválida! Certifique-se de digitar números. ⚠️[/red]")
+        return
+
+    if distancia <= 0 or distancia > 100 or intervalo <= 0:
+        console.print("[red]⚠️ A distância deve estar entre 1 e 100 milhas náuticas e o intervalo deve ser maior que zero. ⚠️[/red]")
+        return
+
+    try:
+        servidor = ServidorMapaAoVivo(("127.0.0.1", MAPA_AO_VIVO_PORTA), lat, lon)
+    except OSError as e:
+        console.print(f"[red]⚠️ Não foi possível iniciar o servidor do mapa na porta {MAPA_AO_VIVO_PORTA}: {e} ⚠️[/red]")
+        logging.error(f"Erro ao iniciar o servidor do mapa ao vivo: {e}")
+        return
+
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    endereco = f"http://127.0.0.1:{MAPA_AO_VIVO_PORTA}/"
+    console.print(f"[green]✅ Mapa ao vivo disponível em {endereco}[/green]")
+    abrir_no_navegador(endereco)
+    console.print("[yellow]Pressione Ctrl+C para encerrar o mapa ao vivo.[/yellow]")
+
+    try:
+        while True:
+            aeronaves = buscar_aeronaves_proximas(lat, lon, distancia)
+            if aeronaves is not None:
+                atualizadas, removidas = servidor.publicar(aeronaves)
+                console.print(f"[cyan]🛰️ {len(aeronaves)} aeronaves, {atualizadas} atualizadas, {removidas} removidas.[/cyan]")
+            time.sleep(intervalo)
+    except KeyboardInterrupt:
+        console.print("[yellow]🚪 Encerrando mapa ao vivo...[/yellow]")
+    finally:
+        servidor.encerrar()
@@ -22,7 +22,11 @@ def exibir_menu_principal_interativo():
         "10": "🛰️  Monitorar aeronaves em tempo real",
         "11": "🗺️  Exibir aeronaves no mapa",
         "12": "📊 Ordenar voos",  # Nova opção de ordenação
-        "13": "🚪 Sair",
+        "13": "📈 Estatísticas de tráfego históricas",
+        "14": "📡 Mapa ao vivo (atualização contínua)",
+        "15": "📋 Resumo do snapshot",
+        "16": "🔥 Mapa de densidade de tráfego",
+        "17": "🚪 Sair",
     }
 
     while True:
@@ -37,7 +41,7 @@ def exibir_menu_principal_interativo():
         console.print(table)
 
         # Solicita a escolha do usuário
-        escolha = console.input("[cyan]👉 Escolha uma opção (1 a 13): [/cyan]").strip()
+        escolha = console.input("[cyan]👉 Escolha uma opção (1 a 17): [/cyan]").strip()
 
         if escolha in opcoes:
             return escolha
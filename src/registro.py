@@ -0,0 +1,184 @@
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+import threading
+import logging
+import atexit
+import queue
+import json
+import os
+import re
+
+# Arquivo de log (uma linha JSON por registro)
+LOG_ARQUIVO = os.getenv("LOG_ARQUIVO", os.path.join(os.path.dirname(__file__), "..", "logs", "erros.log"))
+
+# Nível mínimo registrado (ex: ERROR, WARNING ou INFO, que inclui cada requisição às APIs)
+LOG_NIVEL = os.getenv("LOG_NIVEL", "ERROR").upper()
+
+# Rotação do arquivo: "tamanho" (ao passar de LOG_TAMANHO_MAXIMO_MB) ou "diaria" (à meia-noite)
+LOG_ROTACAO = os.getenv("LOG_ROTACAO", "tamanho").lower()
+LOG_TAMANHO_MAXIMO_MB = float(os.getenv("LOG_TAMANHO_MAXIMO_MB", 5))
+
+# Número de arquivos antigos mantidos após a rotação
+LOG_ARQUIVOS_MANTIDOS = int(os.getenv("LOG_ARQUIVOS_MANTIDOS", 5))
+
+# Um erro idêntico a outro registrado há menos que este intervalo (s) não é gravado de novo; a
+# próxima ocorrência gravada informa quantas foram omitidas (ex: durante uma queda da API)
+LOG_INTERVALO_REPETICAO = float(os.getenv("LOG_INTERVALO_REPETICAO", 60))
+
+# Partes variáveis das mensagens ignoradas ao comparar registros repetidos: endereços de objetos
+# (ex: "<urllib3.connection.HTTPSConnection object at 0x7f...>") e números (portas, horários, contagens)
+PADRAO_VARIAVEL = re.compile(r"0x[0-9a-fA-F]+|\d+(?:\.\d+)?")
+
+# Número máximo de registros aguardando gravação; acima disso, os novos são descartados
+LOG_FILA_MAXIMA = 10000
+
+# Campos de contexto aceitos em "extra" e copiados para o JSON
+CAMPOS_CONTEXTO = ("endpoint", "status", "latencia_ms", "tipo", "snapshot_id", "aeronaves", "repeticoes_omitidas")
+
+_ouvinte = None
+_lock = threading.Lock()
+
+
+class FormatadorJson(logging.Formatter):
+    """
+    Formata cada registro como uma linha JSON, com os campos de contexto informados em "extra".
+    """
+
+    def format(self, record):
+        dados = {
+            "horario": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "modulo": record.module,
+            "mensagem": record.getMessage(),
+        }
+        for campo in CAMPOS_CONTEXTO:
+            valor = getattr(record, campo, None)
+            if valor is not None:
+                dados[campo] = valor
+        if record.exc_info:
+            dados["excecao"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class FiltroRepeticoes(logging.Filter):
+    """
+    Omite os registros repetidos dentro do intervalo informado.
+
+    Dois registros são repetidos quando vêm da mesma linha do código, com o mesmo nível e a mesma
+    mensagem sem as partes variáveis (PADRAO_VARIAVEL): durante uma queda da API, os erros de
+    conexão diferem só no endereço do objeto e continuam sendo reconhecidos como repetidos. A
+    próxima ocorrência depois do intervalo é registrada com o campo "repeticoes_omitidas".
+    """
+
+    def __init__(self, intervalo=LOG_INTERVALO_REPETICAO):
+        super().__init__()
+        self.intervalo = intervalo
+        self._ultimos = {}   # (nível, arquivo, linha, mensagem normalizada) -> [horário do último registro gravado, ocorrências omitidas]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.intervalo <= 0:
+            return True
+        chave = (record.levelno, record.pathname, record.lineno, PADRAO_VARIAVEL.sub("#", record.getMessage()))
+        with self._lock:
+            ultimo = self._ultimos.get(chave)
+            if ultimo is not None and record.created - ultimo[0] < self.intervalo:
+                ultimo[1] += 1
+                return False
+            if ultimo is not None and ultimo[1]:
+                record.repeticoes_omitidas = ultimo[1]
+            self._ultimos[chave] = [record.created, 0]
+
+            # Esquece as mensagens antigas para o dicionário não crescer sem limite
+            if len(self._ultimos) > 1000:
+                for antiga in [c for c, (instante, _) in self._ultimos.items() if record.created - instante >= self.intervalo]:
+                    del self._ultimos[antiga]
+        return True
+
+
+class _QueueHandlerSemBloqueio(QueueHandler):
+    """
+    Coloca os registros na fila sem nunca bloquear quem registra: com a fila cheia, o registro é descartado.
+    """
+
+    descartados = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+def configurar_registro():
+    """
+    Configura o logging do programa (uma única vez, mesmo que chamada por vários módulos).
+
+    Os módulos registram com logging.error(...) como de costume, mas o registro só é colocado
+    numa fila; uma thread (QueueListener) formata em JSON e grava no arquivo com rotação, de modo
+    que a gravação em disco nunca atrasa as buscas nem a exibição.
+    """
+    global _ouvinte
+    with _lock:
+        if _ouvinte is not None:
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(LOG_ARQUIVO)), exist_ok=True)
+        if LOG_ROTACAO == "diaria":
+            destino = TimedRotatingFileHandler(LOG_ARQUIVO, when="midnight", backupCount=LOG_ARQUIVOS_MANTIDOS, encoding="utf-8")
+        else:
+            destino = RotatingFileHandler(
+                LOG_ARQUIVO, maxBytes=int(LOG_TAMANHO_MAXIMO_MB * 1024 * 1024),
+                backupCount=LOG_ARQUIVOS_MANTIDOS, encoding="utf-8",
+            )
+        destino.setFormatter(FormatadorJson())
+
+        fila = queue.Queue(maxsize=LOG_FILA_MAXIMA)
+        entrada = _QueueHandlerSemBloqueio(fila)
+        # O filtro fica na entrada, para que os erros repetidos nem cheguem à fila
+        entrada.addFilter(FiltroRepeticoes())
+
+        raiz = logging.getLogger()
+        raiz.setLevel(getattr(logging, LOG_NIVEL, logging.ERROR))
+        raiz.addHandler(entrada)
+
+        _ouvinte = QueueListener(fila, destino, respect_handler_level=True)
+        _ouvinte.start()
+        atexit.register(encerrar_registro)
+
+
+def encerrar_registro():
+    """
+    Grava os registros ainda na fila e fecha o arquivo de log.
+    """
+    global _ouvinte
+    with _lock:
+        ouvinte, _ouvinte = _ouvinte, None
+    if ouvinte is not None:
+        ouvinte.stop()
+        for destino in ouvinte.handlers:
+            destino.close()
+
+
+def contexto_requisicao(url, resposta=None, erro=None, **extras):
+    """
+    Monta os campos de contexto de uma requisição HTTP para o "extra" do logging.
+
+    Parâmetros:
+    - url (str): URL da requisição (só o caminho é registrado, sem parâmetros nem credenciais).
+    - resposta (requests.Response, opcional): Resposta recebida.
+    - erro (Exception, opcional): Erro da requisição; a resposta é lida dele quando houver (ex: HTTPError).
+    - extras: Outros campos de contexto (ex: tipo="estados").
+
+    Retorna:
+    - dict: Campos "endpoint", "status" e "latencia_ms" (os disponíveis) e os extras.
+    """
+    if resposta is None:
+        resposta = getattr(erro, "response", None)
+    contexto = {"endpoint": urlsplit(url).path or url, **extras}
+    if resposta is not None:
+        contexto["status"] = resposta.status_code
+        contexto["latencia_ms"] = round(resposta.elapsed.total_seconds() * 1000, 1)
+    return contexto
+
@@ -0,0 +1,158 @@
+from rich.console import Console
+from rich.columns import Columns
+from rich.panel import Panel
+from rich.table import Table
+from collections import Counter
+import numpy as np
+import threading
+
+# Inicializa o console do rich
+console = Console()
+
+# Limites das faixas dos histogramas: altitude barométrica (m) e velocidade (m/s, como na OpenSky API)
+FAIXAS_ALTITUDE = [0, 1000, 3000, 6000, 9000, 11000, 13000, np.inf]
+FAIXAS_VELOCIDADE = [0, 50, 100, 150, 200, 250, 300, np.inf]
+
+# Setores de direção, de 45° cada, centrados nos pontos cardeais e intercardeais
+SETORES_DIRECAO = ["Norte", "Nordeste", "Leste", "Sudeste", "Sul", "Sudoeste", "Oeste", "Noroeste"]
+
+# Campos avaliados na taxa de valores ausentes: (nome exibido, posição no estado da OpenSky)
+CAMPOS_AUSENTES = [
+    ("Código de voo", 1),
+    ("Posição", 5),
+    ("Altitude barométrica", 7),
+    ("Velocidade", 9),
+    ("Direção", 10),
+    ("Razão vertical", 11),
+    ("Altitude geométrica", 13),
+    ("Squawk", 14),
+]
+
+# Número de países exibidos no painel
+LIMITE_PAISES = 10
+
+# Largura máxima das barras dos histogramas, em caracteres
+LARGURA_BARRA = 20
+
+
+def calcular_resumo(estados):
+    """
+    Calcula as estatísticas de um snapshot numa única passagem.
+
+    Os estados são transpostos uma vez em colunas (zip) e todas as agregações são feitas sobre
+    vetores do numpy, sem percorrer o snapshot de novo para cada estatística.
+
+    Parâmetros:
+    - estados (list): Estados de voo no formato da OpenSky API.
+
+    Retorna:
+    - dict: Totais ("total", "em_voo", "em_solo"), contagem por país ("paises", Counter),
+      histogramas de altitude e velocidade (listas de (faixa, quantidade)), contagem por setor
+      de direção ("direcoes") e proporção de valores ausentes por campo ("ausentes").
+    """
+    estados = [voo for voo in estados if len(voo) > 14]
+    total = len(estados)
+    resumo = {"total": total, "em_voo": 0, "em_solo": 0, "paises": Counter(), "altitudes": [],
+              "velocidades": [], "direcoes": [], "ausentes": []}
+    if not total:
+        return resumo
+
+    colunas = list(zip(*estados))
+    # None vira NaN na conversão para float, marcando os valores ausentes
+    numericas = {posicao: np.array(colunas[posicao], dtype=np.float64) for posicao in (5, 7, 9, 10, 11, 13)}
+    em_solo = np.array([bool(valor) for valor in colunas[8]])
+
+    resumo["em_solo"] = int(em_solo.sum())
+    resumo["em_voo"] = total - resumo["em_solo"]
+    resumo["paises"] = Counter(colunas[2])
+    resumo["paises"].pop(None, None)
+
+    # Os histogramas consideram só as aeronaves em voo
+    altitudes = numericas[7][~em_solo]
+    # Altitudes barométricas negativas (abaixo do nível do mar padrão) entram na primeira faixa
+    quantidades, _ = np.histogram(np.maximum(altitudes[~np.isnan(altitudes)], 0), bins=FAIXAS_ALTITUDE)
+    resumo["altitudes"] = list(zip(_rotulos_faixas(FAIXAS_ALTITUDE, "m"), quantidades.tolist()))
+
+    velocidades = numericas[9][~em_solo]
+    quantidades, _ = np.histogram(velocidades[~np.isnan(velocidades)], bins=FAIXAS_VELOCIDADE)
+    resumo["velocidades"] = list(zip(_rotulos_faixas(FAIXAS_VELOCIDADE, "m/s"), quantidades.tolist()))
+
+    direcoes = numericas[10][~np.isnan(numericas[10])]
+    setores = ((direcoes + 22.5) % 360 // 45).astype(np.int64)
+    resumo["direcoes"] = list(zip(SETORES_DIRECAO, np.bincount(setores, minlength=8).tolist()))
+
+    for nome, posicao in CAMPOS_AUSENTES:
+        if posicao in numericas:
+            ausentes = int(np.isnan(numericas[posicao]).sum())
+        else:
+            ausentes = sum(1 for valor in colunas[posicao] if not (valor or "").strip())
+        resumo["ausentes"].append((nome, ausentes / total))
+
+    return resumo
+
+
+def _rotulos_faixas(limites, unidade):
+    rotulos = [f"{inicio:,.0f}–{fim:,.0f} {unidade}" for inicio, fim in zip(limites[:-2], limites[1:-1])]
+    rotulos.append(f"≥ {limites[-2]:,.0f} {unidade}")
+    return rotulos
+
+
+# Resumo do último snapshot calculado, reaproveitado enquanto o snapshot não muda
+_resumo_atual = (None, None)
+_lock_resumo = threading.Lock()
+
+
+def obter_resumo(estados):
+    """
+    Retorna o resumo do snapshot, calculando-o apenas uma vez por snapshot.
+    """
+    global _resumo_atual
+    chave = getattr(estados, "id", id(estados))
+    with _lock_resumo:
+        if _resumo_atual[0] != chave:
+            _resumo_atual = (chave, calcular_resumo(estados))
+        return _resumo_atual[1]
+
+
+def exibir_resumo(resumo):
+    """
+    Exibe o resumo do snapshot em painéis compactos usando rich.
+    """
+    if not resumo["total"]:
+        console.print("[yellow]⚠️ Nenhum voo no snapshot. ⚠️[/yellow]")
+        return
+
+    geral = Table(show_header=False, box=None)
+    geral.add_row("Aeronaves", f"[bold]{resumo['total']:,}[/bold]")
+    geral.add_row("Em voo", f"[green]{resumo['em_voo']:,}[/green]")
+    geral.add_row("Em solo", f"[yellow]{resumo['em_solo']:,}[/yellow]")
+    geral.add_row("Países de origem", f"{len(resumo['paises']):,}")
+
+    paises = Table(show_header=False, box=None)
+    for pais, quantidade in resumo["paises"].most_common(LIMITE_PAISES):
+        paises.add_row(pais, f"{quantidade:,}", f"{quantidade / resumo['total']:.1%}")
+
+    ausentes = Table(show_header=False, box=None)
+    for nome, proporcao in resumo["ausentes"]:
+        cor = "red" if proporcao >= 0.5 else "yellow" if proporcao >= 0.1 else "green"
+        ausentes.add_row(nome, f"[{cor}]{proporcao:.1%}[/{cor}]")
+
+    console.print(Columns([
+        Panel(geral, title="✈️ Visão Geral", border_style="cyan"),
+        Panel(paises, title=f"🌍 Países (top {LIMITE_PAISES})", border_style="green"),
+        Panel(ausentes, title="❔ Campos Ausentes", border_style="red"),
+    ]))
+    console.print(Columns([
+        Panel(_histograma(resumo["altitudes"]), title="📏 Altitude (em voo)", border_style="yellow"),
+        Panel(_histograma(resumo["velocidades"]), title="🚀 Velocidade (em voo)", border_style="magenta"),
+        Panel(_histograma(resumo["direcoes"]), title="🧭 Direção", border_style="blue"),
+    ]))
+
+
+def _histograma(faixas):
+    maximo = max((quantidade for _, quantidade in faixas), default=0) or 1
+    table = Table(show_header=False, box=None)
+    for rotulo, quantidade in faixas:
+        barra = "█" * round(LARGURA_BARRA * quantidade / maximo)
+        table.add_row(rotulo, f"[cyan]{barra}[/cyan]", f"{quantidade:,}")
+    return table
@@ -0,0 +1,238 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from rich.console import Console
+from snapshot import GerenciadorSnapshot, SNAPSHOT_INTERVALO_ATUALIZACAO
+from lote import consultar_voos, consultar_busca, FAIXAS_DIRECAO
+from registro import configurar_registro
+from api import agendador
+import threading
+import argparse
+import logging
+import gzip
+import json
+import os
+
+# Inicializa o console do rich
+console = Console()
+
+# Porta padrão do serviço local de snapshots
+SERVICO_SNAPSHOT_PORTA = int(os.getenv("SERVICO_SNAPSHOT_PORTA", 8766))
+
+# Parâmetros de /voos convertidos em número e em verdadeiro/falso
+PARAMETROS_NUMERICOS = ("altitude_minima", "altitude_maxima", "velocidade_minima", "velocidade_maxima", "limite")
+PARAMETROS_LOGICOS = ("internacional", "altitude_conhecida", "em_solo")
+
+# Critérios de ordenação aceitos em /voos
+CRITERIOS_ORDENACAO = ("altitude", "velocidade", "callsign")
+
+
+class ParametroInvalido(ValueError):
+    """
+    Parâmetro de uma requisição inválido (respondido com HTTP 400). Os demais erros ao atender
+    uma requisição são erros internos (HTTP 500).
+    """
+
+
+class ServidorSnapshot(ThreadingHTTPServer):
+    """
+    Serviço local que busca os snapshots de estados da OpenSky e os compartilha entre vários clientes.
+
+    Um único GerenciadorSnapshot busca, guarda e grava os snapshots; cada cliente (o menu, o modo
+    em lote ou outras ferramentas) recebe o snapshot pronto, então N usuários na mesma máquina
+    custam uma única busca por atualização. Cada requisição é atendida numa thread própria, e o
+    corpo de cada snapshot é codificado (JSON e gzip) uma única vez, por mais clientes que o peçam.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, endereco, gerenciador):
+        super().__init__(endereco, ManipuladorSnapshot)
+        self.gerenciador = gerenciador
+        self.requisicoes = 0
+        self._corpo = (None, None, None)   # (id do snapshot, JSON, JSON compactado)
+        self._lock = threading.Lock()
+
+    def corpo_snapshot(self, snapshot):
+        """
+        Retorna o snapshot codificado em JSON e em JSON compactado (gzip), calculados uma vez por snapshot.
+        """
+        with self._lock:
+            if self._corpo[0] != snapshot.id:
+                dados = json.dumps({
+                    "id": snapshot.id, "horario": snapshot.horario, "tempo_servidor": snapshot.tempo_servidor,
+                    "origem": snapshot.origem, "estados": snapshot,
+                }, separators=(",", ":")).encode("utf-8")
+                self._corpo = (snapshot.id, dados, gzip.compress(dados, compresslevel=5))
+            return self._corpo[1], self._corpo[2]
+
+    def contar_requisicao(self):
+        with self._lock:
+            self.requisicoes += 1
+
+
+class ManipuladorSnapshot(BaseHTTPRequestHandler):
+    """
+    Atende as rotas do serviço:
+    - /snapshot: o snapshot atual completo (com ETag; responde 304 se o cliente já o tem);
+    - /voos: os voos filtrados, com os mesmos filtros do modo em lote (ex: ?altitude_minima=10000,
+      ?lat=-23.5&lon=-46.6&raio_nm=50 para um raio), mais ordenar e limite;
+    - /busca?termo=...: busca por código de voo ou ICAO24;
+    - /estado: id e idade do snapshot, requisições atendidas e créditos da OpenSky.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    # Silencia o log padrão de cada requisição do http.server
+    def log_message(self, formato, *args):
+        pass
+
+    def do_GET(self):
+        self.server.contar_requisicao()
+        endereco = urlsplit(self.path)
+        parametros = {chave: valores[-1] for chave, valores in parse_qs(endereco.query).items()}
+        try:
+            if endereco.path == "/estado":
+                self._rota_estado()
+                return
+
+            estados = self.server.gerenciador.obter_estados(silencioso=True)
+            if estados is None:
+                self._responder_json(503, {"erro": "Nenhum dado de voo disponível."})
+            elif endereco.path == "/snapshot":
+                self._rota_snapshot(estados)
+            elif endereco.path == "/voos":
+                voos = list(consultar_voos(estados, _ler_consulta(parametros)))
+                self._responder_json(200, {"id": estados.id, "horario": estados.horario, "total": len(voos), "estados": voos})
+            elif endereco.path == "/busca":
+                if not parametros.get("termo"):
+                    raise ParametroInvalido("informe o parâmetro termo")
+                aproximada = parametros.get("aproximada", "true").strip().lower() in ("1", "true", "sim", "s")
+                voos = consultar_busca(estados, {"termo": parametros["termo"], "aproximada": aproximada})
+                self._responder_json(200, {"id": estados.id, "horario": estados.horario, "total": len(voos), "estados": voos})
+            else:
+                self._responder_json(404, {"erro": "Rota não encontrada."})
+        except ParametroInvalido as e:
+            self._responder_json(400, {"erro": str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            logging.error(f"Erro ao atender {endereco.path} no serviço de snapshots: {e}")
+            self._responder_json(500, {"erro": "Erro interno."})
+
+    def _rota_snapshot(self, estados):
+        etag = f'"{estados.id}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        dados, compactados = self.server.corpo_snapshot(estados)
+        aceita_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("ETag", etag)
+        if aceita_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        corpo = compactados if aceita_gzip else dados
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _rota_estado(self):
+        atual = self.server.gerenciador.snapshot_atual()
+        self._responder_json(200, {
+            "snapshot_id": atual.id if atual is not None else None,
+            "idade": round(atual.idade(), 1) if atual is not None else None,
+            "aeronaves": len(atual) if atual is not None else 0,
+            "requisicoes": self.server.requisicoes,
+            "creditos_restantes": agendador.creditos_restantes(),
+            "creditos_usados": agendador.creditos_usados(),
+        })
+
+    def _responder_json(self, status, dados):
+        corpo = json.dumps(dados, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+def _ler_consulta(parametros):
+    """
+    Converte os parâmetros da URL de /voos numa consulta no formato do modo em lote, validando-os.
+
+    Exceções:
+    - ParametroInvalido: Se algum parâmetro tiver um valor inválido.
+    """
+    consulta = {}
+    for chave, valor in parametros.items():
+        if chave in PARAMETROS_NUMERICOS:
+            consulta[chave] = _ler_numero(chave, valor)
+        elif chave in PARAMETROS_LOGICOS:
+            consulta[chave] = valor.strip().lower() in ("1", "true", "sim", "s")
+        elif chave in ("direcao", "pais", "ordenar"):
+            consulta[chave] = valor
+    if "limite" in consulta and (consulta["limite"] < 0 or not consulta["limite"].is_integer()):
+        raise ParametroInvalido(f"limite inválido: {parametros['limite']}")
+    if "direcao" in consulta and consulta["direcao"].strip().lower() not in FAIXAS_DIRECAO:
+        raise ParametroInvalido(f"direção inválida: {consulta['direcao']}")
+    if "ordenar" in consulta and consulta["ordenar"] not in CRITERIOS_ORDENACAO:
+        raise ParametroInvalido(f"critério de ordenação inválido: {consulta['ordenar']}")
+    if {"lat", "lon", "raio_nm"} <= parametros.keys():
+        consulta["area"] = {chave: _ler_numero(chave, parametros[chave]) for chave in ("lat", "lon", "raio_nm")}
+    return consulta
+
+
+def _ler_numero(chave, valor):
+    try:
+        numero = float(valor)
+    except ValueError:
+        raise ParametroInvalido(f"{chave} deve ser um número: {valor}") from None
+    if numero != numero or numero in (float("inf"), float("-inf")):
+        raise ParametroInvalido(f"{chave} deve ser um número finito: {valor}")
+    return numero
+
+
+def main():
+    """
+    Inicia o serviço local de snapshots (ex: uma vez por máquina, compartilhado por vários usuários).
+    """
+    parser = argparse.ArgumentParser(
+        description="Serviço local que busca os snapshots de estados da OpenSky e os compartilha entre vários clientes."
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço em que o serviço escuta.")
+    parser.add_argument("--porta", type=int, default=SERVICO_SNAPSHOT_PORTA, help="Porta do serviço.")
+    parser.add_argument("--intervalo", type=float, default=SNAPSHOT_INTERVALO_ATUALIZACAO,
+                        help="Intervalo (s) entre as atualizações do snapshot.")
+    args = parser.parse_args()
+
+    configurar_registro()
+    # O serviço busca diretamente na OpenSky, mesmo que o .env aponte os clientes para ele
+    gerenciador = GerenciadorSnapshot(intervalo=args.intervalo, servico="")
+
+    try:
+        servidor = ServidorSnapshot((args.host, args.porta), gerenciador)
+    except OSError as e:
+        console.print(f"[red]⚠️ Não foi possível iniciar o serviço na porta {args.porta}: {e} ⚠️[/red]")
+        return
+
+    gerenciador.iniciar()
+    base_url = f"http://{args.host}:{args.porta}"
+    console.print(f"[green]✅ Serviço de snapshots ouvindo em {base_url}[/green]")
+    console.print("[cyan]Configure o .env dos clientes para usar o serviço:[/cyan]")
+    console.print(f"[cyan]  SERVICO_SNAPSHOT_URL={base_url}[/cyan]")
+
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        console.print("[yellow]🚪 Encerrando serviço de snapshots...[/yellow]")
+    finally:
+        gerenciador.encerrar()
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,521 @@
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from rich.console import Console
+from agendador import custo_requisicao
+
+# Inicializa o console do rich
+console = Console()
+
+# Dados usados para gerar aeronaves sintéticas
+PAISES = ["Brazil", "United States", "Argentina", "Portugal", "Chile", "France", "Germany", "United Kingdom", "Spain", "Mexico"]
+PREFIXOS_CALLSIGN = ["TAM", "GLO", "AZU", "AAL", "UAL", "DAL", "TAP", "ARG", "LAN", "AFR", "DLH", "BAW", "IBE", "AMX"]
+AEROPORTOS = ["SBGR", "SBSP", "SBGL", "SBBR", "SBKP", "SBCF", "SBPA", "SBRF", "SBSV", "KJFK", "KMIA", "EGLL", "LPPT", "LFPG", "EDDF", "LEMD", "SAEZ", "SCEL", "MMMX"]
+
+# Conversões usadas nas rotas da ADS-B Exchange (que trabalham em pés e nós)
+METROS_PARA_PES = 3.28084
+MS_PARA_NOS = 1.94384
+MILHA_NAUTICA_EM_METROS = 1852.0
+
+
+class ConfiguracaoMock:
+    """
+    Parâmetros de latência, tamanho de payload e injeção de falhas do servidor mock.
+    """
+
+    def __init__(self, latencia=0.0, variacao=0.0, aeronaves=2000, taxa_504=0.0,
+                 taxa_timeout=0.0, atraso_timeout=35.0, gravado=None, semente=42, creditos=None):
+        self.latencia = latencia
+        self.variacao = variacao
+        self.aeronaves = aeronaves
+        self.taxa_504 = taxa_504
+        self.taxa_timeout = taxa_timeout
+        self.atraso_timeout = atraso_timeout
+        self.gravado = gravado
+        self.semente = semente
+        self.creditos = creditos
+
+
+class DadosSinteticos:
+    """
+    Gera estados de voo sintéticos que se deslocam com o tempo ou reproduz uma resposta gravada
+    da rota /states/all da OpenSky.
+
+    Os estados de cada segundo são calculados uma única vez e reaproveitados por todas as
+    requisições daquele segundo, para que o mock aguente taxas altas de requisição.
+    """
+
+    def __init__(self, configuracao):
+        self.configuracao = configuracao
+        self.inicio = time.time()
+        self._lock = threading.Lock()
+        self._cache_segundo = None
+        self._cache_estados = None
+
+        if configuracao.gravado:
+            self.base = self._carregar_gravado(configuracao.gravado, configuracao.aeronaves)
+        else:
+            self.base = self._gerar_base(configuracao.aeronaves, configuracao.semente)
+
+    def _carregar_gravado(self, caminho, quantidade):
+        """
+        Carrega uma resposta gravada de /states/all e a ajusta ao número de aeronaves desejado.
+        """
+        with open(caminho, "r", encoding="utf-8") as arquivo:
+            dados = json.load(arquivo)
+
+        estados = dados.get("states") or []
+        if not estados:
+            raise ValueError(f"O arquivo gravado {caminho} não contém estados de voo.")
+
+        # Replica os estados gravados (com icao24 distintos) até atingir o tamanho pedido
+        base = []
+        for i in range(quantidade or len(estados)):
+            estado = list(estados[i % len(estados)])
+            if i >= len(estados):
+                estado[0] = f"{i:06x}"[-6:]
+            base.append(estado)
+        return base
+
+    def _gerar_base(self, quantidade, semente):
+        """
+        Gera as posições iniciais de um conjunto de aeronaves sintéticas.
+        """
+        aleatorio = random.Random(semente)
+        base = []
+        for i in range(quantidade):
+            no_solo = aleatorio.random() < 0.1
+            base.append([
+                f"{i:06x}"[-6:],
+                f"{aleatorio.choice(PREFIXOS_CALLSIGN)}{aleatorio.randint(1, 9999)}".ljust(8),
+                aleatorio.choice(PAISES),
+                None,
+                None,
+                aleatorio.uniform(-180, 180),
+                aleatorio.uniform(-60, 70),
+                None if no_solo else round(aleatorio.uniform(300, 12500), 2),
+                no_solo,
+                round(aleatorio.uniform(0, 15), 2) if no_solo else round(aleatorio.uniform(60, 260), 2),
+                round(aleatorio.uniform(0, 360), 2),
+                0.0 if no_solo else round(aleatorio.uniform(-15, 15), 2),
+                None,
+                None,
+                aleatorio.choice(["1000", "2000", "7000", None]),
+                False,
+                0,
+            ])
+        return base
+
+    def estados(self):
+        """
+        Retorna os estados do segundo atual, deslocando cada aeronave ao longo da sua direção.
+        """
+        agora = int(time.time())
+        with self._lock:
+            if self._cache_segundo == agora:
+                return self._cache_estados
+
+            decorrido = agora - self.inicio
+            estados = []
+            for base in self.base:
+                estado = list(base)
+                estado[3] = agora
+                estado[4] = agora
+                if not self.configuracao.gravado and not estado[8]:
+                    # Desloca a aeronave pela distância percorrida desde o início
+                    distancia = estado[9] * decorrido
+                    rumo = math.radians(estado[10])
+                    lat = estado[6] + distancia * math.cos(rumo) / 111320.0
+                    lon = estado[5] + distancia * math.sin(rumo) / (111320.0 * max(math.cos(math.radians(estado[6])), 0.01))
+                    estado[6] = round(max(min(lat, 85.0), -85.0), 4)
+                    estado[5] = round((lon + 180.0) % 360.0 - 180.0, 4)
+                    estado[13] = estado[7]
+                estados.append(estado)
+
+            self._cache_segundo = agora
+            self._cache_estados = estados
+            return estados
+
+
+class ManipuladorMock(BaseHTTPRequestHandler):
+    """
+    Atende as rotas da OpenSky e da ADS-B Exchange usadas pelo Check_Voo.
+    """
+
+    # As rotas são casadas pelo final do caminho, para aceitar qualquer prefixo configurado
+    # em OPENSKY_API_URL, OPENSKY_HISTORICAL_URL e ADSBEXCHANGE_API_URL.
+    ROTAS = [
+        (re.compile(r"/states/all/?$"), "_rota_estados"),
+        (re.compile(r"/flights/(?P<tipo>[a-z]+)/?$"), "_rota_voos_historicos"),
+        (re.compile(r"/tracks(/all)?/?$"), "_rota_trajetoria"),
+        (re.compile(r"/lat/(?P<lat>[-\d.]+)/lon/(?P<lon>[-\d.]+)/dist/(?P<dist>[\d.]+)/?$"), "_rota_aeronaves_proximas"),
+        (re.compile(r"/icao/(?P<icao>[0-9A-Za-z]+)/?$"), "_rota_icao"),
+        (re.compile(r"/_mock/estatisticas/?$"), "_rota_estatisticas"),
+    ]
+
+    # Silencia o log padrão de cada requisição do http.server
+    def log_message(self, formato, *args):
+        pass
+
+    def do_GET(self):
+        servidor = self.server
+        self._cabecalhos_extras = {}
+        url = urlparse(self.path)
+        parametros = {chave: valores[0] for chave, valores in parse_qs(url.query).items()}
+
+        for padrao, nome_rota in self.ROTAS:
+            correspondencia = padrao.search(url.path)
+            if correspondencia:
+                break
+        else:
+            self._responder(404, {"erro": f"Rota não encontrada: {url.path}"})
+            return
+
+        if nome_rota == "_rota_estatisticas":
+            self._rota_estatisticas(parametros)
+            return
+
+        servidor.contar("requisicoes")
+        if not self._aplicar_falhas(servidor.configuracao):
+            return
+
+        getattr(self, nome_rota)(parametros, **correspondencia.groupdict())
+
+    def _aplicar_falhas(self, configuracao):
+        """
+        Aplica a latência configurada e injeta 504 ou timeout conforme as taxas definidas.
+
+        Retorna:
+        - bool: True se a requisição deve seguir para a rota, False se já foi respondida.
+        """
+        sorteio = random.random()
+        if sorteio < configuracao.taxa_timeout:
+            # Segura a conexão por mais tempo que o timeout do cliente e fecha sem resposta
+            self.server.contar("timeouts")
+            time.sleep(configuracao.atraso_timeout)
+            self.close_connection = True
+            return False
+
+        atraso = configuracao.latencia + random.uniform(0, configuracao.variacao)
+        if atraso > 0:
+            time.sleep(atraso)
+
+        if sorteio < configuracao.taxa_timeout + configuracao.taxa_504:
+            self.server.contar("erros_504")
+            self._responder(504, {"erro": "Gateway Time-out"})
+            return False
+
+        return True
+
+    def _consumir_creditos(self, tipo, parametros):
+        """
+        Desconta os créditos da requisição, como a OpenSky faz, respondendo 429 quando a cota acaba.
+
+        Retorna:
+        - bool: True se a requisição pode seguir, False se já foi respondida com 429.
+        """
+        restantes = self.server.consumir_creditos(custo_requisicao(tipo, parametros))
+        if restantes is None:
+            return True
+        if restantes < 0:
+            self.server.contar("erros_429")
+            self._responder(429, {"erro": "Too many requests"}, {"X-Rate-Limit-Retry-After-Seconds": "60"})
+            return False
+        self._cabecalhos_extras = {"X-Rate-Limit-Remaining": str(restantes)}
+        return True
+
+    def _responder(self, status, corpo, cabecalhos=None):
+        dados = corpo if isinstance(corpo, bytes) else json.dumps(corpo).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        cabecalhos = {**self._cabecalhos_extras, **(cabecalhos or {})}
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _rota_estados(self, parametros):
+        # Suporta a busca por área (lamin/lomin/lamax/lomax) da OpenSky
+        area = None
+        if {"lamin", "lomin", "lamax", "lomax"} <= parametros.keys():
+            try:
+                area = [float(parametros[chave]) for chave in ("lamin", "lomin", "lamax", "lomax")]
+            except ValueError:
+                self._responder(400, {"erro": "Parâmetros lamin/lomin/lamax/lomax inválidos."})
+                return
+
+        if not self._consumir_creditos("estados", parametros):
+            return
+
+        estados = self.server.dados.estados()
+
+        if area is not None:
+            lamin, lomin, lamax, lomax = area
+            # Estados sem posição (comuns nas respostas gravadas) ficam fora de qualquer área
+            estados = [
+                e for e in estados
+                if e[5] is not None and e[6] is not None and lamin <= e[6] <= lamax and lomin <= e[5] <= lomax
+            ]
+
+        self._responder(200, {"time": int(time.time()), "states": estados})
+
+    def _rota_voos_historicos(self, parametros, tipo):
+        if tipo not in ("arrival", "departure", "all"):
+            self._responder(404, {"erro": f"Tipo de voo inválido: {tipo}"})
+            return
+
+        try:
+            inicio = int(parametros["begin"])
+            fim = int(parametros["end"])
+        except (KeyError, ValueError):
+            self._responder(400, {"erro": "Parâmetros begin/end inválidos."})
+            return
+
+        # A OpenSky recusa intervalos maiores que 2 horas
+        if fim <= inicio or fim - inicio > 7200:
+            self._responder(400, {"erro": "Intervalo de tempo inválido."})
+            return
+
+        # Só as requisições válidas consomem créditos
+        if not self._consumir_creditos("historico", parametros):
+            return
+
+        # Gera voos determinísticos para o intervalo, para que consultas repetidas sejam iguais
+        aleatorio = random.Random(inicio)
+        voos = []
+        for estado in self.server.dados.base[: max(1, len(self.server.dados.base) // 10)]:
+            partida = aleatorio.randint(inicio - 4 * 3600, fim)
+            chegada = partida + aleatorio.randint(1800, 4 * 3600)
+            origem, destino = aleatorio.sample(AEROPORTOS, 2)
+            voos.append({
+                "icao24": estado[0],
+                "firstSeen": partida,
+                "estDepartureAirport": origem,
+                "lastSeen": chegada,
+                "estArrivalAirport": destino,
+                "callsign": estado[1],
+                "estDepartureAirportHorizDistance": aleatorio.randint(0, 3000),
+                "estDepartureAirportVertDistance": aleatorio.randint(0, 300),
+                "estArrivalAirportHorizDistance": aleatorio.randint(0, 3000),
+                "estArrivalAirportVertDistance": aleatorio.randint(0, 300),
+                "departureAirportCandidatesCount": 1,
+                "arrivalAirportCandidatesCount": 1,
+            })
+
+        campo = "firstSeen" if tipo == "departure" else "lastSeen"
+        voos = [v for v in voos if tipo == "all" or inicio <= v[campo] <= fim]
+        self._responder(200, voos)
+
+    def _rota_trajetoria(self, parametros):
+        icao24 = parametros.get("icao24", "").lower()
+        try:
+            horario = int(parametros.get("time", 0))
+        except ValueError:
+            self._responder(400, {"erro": "Parâmetro time inválido."})
+            return
+
+        if not self._consumir_creditos("trajetoria", parametros):
+            return
+
+        estado = next((e for e in self.server.dados.base if e[0] == icao24), None)
+        if estado is None:
+            self._responder(404, {"erro": "Trajetória não encontrada."})
+            return
+
+        # Trajetória determinística a partir da aeronave e do horário: um ponto a cada 15 s,
+        # com curvas suaves e subida, cruzeiro e descida
+        aleatorio = random.Random(f"{icao24}-{horario}")
+        lat, lon = estado[6], estado[5]
+        direcao = aleatorio.uniform(0, 360)
+        velocidade = aleatorio.uniform(180, 250)
+        cruzeiro = aleatorio.uniform(9000, 12000)
+        quantidade = aleatorio.randint(120, 480)
+        caminho = []
+        for i in range(quantidade):
+            progresso = i / (quantidade - 1)
+            altitude = cruzeiro * min(1.0, progresso * 5, (1 - progresso) * 5)
+            caminho.append([horario + 15 * i, round(lat, 5), round(lon, 5), round(altitude), round(direcao % 360, 1), i in (0, quantidade - 1)])
+            direcao += aleatorio.gauss(0, 1.5)
+            distancia = velocidade * 15 / 111320.0
+            lat = max(-85.0, min(85.0, lat + distancia * math.cos(math.radians(direcao))))
+            lon = (lon + distancia * math.sin(math.radians(direcao)) / max(0.1, math.cos(math.radians(lat))) + 180) % 360 - 180
+
+        self._responder(200, {
+            "icao24": icao24,
+            "startTime": caminho[0][0],
+            "endTime": caminho[-1][0],
+            "callsign": estado[1],
+            "path": caminho,
+        })
+
+    def _rota_aeronaves_proximas(self, parametros, lat, lon, dist):
+        try:
+            lat, lon, dist = float(lat), float(lon), float(dist)
+        except ValueError:
+            self._responder(400, {"erro": "Parâmetros lat/lon/dist inválidos."})
+            return
+        raio_metros = dist * MILHA_NAUTICA_EM_METROS
+
+        aeronaves = []
+        for estado in self.server.dados.estados():
+            if estado[6] is None or estado[5] is None:
+                continue
+            if _distancia_metros(lat, lon, estado[6], estado[5]) <= raio_metros:
+                aeronaves.append(_converter_para_adsb(estado))
+
+        self._responder(200, {"ac": aeronaves, "total": len(aeronaves), "now": int(time.time() * 1000)})
+
+    def _rota_icao(self, parametros, icao):
+        icao = icao.lower()
+        estado = next((e for e in self.server.dados.base if e[0] == icao), None)
+        if estado is None:
+            self._responder(200, [])
+            return
+
+        # O destino é sorteado a partir do icao24, para ser estável entre requisições
+        aleatorio = random.Random(int(icao, 16) if re.fullmatch(r"[0-9a-f]+", icao) else icao)
+        resposta = _converter_para_adsb(estado)
+        resposta["estArrivalAirport"] = aleatorio.choice(AEROPORTOS)
+        self._responder(200, [resposta])
+
+    def _rota_estatisticas(self, parametros):
+        self._responder(200, self.server.estatisticas())
+
+
+class ServidorMock(ThreadingHTTPServer):
+    """
+    Servidor HTTP multithread que substitui a OpenSky e a ADS-B Exchange localmente.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, endereco, configuracao):
+        super().__init__(endereco, ManipuladorMock)
+        self.configuracao = configuracao
+        self.dados = DadosSinteticos(configuracao)
+        self._lock_contadores = threading.Lock()
+        self._contadores = {"requisicoes": 0, "erros_504": 0, "erros_429": 0, "timeouts": 0}
+        self._creditos = configuracao.creditos
+
+    def contar(self, nome):
+        with self._lock_contadores:
+            self._contadores[nome] += 1
+
+    def consumir_creditos(self, custo):
+        """
+        Desconta créditos da cota simulada e retorna o saldo (negativo se esgotado), ou None sem cota.
+        """
+        with self._lock_contadores:
+            if self._creditos is None:
+                return None
+            if self._creditos < custo:
+                return -1
+            self._creditos -= custo
+            return self._creditos
+
+    def estatisticas(self):
+        with self._lock_contadores:
+            return {**self._contadores, "creditos_restantes": self._creditos}
+
+
+def _distancia_metros(lat1, lon1, lat2, lon2):
+    """
+    Calcula a distância aproximada (fórmula de haversine) entre dois pontos, em metros.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * 6371000.0 * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def _converter_para_adsb(estado):
+    """
+    Converte um vetor de estado da OpenSky no formato de aeronave da ADS-B Exchange.
+    """
+    return {
+        "hex": estado[0],
+        "icao": estado[0].upper(),
+        "call": (estado[1] or "").strip(),
+        "cou": estado[2],
+        "lat": estado[6],
+        "lon": estado[5],
+        "alt": round(estado[7] * METROS_PARA_PES) if estado[7] is not None else None,
+        "spd": round(estado[9] * MS_PARA_NOS, 1) if estado[9] is not None else None,
+        "trak": estado[10],
+        "vsi": round(estado[11] * METROS_PARA_PES * 60) if estado[11] is not None else None,
+        "gnd": "1" if estado[8] else "0",
+        "sqk": estado[14],
+    }
+
+
+def iniciar_servidor_mock(configuracao, host="127.0.0.1", porta=8089):
+    """
+    Inicia o servidor mock em uma thread de fundo e retorna a instância do servidor.
+
+    Útil em testes de carga, onde o cliente e o mock rodam no mesmo processo.
+    Para encerrar, chame servidor.shutdown().
+    """
+    servidor = ServidorMock((host, porta), configuracao)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    return servidor
+
+
+def main():
+    """
+    Lê os parâmetros da linha de comando e executa o servidor mock até ser interrompido.
+    """
+    parser = argparse.ArgumentParser(description="Servidor local que simula a OpenSky e a ADS-B Exchange.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8089)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Latência fixa de cada resposta, em segundos.")
+    parser.add_argument("--variacao", type=float, default=0.0, help="Latência adicional aleatória (0 a N segundos).")
+    parser.add_argument("--aeronaves", type=int, default=2000, help="Número de aeronaves em /states/all (tamanho do payload).")
+    parser.add_argument("--taxa-504", type=float, default=0.0, help="Fração das requisições respondidas com 504 (0 a 1).")
+    parser.add_argument("--taxa-timeout", type=float, default=0.0, help="Fração das requisições que nunca respondem (0 a 1).")
+    parser.add_argument("--atraso-timeout", type=float, default=35.0, help="Tempo que uma requisição com timeout fica pendurada, em segundos.")
+    parser.add_argument("--gravado", help="Arquivo JSON com uma resposta gravada de /states/all.")
+    parser.add_argument("--semente", type=int, default=42, help="Semente dos dados sintéticos.")
+    parser.add_argument("--creditos", type=int, help="Cota de créditos simulada; ao esgotar, a OpenSky responde 429.")
+    args = parser.parse_args()
+
+    configuracao = ConfiguracaoMock(
+        latencia=args.latencia,
+        variacao=args.variacao,
+        aeronaves=args.aeronaves,
+        taxa_504=args.taxa_504,
+        taxa_timeout=args.taxa_timeout,
+        atraso_timeout=args.atraso_timeout,
+        gravado=args.gravado,
+        semente=args.semente,
+        creditos=args.creditos,
+    )
+
+    servidor = ServidorMock((args.host, args.porta), configuracao)
+    base_url = f"http://{args.host}:{args.porta}"
+    console.print(f"[green]✅ Servidor mock ouvindo em {base_url}[/green]")
+    console.print("[cyan]Configure o .env para usar o mock:[/cyan]")
+    console.print(f"[cyan]  OPENSKY_API_URL={base_url}/states/all[/cyan]")
+    console.print(f"[cyan]  OPENSKY_HISTORICAL_URL={base_url}/flights/{{type}}?begin={{start}}&end={{end}}[/cyan]")
+    console.print(f"[cyan]  OPENSKY_TRACKS_URL={base_url}/tracks/all[/cyan]")
+    console.print(f"[cyan]  ADSBEXCHANGE_API_URL={base_url}[/cyan]")
+
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        console.print("[yellow]🚪 Encerrando servidor mock...[/yellow]")
+    finally:
+        servidor.server_close()
+
+
+# Verifica se o script está sendo executado diretamente (não importado)
+if __name__ == "__main__":
+    main()
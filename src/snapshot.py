@@ -0,0 +1,472 @@
+from rich.console import Console
+from api import buscar_estados_opensky, agendador
+import numpy as np
+import threading
+import requests
+import logging
+import struct
+import json
+import time
+import os
+
+# Inicializa o console do rich
+console = Console()
+
+# Arquivo com o último snapshot de estados recebido da OpenSky, reaproveitado na próxima inicialização
+SNAPSHOT_DIR = os.path.join(os.path.dirname(__file__), '..', 'cache')
+SNAPSHOT_ARQUIVO = os.path.join(SNAPSHOT_DIR, "ultimo_snapshot.bin")
+
+# Snapshots mais novos que isto (em segundos) são usados sem disparar uma nova busca; com as
+# atualizações periódicas ativas, é a folga além do intervalo entre elas (ver GerenciadorSnapshot.idade_limite)
+SNAPSHOT_IDADE_MAXIMA = float(os.getenv("SNAPSHOT_IDADE_MAXIMA", 30))
+
+# Intervalo (s) entre as atualizações em segundo plano enquanto o menu está em uso; o intervalo
+# efetivo nunca é menor que o recomendado pelo agendador para caber na cota diária de créditos
+SNAPSHOT_INTERVALO_ATUALIZACAO = float(os.getenv("SNAPSHOT_INTERVALO_ATUALIZACAO", 30))
+
+# Sem nenhuma atividade no menu por este tempo (s), as atualizações em segundo plano são pausadas
+SNAPSHOT_PAUSA_OCIOSO = float(os.getenv("SNAPSHOT_PAUSA_OCIOSO", 300))
+
+# Endereço do serviço local de snapshots (servico_snapshot.py), ex: http://127.0.0.1:8766. Se
+# definido, os snapshots vêm do serviço, compartilhado por todos os usuários da máquina, e não
+# diretamente da OpenSky (que só é usada se o serviço não responder)
+SERVICO_SNAPSHOT_URL = os.getenv("SERVICO_SNAPSHOT_URL", "").rstrip("/")
+
+# Identificação e versão do formato do arquivo
+ASSINATURA = b"CVSNAP01"
+
+# Colunas gravadas, na ordem dos campos dos estados da OpenSky API, e o tipo de cada uma.
+# Campos numéricos opcionais usam NaN para "ausente"; o país de origem é gravado como
+# índice de uma lista de países no cabeçalho. O campo "sensors" não é gravado.
+COLUNAS = [
+    ("icao24", "S8"),
+    ("callsign", "S8"),
+    ("origin_country", "<u2"),
+    ("time_position", "<f8"),
+    ("last_contact", "<f8"),
+    ("longitude", "<f8"),
+    ("latitude", "<f8"),
+    ("baro_altitude", "<f8"),
+    ("on_ground", "i1"),
+    ("velocity", "<f8"),
+    ("true_track", "<f8"),
+    ("vertical_rate", "<f8"),
+    ("geo_altitude", "<f8"),
+    ("squawk", "S4"),
+    ("spi", "i1"),
+    ("position_source", "i1"),
+]
+
+# Posição de cada coluna no estado da OpenSky (o índice 12, "sensors", é pulado)
+POSICOES = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 13, 14, 15, 16]
+
+
+class Snapshot(list):
+    """
+    Lista de estados de voo com o horário em que foram obtidos e a origem dos dados
+    ("api" para uma busca nesta execução, "disco" para o snapshot salvo anteriormente,
+    "servico" para um snapshot recebido do serviço local de snapshots). O horário é o relógio
+    local da busca; tempo_servidor é o horário da OpenSky a que os estados se referem (na mesma
+    base que os campos time_position e last_contact), quando conhecido.
+    """
+
+    def __init__(self, estados, horario, origem, tempo_servidor=None):
+        super().__init__(estados)
+        self.horario = horario
+        self.origem = origem
+        self.tempo_servidor = tempo_servidor
+        # Identifica o snapshot (o mesmo conteúdo carregado do disco mantém o mesmo id)
+        self.id = f"{int(horario * 1000)}-{len(self)}"
+
+    def idade(self):
+        """
+        Retorna há quantos segundos os dados foram obtidos.
+        """
+        return max(0.0, time.time() - self.horario)
+
+
+def salvar_snapshot(snapshot, caminho=SNAPSHOT_ARQUIVO):
+    """
+    Grava o snapshot em formato binário colunar.
+
+    O arquivo é escrito num temporário e depois renomeado, de modo que quem lê nunca
+    encontra um arquivo pela metade.
+    """
+    paises = sorted({voo[2] or "" for voo in snapshot})
+    indice_pais = {pais: i for i, pais in enumerate(paises)}
+    total = len(snapshot)
+
+    colunas = []
+    for (nome, tipo), posicao in zip(COLUNAS, POSICOES):
+        valores = [voo[posicao] if len(voo) > posicao else None for voo in snapshot]
+        if nome == "origin_country":
+            dados = np.array([indice_pais[valor or ""] for valor in valores], dtype=tipo)
+        elif tipo.startswith("S"):
+            dados = np.array([(valor or "").encode("ascii", "replace") for valor in valores], dtype=tipo)
+        elif tipo == "i1":
+            dados = np.array([-1 if valor is None else int(valor) for valor in valores], dtype=tipo)
+        else:
+            dados = np.array([np.nan if valor is None else valor for valor in valores], dtype=tipo)
+        colunas.append(dados.reshape(total))
+
+    # Cada coluna começa num deslocamento múltiplo de 8 bytes
+    descricao = []
+    deslocamento = 0
+    for (nome, tipo), dados in zip(COLUNAS, colunas):
+        descricao.append({"nome": nome, "tipo": tipo, "deslocamento": deslocamento})
+        deslocamento += -(-dados.nbytes // 8) * 8
+
+    cabecalho = json.dumps({"horario": snapshot.horario, "tempo_servidor": snapshot.tempo_servidor, "linhas": total, "paises": paises, "colunas": descricao}).encode("utf-8")
+    inicio_dados = -(-(len(ASSINATURA) + 4 + len(cabecalho)) // 8) * 8
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(ASSINATURA)
+        arquivo.write(struct.pack("<I", len(cabecalho)))
+        arquivo.write(cabecalho)
+        for item, dados in zip(descricao, colunas):
+            arquivo.seek(inicio_dados + item["deslocamento"])
+            arquivo.write(dados.tobytes())
+        arquivo.truncate(inicio_dados + deslocamento)
+    os.replace(temporario, caminho)
+
+
+def carregar_snapshot(caminho=SNAPSHOT_ARQUIVO):
+    """
+    Carrega o snapshot salvo, lendo o arquivo de uma vez e decodificando cada coluna inteira.
+
+    Os estados voltam como listas comuns (o formato usado por todo o programa): cada coluna é
+    convertida numa só operação, sem decodificar texto nem JSON por voo, mas todos os estados
+    são montados na carga.
+
+    Retorna:
+    - Snapshot: Os estados salvos (origem "disco"), ou None se o arquivo não existir ou for inválido.
+    """
+    if not os.path.exists(caminho):
+        return None
+
+    try:
+        with open(caminho, "rb") as arquivo:
+            conteudo = arquivo.read()
+        if conteudo[:len(ASSINATURA)] != ASSINATURA:
+            raise ValueError("assinatura inválida")
+        tamanho_cabecalho = struct.unpack_from("<I", conteudo, len(ASSINATURA))[0]
+        inicio_cabecalho = len(ASSINATURA) + 4
+        cabecalho = json.loads(conteudo[inicio_cabecalho:inicio_cabecalho + tamanho_cabecalho])
+        inicio_dados = -(-(inicio_cabecalho + tamanho_cabecalho) // 8) * 8
+        total = cabecalho["linhas"]
+
+        colunas = {}
+        for item in cabecalho["colunas"]:
+            tipo = np.dtype(item["tipo"])
+            colunas[item["nome"]] = np.frombuffer(conteudo, dtype=tipo, count=total,
+                                                  offset=inicio_dados + item["deslocamento"])
+
+        return Snapshot(_montar_estados(colunas, cabecalho["paises"]), cabecalho["horario"], "disco",
+                        cabecalho.get("tempo_servidor"))
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        logging.error(f"Erro ao carregar o snapshot salvo em {caminho}: {e}")
+        return None
+
+
+def _montar_estados(colunas, paises):
+    """
+    Converte as colunas lidas do arquivo de volta em estados no formato da OpenSky API.
+    """
+    convertidas = []
+    for nome, tipo in COLUNAS:
+        dados = colunas[nome]
+        if nome == "origin_country":
+            valores = [paises[i] or None for i in dados.tolist()]
+        elif tipo.startswith("S"):
+            valores = [valor.decode("ascii") or None for valor in dados.tolist()]
+        elif tipo == "i1":
+            valores = [None if valor < 0 else valor for valor in dados.tolist()]
+            if nome in ("on_ground", "spi"):
+                valores = [None if valor is None else bool(valor) for valor in valores]
+        else:
+            valores = [None if valor != valor else valor for valor in dados.tolist()]
+            if nome in ("time_position", "last_contact"):
+                valores = [None if valor is None else int(valor) for valor in valores]
+        convertidas.append(valores)
+
+    # O índice 12 ("sensors") não é gravado e volta como None
+    return [list(linha[:12]) + [None] + list(linha[12:]) for linha in zip(*convertidas)]
+
+
+# Sessão reaproveitada nas consultas ao serviço local (mantém a conexão aberta)
+_sessao_servico = requests.Session()
+
+def buscar_snapshot_servico(url=SERVICO_SNAPSHOT_URL, atual=None, timeout=30):
+    """
+    Busca o snapshot atual no serviço local de snapshots.
+
+    O id do snapshot que o cliente já tem é enviado no cabeçalho If-None-Match: se o serviço
+    ainda estiver com o mesmo snapshot, ele responde 304 sem reenviar os estados.
+
+    Parâmetros:
+    - url (str): Endereço do serviço.
+    - atual (Snapshot, opcional): Snapshot que o cliente já tem.
+    - timeout (int): Timeout da requisição, em segundos.
+
+    Retorna:
+    - Snapshot: O snapshot do serviço (origem "servico"), ou o próprio `atual` se não mudou.
+
+    Exceções:
+    - requests.exceptions.RequestException: Se o serviço não responder ou responder com erro.
+    """
+    cabecalhos = {"If-None-Match": f'"{atual.id}"'} if atual is not None else {}
+    resposta = _sessao_servico.get(f"{url}/snapshot", headers=cabecalhos, timeout=timeout)
+    if resposta.status_code == 304:
+        return atual
+    resposta.raise_for_status()
+    dados = resposta.json()
+    return Snapshot(dados["estados"], dados["horario"], "servico", dados.get("tempo_servidor"))
+
+
+def _formatar_idade(segundos):
+    if segundos < 60:
+        return f"{segundos:.0f} s"
+    if segundos < 3600:
+        return f"{segundos / 60:.0f} min"
+    return f"{segundos / 3600:.1f} h"
+
+
+class GerenciadorSnapshot:
+    """
+    Mantém o snapshot de estados usado pelas opções do menu.
+
+    Na inicialização, o último snapshot salvo é carregado do disco e uma thread passa a buscar
+    estados atualizados em segundo plano, no intervalo configurado, enquanto o menu estiver em
+    uso (sem atividade por muito tempo, ela pausa até a próxima consulta). As consultas usam
+    sempre o snapshot mais recente, indicando a idade dos dados quando forem antigos; cada
+    snapshot novo substitui o anterior de uma só vez e é gravado em disco para a próxima execução.
+
+    Com um serviço local de snapshots configurado, as atualizações vêm dele (e o serviço é quem
+    busca na OpenSky e grava em disco).
+    """
+
+    def __init__(self, caminho=SNAPSHOT_ARQUIVO, idade_maxima=SNAPSHOT_IDADE_MAXIMA,
+                 intervalo=SNAPSHOT_INTERVALO_ATUALIZACAO, pausa_ocioso=SNAPSHOT_PAUSA_OCIOSO,
+                 servico=SERVICO_SNAPSHOT_URL):
+        self.caminho = caminho
+        self.servico = servico
+        self.idade_maxima = idade_maxima
+        self.intervalo = intervalo
+        self.pausa_ocioso = pausa_ocioso
+        self._atual = None
+        self._lock = threading.Lock()
+        self._atualizacao = None
+        # Protege a atividade, a pausa e o pedido para acordar a thread de atualizações
+        self._condicao = threading.Condition()
+        self._ultima_atividade = time.time()
+        self._pausado = False
+        self._acordar = False
+        self._parar = threading.Event()
+        self._atualizador = None
+        self._ouvintes = []
+
+    def iniciar(self):
+        """
+        Carrega o snapshot salvo e inicia as atualizações periódicas em segundo plano
+        (a primeira começa imediatamente).
+        """
+        salvo = carregar_snapshot(self.caminho)
+        with self._lock:
+            if self._atual is None:
+                self._atual = salvo
+            if self._atualizador is None or not self._atualizador.is_alive():
+                self._parar.clear()
+                self._atualizador = threading.Thread(target=self._executar_atualizacoes, daemon=True)
+                self._atualizador.start()
+
+    def encerrar(self):
+        """
+        Interrompe as atualizações periódicas.
+        """
+        self._parar.set()
+        with self._condicao:
+            self._acordar = True
+            self._condicao.notify_all()
+
+    def registrar_atividade(self):
+        """
+        Marca que o menu está em uso, retomando as atualizações periódicas se estiverem pausadas.
+        """
+        with self._condicao:
+            self._ultima_atividade = time.time()
+            if self._pausado:
+                self._acordar = True
+                self._condicao.notify_all()
+
+    def intervalo_efetivo(self):
+        """
+        Retorna o intervalo (s) entre as atualizações periódicas: o configurado, mas nunca menor
+        que o recomendado pelo agendador para caber na cota diária de créditos.
+        """
+        return max(self.intervalo, agendador.intervalo_recomendado("estados"))
+
+    def _executar_atualizacoes(self):
+        while not self._parar.is_set():
+            # A verificação de ociosidade e a pausa ficam sob a mesma trava que registrar_atividade
+            # usa, então uma atividade registrada nesse meio-tempo não se perde
+            with self._condicao:
+                if time.time() - self._ultima_atividade > self.pausa_ocioso:
+                    # Ocioso: espera a próxima atividade no menu para voltar a atualizar
+                    self._pausado = True
+                    self._condicao.wait_for(lambda: self._acordar)
+                    self._acordar = False
+                    self._pausado = False
+                    continue
+
+            self.atualizar_em_segundo_plano().join()
+            with self._condicao:
+                self._condicao.wait_for(lambda: self._acordar, timeout=self.intervalo_efetivo())
+                self._acordar = False
+
+    def _atualizacoes_ativas(self):
+        return self._atualizador is not None and self._atualizador.is_alive() and not self._parar.is_set()
+
+    def atualizar_em_segundo_plano(self):
+        """
+        Inicia uma busca de estados em segundo plano, se nenhuma estiver em andamento.
+
+        Retorna:
+        - threading.Thread: A thread da busca em andamento.
+        """
+        with self._lock:
+            if self._atualizacao is None or not self._atualizacao.is_alive():
+                self._atualizacao = threading.Thread(target=self._atualizar, kwargs={"silencioso": True}, daemon=True)
+                self._atualizacao.start()
+            return self._atualizacao
+
+    def _atualizar(self, silencioso=False):
+        novo = None
+        if self.servico:
+            with self._lock:
+                atual = self._atual
+            try:
+                novo = buscar_snapshot_servico(self.servico, atual)
+            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                logging.warning(f"Serviço de snapshots indisponível ({e}); buscando na OpenSky API.",
+                                extra={"endpoint": self.servico})
+            # O serviço ainda está com o mesmo snapshot
+            if novo is not None and novo is atual:
+                return atual
+
+        if novo is None:
+            estados = buscar_estados_opensky(silencioso=silencioso)
+            if estados is None:
+                return None
+            novo = Snapshot(estados, time.time(), "api", getattr(estados, "tempo", None))
+
+        with self._lock:
+            self._atual = novo
+        logging.info("Snapshot atualizado", extra={"snapshot_id": novo.id, "aeronaves": len(novo)})
+
+        # Os snapshots do serviço já foram gravados em disco por ele
+        if novo.origem == "api":
+            try:
+                salvar_snapshot(novo, self.caminho)
+            except OSError as e:
+                logging.error(f"Erro ao salvar o snapshot em {self.caminho}: {e}", extra={"snapshot_id": novo.id})
+
+        for ouvinte in list(self._ouvintes):
+            try:
+                ouvinte(novo)
+            except Exception as e:
+                logging.error(
+                    f"Erro ao processar o novo snapshot em {getattr(ouvinte, '__qualname__', ouvinte)}: {e}",
+                    extra={"snapshot_id": novo.id},
+                )
+        return novo
+
+    def adicionar_ouvinte(self, ouvinte):
+        """
+        Registra uma função chamada com cada novo snapshot obtido da API (na thread que fez a busca).
+        """
+        if ouvinte not in self._ouvintes:
+            self._ouvintes.append(ouvinte)
+
+    def idade_limite(self):
+        """
+        Retorna a idade (s) a partir da qual o snapshot é considerado antigo.
+
+        Com as atualizações periódicas ativas, o snapshot envelhece normalmente até o intervalo
+        efetivo entre elas (que pode ser maior que o configurado, para caber na cota de créditos)
+        antes de ser substituído; só passa a ser antigo quando a atualização atrasa mais que a
+        idade máxima além desse intervalo.
+        """
+        if self._atualizacoes_ativas():
+            return self.intervalo_efetivo() + self.idade_maxima
+        return self.idade_maxima
+
+    def snapshot_atual(self):
+        """
+        Retorna o snapshot atual (ou None), sem registrar atividade nem iniciar buscas.
+        """
+        with self._lock:
+            return self._atual
+
+    def obter_estados(self, silencioso=False):
+        """
+        Retorna os estados mais recentes disponíveis, sem esperar pela rede quando houver um snapshot.
+
+        Se o snapshot atual for mais antigo que a idade limite, ele é retornado assim mesmo, com um
+        aviso da idade (e, sem as atualizações periódicas, uma atualização é iniciada em segundo
+        plano). Sem nenhum snapshot, espera a busca em andamento ou faz a busca na hora. Com
+        silencioso=True (ex: no serviço de snapshots), nada é escrito no console.
+
+        Retorna:
+        - Snapshot: Os estados (lista no formato da OpenSky API), ou None se não houver dados.
+        """
+        self.registrar_atividade()
+        with self._lock:
+            atual = self._atual
+
+        if atual is None:
+            atualizacao = self._atualizacao
+            if atualizacao is not None and atualizacao.is_alive():
+                if not silencioso:
+                    console.print("[yellow]Buscando dados da OpenSky API...[/yellow]")
+                atualizacao.join()
+                with self._lock:
+                    atual = self._atual
+            if atual is None:
+                atual = self._atualizar(silencioso=silencioso)
+            return atual
+
+        idade = atual.idade()
+        if idade > self.idade_limite():
+            if not self._atualizacoes_ativas():
+                self.atualizar_em_segundo_plano()
+            if not silencioso:
+                console.print(
+                    f"[yellow]🕒 Exibindo dados de {_formatar_idade(idade)} atrás "
+                    f"({'último snapshot salvo' if atual.origem == 'disco' else 'última busca'}); "
+                    f"os dados são atualizados em segundo plano.[/yellow]"
+                )
+        return atual
+
+
+# Gerenciador compartilhado pelas opções do menu
+gerenciador_snapshot = GerenciadorSnapshot()
+
+def iniciar_snapshot():
+    """
+    Carrega o último snapshot salvo e inicia as atualizações em segundo plano (chamada ao abrir o programa).
+    """
+    gerenciador_snapshot.iniciar()
+
+def registrar_atividade():
+    """
+    Marca que o usuário está usando o menu (ver GerenciadorSnapshot.registrar_atividade).
+    """
+    gerenciador_snapshot.registrar_atividade()
+
+def obter_estados():
+    """
+    Retorna os estados de voo mais recentes disponíveis (ver GerenciadorSnapshot.obter_estados).
+    """
+    return gerenciador_snapshot.obter_estados()
@@ -0,0 +1,216 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from rich.console import Console
+from api import buscar_trajetoria, abrir_no_navegador
+from agendador import OPENSKY_MAX_CONCORRENCIA
+import numpy as np
+import logging
+import folium
+import json
+import time
+import os
+
+# Inicializa o console do rich
+console = Console()
+
+# Diretório do cache de trajetórias (um arquivo JSON por voo, separados por dia)
+TRAJETORIAS_DIR = os.getenv("TRAJETORIAS_DIR", os.path.join(os.path.dirname(__file__), "..", "cache", "trajetorias"))
+
+# Número máximo de trajetórias exibidas de uma vez (cada uma que não está no cache custa créditos da OpenSky)
+TRAJETORIAS_LIMITE = int(os.getenv("TRAJETORIAS_LIMITE", 50))
+
+# Validade (s) no cache das trajetórias vazias (a OpenSky ainda não tinha a trajetória, que pode ser
+# publicada depois); as trajetórias com pontos não expiram
+TRAJETORIAS_VAZIAS_VALIDADE = float(os.getenv("TRAJETORIAS_VAZIAS_VALIDADE", 21600))
+
+# Tolerância (em graus, ~1 km para 0.01) da simplificação das linhas desenhadas no mapa
+TRAJETORIA_TOLERANCIA_GRAUS = float(os.getenv("TRAJETORIA_TOLERANCIA_GRAUS", 0.01))
+
+# Arquivo do mapa gerado
+MAPA_TRAJETORIAS = os.path.join(os.path.dirname(__file__), "..", "mapa_trajetorias.html")
+
+CORES = ["blue", "red", "green", "purple", "orange", "darkred", "cadetblue", "darkgreen", "darkblue", "pink"]
+
+
+def _caminho_cache(icao24, primeira_deteccao):
+    dia = datetime.fromtimestamp(primeira_deteccao, timezone.utc).strftime("%Y-%m-%d")
+    return os.path.join(TRAJETORIAS_DIR, dia, f"{icao24}-{primeira_deteccao}.json")
+
+
+def carregar_trajetoria(icao24, primeira_deteccao):
+    """
+    Retorna a trajetória guardada no cache para o voo (icao24, firstSeen), ou None se não estiver
+    no cache (ou se for uma trajetória vazia guardada há mais de TRAJETORIAS_VAZIAS_VALIDADE).
+    """
+    caminho = _caminho_cache(icao24, primeira_deteccao)
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            trajetoria = json.load(arquivo)
+        if not trajetoria.get("path") and time.time() - os.path.getmtime(caminho) > TRAJETORIAS_VAZIAS_VALIDADE:
+            return None
+        return trajetoria
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, AttributeError) as e:
+        logging.error(f"Erro ao ler a trajetória de {icao24} do cache: {e}")
+        return None
+
+
+def salvar_trajetoria(icao24, primeira_deteccao, trajetoria):
+    """
+    Guarda a trajetória no cache. Um voo já terminado não muda, então o cache das trajetórias com
+    pontos não expira; as vazias valem por TRAJETORIAS_VAZIAS_VALIDADE.
+    """
+    caminho = _caminho_cache(icao24, primeira_deteccao)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(trajetoria, arquivo, separators=(",", ":"))
+    os.replace(temporario, caminho)
+
+
+def obter_trajetorias(voos, limite=TRAJETORIAS_LIMITE):
+    """
+    Obtém as trajetórias de uma lista de voos históricos, do cache em disco ou da OpenSky API.
+
+    As que não estão no cache são buscadas em paralelo, até o limite de requisições simultâneas
+    do agendador (que também controla os créditos); as obtidas são guardadas no cache, inclusive
+    as que a OpenSky não tem (com "path" vazio, por um tempo limitado, já que podem ser publicadas
+    depois), para que rever os mesmos voos não custe requisições.
+
+    Parâmetros:
+    - voos (list): Voos históricos (dicts da OpenSky, com "icao24" e "firstSeen").
+    - limite (int): Número máximo de voos considerados.
+
+    Retorna:
+    - dict: Trajetória de cada voo, indexada por (icao24, firstSeen). Os voos cuja busca falhou ficam de fora.
+    """
+    chaves = []
+    for voo in voos:
+        chave = (voo.get("icao24"), voo.get("firstSeen"))
+        if chave[0] and chave[1] and chave not in chaves:
+            chaves.append(chave)
+        if len(chaves) >= limite:
+            break
+
+    trajetorias = {}
+    pendentes = []
+    for chave in chaves:
+        trajetoria = carregar_trajetoria(*chave)
+        if trajetoria is None:
+            pendentes.append(chave)
+        else:
+            trajetorias[chave] = trajetoria
+
+    if pendentes:
+        console.print(
+            f"[yellow]Buscando {len(pendentes)} trajetórias na OpenSky API "
+            f"({len(trajetorias)} já estavam no cache)...[/yellow]"
+        )
+        with ThreadPoolExecutor(max_workers=OPENSKY_MAX_CONCORRENCIA) as executor:
+            for chave, trajetoria in zip(pendentes, executor.map(lambda c: buscar_trajetoria(*c), pendentes)):
+                if trajetoria is None:
+                    continue
+                trajetorias[chave] = trajetoria
+                try:
+                    salvar_trajetoria(*chave, trajetoria)
+                except OSError as e:
+                    logging.error(f"Erro ao salvar a trajetória de {chave[0]} no cache: {e}")
+
+        falhas = len(pendentes) - sum(1 for chave in pendentes if chave in trajetorias)
+        if falhas:
+            console.print(f"[red]⚠️ {falhas} trajetórias não puderam ser obtidas. ⚠️[/red]")
+
+    return trajetorias
+
+
+def simplificar_trajetoria(pontos, tolerancia=TRAJETORIA_TOLERANCIA_GRAUS):
+    """
+    Simplifica uma linha (lista de (lat, lon)) pelo algoritmo de Douglas-Peucker.
+
+    São mantidos só os pontos que se afastam mais que a tolerância da reta entre os pontos já
+    mantidos, o que preserva as curvas e descarta os trechos retos.
+    """
+    if len(pontos) < 3:
+        return list(pontos)
+
+    coordenadas = np.array(pontos, dtype=np.float64)
+    # Aproxima a longitude da mesma escala da latitude na região da trajetória
+    coordenadas[:, 1] *= np.cos(np.radians(coordenadas[:, 0].mean()))
+
+    manter = np.zeros(len(pontos), dtype=bool)
+    manter[0] = manter[-1] = True
+    trechos = [(0, len(pontos) - 1)]
+    while trechos:
+        inicio, fim = trechos.pop()
+        if fim - inicio < 2:
+            continue
+        segmento = coordenadas[fim] - coordenadas[inicio]
+        intermediarios = coordenadas[inicio + 1:fim] - coordenadas[inicio]
+        comprimento = np.hypot(segmento[0], segmento[1])
+        if comprimento == 0:
+            distancias = np.hypot(intermediarios[:, 0], intermediarios[:, 1])
+        else:
+            distancias = np.abs(segmento[0] * intermediarios[:, 1] - segmento[1] * intermediarios[:, 0]) / comprimento
+        mais_distante = int(np.argmax(distancias))
+        if distancias[mais_distante] > tolerancia:
+            mais_distante += inicio + 1
+            manter[mais_distante] = True
+            trechos.append((inicio, mais_distante))
+            trechos.append((mais_distante, fim))
+
+    return [pontos[i] for i in np.flatnonzero(manter)]
+
+
+def _trechos(pontos):
+    """
+    Divide a linha onde ela cruza o antimeridiano, para o mapa não a desenhar dando a volta no globo.
+    """
+    trechos = [[pontos[0]]]
+    for anterior, ponto in zip(pontos, pontos[1:]):
+        if abs(ponto[1] - anterior[1]) > 180:
+            trechos.append([])
+        trechos[-1].append(ponto)
+    return [trecho for trecho in trechos if len(trecho) > 1]
+
+
+def exibir_trajetorias_no_mapa(voos, trajetorias):
+    """
+    Desenha as trajetórias dos voos históricos (simplificadas) num mapa folium e abre no navegador.
+    """
+    mapa = folium.Map(location=[0, 0], zoom_start=2)
+    limites = []
+    desenhadas = 0
+
+    for voo in voos:
+        trajetoria = trajetorias.get((voo.get("icao24"), voo.get("firstSeen")))
+        if not trajetoria:
+            continue
+        pontos = [(ponto[1], ponto[2]) for ponto in trajetoria.get("path", []) if ponto[1] is not None and ponto[2] is not None]
+        if len(pontos) < 2:
+            continue
+
+        simplificados = simplificar_trajetoria(pontos)
+        cor = CORES[desenhadas % len(CORES)]
+        callsign = (voo.get("callsign") or voo.get("icao24")).strip()
+        descricao = (
+            f"{callsign}: {voo.get('estDepartureAirport') or '?'} → {voo.get('estArrivalAirport') or '?'} "
+            f"({len(pontos)} pontos, {len(simplificados)} desenhados)"
+        )
+        for trecho in _trechos(simplificados):
+            folium.PolyLine(trecho, color=cor, weight=2, opacity=0.8, tooltip=descricao).add_to(mapa)
+        folium.CircleMarker(simplificados[-1], radius=3, color=cor, fill=True, tooltip=descricao).add_to(mapa)
+        limites.extend(simplificados)
+        desenhadas += 1
+
+    if not desenhadas:
+        console.print("[yellow]⚠️ Nenhuma trajetória disponível para os voos selecionados. ⚠️[/yellow]")
+        return
+
+    latitudes = [lat for lat, _ in limites]
+    longitudes = [lon for _, lon in limites]
+    mapa.fit_bounds([[min(latitudes), min(longitudes)], [max(latitudes), max(longitudes)]])
+
+    mapa.save(MAPA_TRAJETORIAS)
+    console.print(f"[green]✅ Mapa com {desenhadas} trajetórias salvo em '{os.path.abspath(MAPA_TRAJETORIAS)}'.[/green]")
+    abrir_no_navegador(os.path.abspath(MAPA_TRAJETORIAS))
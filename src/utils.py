@@ -1,22 +1,44 @@
 from rich.console import Console
 from rich.table import Table
+from aeroportos import estimar_destinos
+from collections import OrderedDict
+from registro import configurar_registro
+import numpy as np
+import itertools
+import threading
 import logging
+import heapq
 import os
 
-# Caminho absoluto para o diretório de logs
-log_dir = os.path.join(os.path.dirname(__file__), "../logs")
-os.makedirs(log_dir, exist_ok=True)  # Garante que o diretório logs exista
-
-# Configura o logging com o caminho absoluto
-logging.basicConfig(
-    filename=os.path.join(log_dir, "erros.log"),
-    level=logging.ERROR,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+# Configura o logging (JSON, gravado em segundo plano com rotação)
+configurar_registro()
 
 # Cria uma instância do console
 console = Console()
 
+# Modo de memória reduzida, para máquinas pequenas: limita as linhas exibidas e as ordenações
+# às primeiras posições, sem montar cópias completas do snapshot
+MODO_MEMORIA_REDUZIDA = os.getenv("MODO_MEMORIA_REDUZIDA", "0").lower() in ("1", "true", "sim", "s")
+
+# Número máximo de linhas exibidas nas tabelas de voos (0 = sem limite)
+LIMITE_LINHAS_EXIBIDAS = int(os.getenv("LIMITE_LINHAS_EXIBIDAS", 200 if MODO_MEMORIA_REDUZIDA else 0))
+
+# Linhas de cada bloco das tabelas de voos: listas maiores são impressas em blocos, sem guardar todas as linhas
+LINHAS_POR_BLOCO = 1000
+
+# Colunas das tabelas de voos: nome, estilo e largura (usada quando a tabela é impressa em blocos)
+COLUNAS_TABELA = [
+    ("Código de Voo", "cyan", 13),
+    ("País de Origem", "green", 20),
+    ("Destino", "blue", 14),
+    ("Altitude (m)", "yellow", 12),
+    ("Velocidade (km/h)", "red", 17),
+    ("Direção (°)", "purple", 18),
+]
+
+# Número máximo de resultados de filtros guardados em cache para o snapshot atual (0 = desativa o cache)
+CACHE_FILTROS_MAXIMO = int(os.getenv("CACHE_FILTROS_MAXIMO", 32))
+
 def formatar_numero(numero, casas_decimais=2):
     """
     Formata um número para exibição, com um número específico de casas decimais.
@@ -26,13 +48,16 @@ def formatar_numero(numero, casas_decimais=2):
     except (ValueError, TypeError):
         return "Desconhecido"
 
-def ordenar_voos(voos, criterio):
+def ordenar_voos(voos, criterio, limite=None):
     """
     Ordena a lista de voos com base no critério especificado.
     
     Parâmetros:
-    - voos (list): Lista de voos.
+    - voos (iterable): Lista (ou gerador) de voos.
     - criterio (str): Critério de ordenação (ex: "altitude", "velocidade", "callsign").
+    - limite (int, opcional): Se informado, retorna apenas os primeiros voos da ordenação
+      (top-K), guardando só essa quantidade em memória. O padrão é LIMITE_LINHAS_EXIBIDAS
+      (0 = ordenação completa).
     
     Retorna:
     - list: Lista de voos ordenada.
@@ -50,34 +75,144 @@ def ordenar_voos(voos, criterio):
     else:
         return voos  # Retorna a lista original se o critério for inválido
 
+    decrescente = criterio in ["altitude", "velocidade"]
+    limite = LIMITE_LINHAS_EXIBIDAS if limite is None else limite
+    if limite:
+        # Seleção dos K primeiros com um heap de tamanho K, sem ordenar (nem copiar) tudo
+        return (heapq.nlargest if decrescente else heapq.nsmallest)(limite, voos, key=chave)
+
     # Ordena a lista de voos
-    return sorted(voos, key=chave, reverse=(criterio in ["altitude", "velocidade"]))
+    return sorted(voos, key=chave, reverse=decrescente)
 
-def exibir_lista_voos(voos):
+def exibir_lista_voos(voos, destinos=None, limite=None, total=None):
     """
     Exibe uma lista de voos em formato de tabela usando rich.
+
+    As listas com mais de LINHAS_POR_BLOCO voos são impressas em blocos (com a mesma largura de
+    colunas, formando uma única tabela), de modo que só um bloco de linhas fica em memória, mesmo
+    sem limite de linhas exibidas.
+
+    Parâmetros:
+    - voos (iterable): Lista (ou gerador) de voos. Só as linhas do bloco sendo exibido são
+      guardadas; as que passam do limite são apenas contadas.
+    - destinos (dict, opcional): Destino de cada voo indexado pelo icao24 normalizado, usado na
+      coluna "Destino" (ex: o resultado de destinos.buscar_destinos). Se omitido, os destinos das
+      linhas exibidas são buscados numa única chamada por bloco (destinos.buscar_destinos_lista).
+      Os voos sem destino conhecido recebem o destino estimado pelo índice de aeroportos, marcado com "(est.)".
+    - limite (int, opcional): Número máximo de linhas exibidas (padrão: LIMITE_LINHAS_EXIBIDAS; 0 = sem limite).
+    - total (int, opcional): Total real de voos, quando `voos` já chega reduzido (ex: as primeiras
+      posições de uma ordenação top-K). Padrão: o número de voos recebidos.
+
+    Retorna:
+    - int: Total de voos.
     """
-    if not voos:
+    limite = LIMITE_LINHAS_EXIBIDAS if limite is None else limite
+    restantes = iter(voos)
+    exibidos = 0
+    excedentes = 0
+
+    bloco, erro = _proximo_bloco(restantes, limite, 0)
+    if not bloco and erro is None:
         console.print("⚠️ Nenhum voo encontrado.", style="bold yellow")
-        return
+        return 0
 
     # Adiciona um espaço antes da tabela
     console.print()  # Linha em branco
 
-    # Cria uma tabela para exibir os voos
-    table = Table(title="✈️ Lista de Voos", show_header=True, header_style="bold magenta")
-    table.add_column("Código de Voo", style="cyan")
-    table.add_column("País de Origem", style="green")
-    table.add_column("Destino", style="blue")
-    table.add_column("Altitude (m)", style="yellow")
-    table.add_column("Velocidade (km/h)", style="red")
-    table.add_column("Direção (°)", style="purple")
+    # Um bloco à frente indica se a lista será impressa em blocos
+    seguinte, erro = _proximo_bloco(restantes, limite, len(bloco)) if erro is None else ([], erro)
+    em_blocos = bool(seguinte)
+    while bloco:
+        console.print(_tabela_voos(bloco, destinos, primeiro=exibidos == 0, em_blocos=em_blocos))
+        exibidos += len(bloco)
+        bloco = seguinte
+        if bloco and erro is None:
+            seguinte, erro = _proximo_bloco(restantes, limite, exibidos + len(bloco))
+        else:
+            seguinte = []
+
+    if erro is None:
+        # Os voos que passaram do limite são só contados
+        try:
+            excedentes = sum(1 for _ in restantes)
+        except Exception as e:
+            erro = e
+
+    if erro is not None:
+        # Um erro na origem dos voos (ex: na condição de um filtro) interrompe a lista, e o usuário é avisado
+        console.print(f"[red]⚠️ Erro ao obter os voos: {erro}. A lista exibida está incompleta. ⚠️[/red]")
+        logging.error(f"Erro ao obter os voos exibidos: {erro}")
+
+    # Adiciona um espaço após a tabela
+    console.print()  # Linha em branco
+
+    # Exibe o total de voos encontrados
+    total = exibidos + excedentes if total is None else total
+    console.print(f"✅ Total de voos encontrados: {total}", style="bold green")
+    if total > exibidos:
+        console.print(f"Exibindo os primeiros {exibidos} voos (LIMITE_LINHAS_EXIBIDAS).", style="yellow")
+
+    # Adiciona um espaço após o total de voos
+    console.print()  # Linha em branco
+
+    return total
+
+def _proximo_bloco(voos, limite, exibidos):
+    """
+    Retira do iterador o próximo bloco de voos a exibir, respeitando o limite de linhas.
+
+    Retorna o bloco e o erro que interrompeu a leitura (ou None); os voos lidos antes do erro
+    são mantidos no bloco, para que sejam exibidos.
+    """
+    tamanho = LINHAS_POR_BLOCO if not limite else min(LINHAS_POR_BLOCO, limite - exibidos)
+    bloco = []
+    try:
+        bloco.extend(itertools.islice(voos, max(tamanho, 0)))
+    except Exception as e:
+        return bloco, e
+    return bloco, None
+
+def _tabela_voos(voos, destinos, primeiro, em_blocos):
+    """
+    Monta a tabela de um bloco de voos (com título e cabeçalho só no primeiro bloco).
+    """
+    # Busca numa única chamada os destinos das linhas do bloco (importado aqui para que os
+    # processos de consulta aos dados exportados, que usam este módulo, não carreguem a API)
+    from destinos import buscar_destinos_lista, chave_destino
+    if destinos is None:
+        try:
+            destinos = buscar_destinos_lista(voos, lista_maior=em_blocos)
+        except Exception as e:
+            destinos = {}
+            logging.error(f"Erro ao buscar os destinos dos voos: {e}")
+
+    # Os voos sem destino conhecido recebem o destino estimado pelos aeroportos à frente da aeronave
+    sem_destino = [voo for voo in voos if destinos.get(chave_destino(voo)) in (None, "", "Desconhecido")]
+    estimados = {}
+    if sem_destino:
+        try:
+            estimados = {chave_destino((icao24,)): destino for icao24, destino in estimar_destinos(sem_destino).items()}
+        except Exception as e:
+            logging.error(f"Erro ao estimar os destinos dos voos: {e}")
+
+    # Cria uma tabela para exibir os voos; em blocos, sem bordas externas e com larguras fixas,
+    # para que os blocos impressos em sequência formem uma única tabela
+    table = Table(title="✈️ Lista de Voos" if primeiro else None, show_header=primeiro,
+                  header_style="bold magenta", show_edge=not em_blocos)
+    for nome, estilo, largura in COLUNAS_TABELA:
+        table.add_column(nome, style=estilo, width=largura if em_blocos else None)
 
     # Adiciona os voos à tabela
     for voo in voos:
         callsign = str(voo[1]) if voo[1] else "N/A"
         pais_origem = str(voo[2]) if voo[2] else "Desconhecido"
-        endereco = str(voo[3]) if voo[3] else "Desconhecido"
+        chave = chave_destino(voo)
+        if destinos.get(chave) not in (None, "", "Desconhecido"):
+            endereco = str(destinos[chave])
+        elif chave in estimados:
+            endereco = f"{estimados[chave]} (est.)"
+        else:
+            endereco = "Desconhecido"
         altitude = str(voo[7]) if voo[7] is not None else "Desconhecida"
         
         # Verifica se a velocidade está presente e é um número
@@ -91,17 +226,7 @@ def exibir_lista_voos(voos):
 
         table.add_row(callsign, pais_origem, endereco, altitude, velocidade, direcao)
 
-    # Exibe a tabela
-    console.print(table)
-
-    # Adiciona um espaço após a tabela
-    console.print()  # Linha em branco
-
-    # Exibe o total de voos encontrados
-    console.print(f"✅ Total de voos encontrados: {len(voos)}", style="bold green")
-
-    # Adiciona um espaço após o total de voos
-    console.print()  # Linha em branco
+    return table
 
 def tentar_novamente():
     """
@@ -115,13 +240,117 @@ def tentar_novamente():
 def filtrar_voos(estados, condicao):
     """
     Filtra uma lista de voos com base em uma condição fornecida.
+
+    Os voos são entregues um a um (gerador), sem montar uma nova lista com o resultado. Um erro
+    na condição é propagado a quem consome os voos, que fica sabendo que o resultado está
+    incompleto (exibir_lista_voos avisa o usuário).
     """
+    for voo in estados:
+        if condicao(voo):
+            yield voo
+
+class CacheFiltros:
+    """
+    Cache dos resultados dos filtros aplicados ao snapshot atual.
+
+    Cada resultado é guardado como o vetor de posições (int32) dos voos aprovados no snapshot,
+    e não como cópia das linhas, indexado por (id do snapshot, tipo do filtro, parâmetros).
+    Os resultados menos usados recentemente são descartados ao passar do limite, e todos são
+    descartados quando chega um snapshot novo. Estados sem id (listas comuns) não usam o cache.
+
+    O cache pode ser usado por várias threads ao mesmo tempo (ex: as requisições do serviço de
+    snapshots): o acesso aos resultados é protegido por uma trava, e o filtro é aplicado fora dela.
+    """
+
+    def __init__(self, maximo=CACHE_FILTROS_MAXIMO):
+        self.maximo = maximo
+        self.acertos = 0
+        self.falhas = 0
+        self._resultados = OrderedDict()
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def filtrar(self, estados, tipo, parametros, condicao):
+        """
+        Filtra os voos como filtrar_voos, reaproveitando o resultado de um filtro igual já aplicado ao mesmo snapshot.
+
+        Parâmetros:
+        - estados (list): Estados de voo (de preferência um Snapshot, que tem id).
+        - tipo (str): Nome do filtro (ex: "altitude_minima").
+        - parametros (tuple): Parâmetros do filtro já normalizados (ex: convertidos para float).
+        - condicao (function): Condição do filtro, chamada só quando o resultado não está no cache.
+
+        Retorna:
+        - iterator: Os voos aprovados, entregues um a um.
+        """
+        id_snapshot = getattr(estados, "id", None)
+        if not self.maximo or id_snapshot is None:
+            return filtrar_voos(estados, condicao)
+
+        chave = (id_snapshot, tipo, parametros)
+        with self._lock:
+            # Snapshot novo: os resultados anteriores não valem mais
+            if id_snapshot != self._snapshot:
+                self._resultados.clear()
+                self._snapshot = id_snapshot
+
+            posicoes = self._resultados.get(chave)
+            if posicoes is not None:
+                self.acertos += 1
+                self._resultados.move_to_end(chave)
+            else:
+                self.falhas += 1
+
+        if posicoes is None:
+            try:
+                posicoes = np.fromiter((i for i, voo in enumerate(estados) if condicao(voo)), dtype=np.int32)
+            except Exception as e:
+                console.print(f"[red]⚠️ Erro ao filtrar voos: {e} ⚠️[/red]")
+                logging.error(f"Erro ao filtrar voos: {e}")
+                return iter(())
+            with self._lock:
+                # Só guarda o resultado se o snapshot ainda for o atual do cache
+                if id_snapshot == self._snapshot:
+                    self._resultados[chave] = posicoes
+                    self._resultados.move_to_end(chave)
+                    if len(self._resultados) > self.maximo:
+                        self._resultados.popitem(last=False)
+
+        return (estados[i] for i in posicoes.tolist())
+
+    def limpar(self):
+        with self._lock:
+            self._resultados.clear()
+            self._snapshot = None
+
+# Cache compartilhado pelos filtros do menu
+cache_filtros = CacheFiltros()
+
+def espiar_voos(voos):
+    """
+    Verifica se um gerador de voos tem algum item sem perder o primeiro.
+
+    Um erro do gerador ao buscar o primeiro voo é entregue a quem consome o iterador
+    retornado (ex: exibir_lista_voos, que avisa o usuário), como os erros dos voos seguintes.
+
+    Retorna:
+    - iterator: Um iterador com todos os voos, ou None se não houver nenhum.
+    """
+    voos = iter(voos)
     try:
-        return [voo for voo in estados if condicao(voo)]
+        primeiro = next(voos, None)
     except Exception as e:
-        console.print(f"[red]⚠️ Erro ao filtrar voos: {e} ⚠️[/red]")
-        logging.error(f"Erro ao filtrar voos: {e}")
-        return []
+        return _propagar_erro(e)
+    if primeiro is None:
+        return None
+    return itertools.chain([primeiro], voos)
+
+def _propagar_erro(erro):
+    """
+    Gerador que lança o erro ao ser consumido.
+    """
+    raise erro
+    yield  # Torna a função um gerador
 
 def converter_grau_para_direcao(grau):
     """
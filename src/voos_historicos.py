@@ -1,10 +1,12 @@
 from datetime import datetime, timedelta
-from api import buscar_voos_historicos
-from utils import exibir_lista_voos, tentar_novamente
+from api import buscar_voos_historicos, buscar_voos_historicos_periodo, descrever_janelas_com_falha
+from estatisticas_historicas import calcular_estatisticas_trafego
+from utils import tentar_novamente, LIMITE_LINHAS_EXIBIDAS
+from trajetorias import obter_trajetorias, exibir_trajetorias_no_mapa, TRAJETORIAS_LIMITE
 from rich.console import Console
 from rich.prompt import Prompt
-from geopy.geocoders import Nominatim
-from consultas import obter_endereco  # Importando a função de obter o endereço
+from rich.table import Table
+from geocodificador import descrever_localizacao
 import requests
 
 
@@ -32,9 +34,8 @@ def obter_localizacao():
 
         console.print(f"Localização detectada automaticamente: Latitude = {latitude}, Longitude = {longitude}", style="bold green")
         
-        # Usar Geopy para melhorar a precisão e obter o nome da cidade, por exemplo
-        geolocator = Nominatim(user_agent="localizador")
-        local = geolocator.reverse((latitude, longitude), language='pt', timeout=10)
+        # Obtém o nome da cidade mais próxima pela base offline
+        local = descrever_localizacao(latitude, longitude)
         
         console.print(f"Localização detalhada (cidade): {local}", style="bold green")
         return latitude, longitude
@@ -107,26 +108,11 @@ def exibir_voos_historicos():
                 else:
                     continue
 
-            # Prepara e exibe os dados
-            voos_formatados = [
-                [
-                    None,
-                    voo.get("callsign", "N/A"),
-                    voo.get("origin_country", "Desconhecido"),
-                    # Usando as coordenadas para obter o endereço
-                    obter_endereco(voo.get("latitude", 0), voo.get("longitude", 0)),
-                    None,
-                    None,
-                    None,
-                    voo.get("altitude", "Desconhecida"),
-                    voo.get("velocity", "Desconhecida"),
-                    voo.get("heading", "Desconhecida")
-                ]
-                for voo in voos_historicos
-            ]
-
             console.print(f"✈️ Exibindo voos históricos ({tipo_voo}) de {inicio_dt.strftime('%d/%m/%Y %H:%M')} a {fim_dt.strftime('%d/%m/%Y %H:%M')}:", style="bold green")
-            exibir_lista_voos(voos_formatados)
+            exibir_tabela_voos_historicos(voos_historicos)
+
+            if voos_historicos and Prompt.ask("👉 Deseja ver as trajetórias no mapa?", choices=["s", "n"], default="n") == "s":
+                exibir_trajetorias(voos_historicos)
 
             # Pergunta ao usuário se deseja realizar outra consulta
             if not tentar_novamente():
@@ -139,4 +125,157 @@ def exibir_voos_historicos():
         except Exception as e:
             console.print(f"⚠️ Erro ao buscar voos históricos: {e}", style="bold red")
             if not tentar_novamente():
-                return
\ No newline at end of file
+                return
+
+def exibir_tabela_voos_historicos(voos, limite=None):
+    """
+    Exibe os voos históricos (no formato do endpoint /flights da OpenSky) em uma tabela usando rich.
+
+    O /flights não traz posição, altitude nem velocidade, só a aeronave, os aeroportos estimados
+    de partida e chegada e os horários em que ela foi vista pela primeira e pela última vez.
+    """
+    if not voos:
+        console.print("⚠️ Nenhum voo encontrado.", style="bold yellow")
+        return
+
+    limite = LIMITE_LINHAS_EXIBIDAS if limite is None else limite
+    exibidos = voos[:limite] if limite else voos
+
+    console.print()  # Linha em branco
+    table = Table(title="✈️ Lista de Voos Históricos", show_header=True, header_style="bold magenta")
+    table.add_column("Código de Voo", style="cyan")
+    table.add_column("ICAO24", style="green")
+    table.add_column("Origem", style="blue")
+    table.add_column("Destino", style="blue")
+    table.add_column("Partida", style="yellow")
+    table.add_column("Chegada", style="yellow")
+
+    for voo in exibidos:
+        table.add_row(
+            (voo.get("callsign") or "").strip() or "N/A",
+            voo.get("icao24") or "N/A",
+            voo.get("estDepartureAirport") or "Desconhecido",
+            voo.get("estArrivalAirport") or "Desconhecido",
+            _formatar_horario(voo.get("firstSeen")),
+            _formatar_horario(voo.get("lastSeen")),
+        )
+    console.print(table)
+    console.print()  # Linha em branco
+
+    console.print(f"✅ Total de voos encontrados: {len(voos)}", style="bold green")
+    if len(voos) > len(exibidos):
+        console.print(f"Exibindo os primeiros {len(exibidos)} voos (LIMITE_LINHAS_EXIBIDAS).", style="yellow")
+    console.print()  # Linha em branco
+
+def _formatar_horario(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%d/%m/%Y %H:%M") if timestamp else "Desconhecido"
+
+def exibir_trajetorias(voos):
+    """
+    Exibe no mapa as trajetórias de voos históricos, opcionalmente filtrados por código de voo ou aeroporto.
+
+    As trajetórias já vistas vêm do cache em disco; as demais são buscadas na OpenSky API.
+    """
+    filtro = Prompt.ask("👉 Filtrar por código de voo ou aeroporto (ICAO)? Deixe vazio para todos", default="").strip().upper()
+    if filtro:
+        voos = [
+            voo for voo in voos
+            if (voo.get("callsign") or "").strip().upper().startswith(filtro)
+            or filtro in ((voo.get("estDepartureAirport") or "").upper(), (voo.get("estArrivalAirport") or "").upper())
+        ]
+    if not voos:
+        console.print("⚠️ Nenhum voo corresponde ao filtro.", style="bold yellow")
+        return
+
+    if len(voos) > TRAJETORIAS_LIMITE:
+        console.print(f"Exibindo as trajetórias dos primeiros {TRAJETORIAS_LIMITE} voos (TRAJETORIAS_LIMITE).", style="yellow")
+        voos = voos[:TRAJETORIAS_LIMITE]
+
+    trajetorias = obter_trajetorias(voos)
+    exibir_trajetorias_no_mapa(voos, trajetorias)
+
+def exibir_estatisticas_trafego():
+    """
+    Exibe estatísticas de tráfego de um período de vários dias: movimentos por hora nos aeroportos
+    mais movimentados, rotas mais voadas e volume de voos por companhia aérea (prefixo do callsign).
+
+    Processo:
+        - Solicita o tipo de voo, a data de início e o número de dias do período.
+        - Busca os voos históricos do período em janelas de 2 horas, avisando se alguma falhou.
+        - Agrega os voos em paralelo e exibe as tabelas de estatísticas.
+    """
+    while True:
+        try:
+            tipo_voo = Prompt.ask("👉 Digite o tipo de voo (all para todos, arrival para chegadas, departure para partidas)", choices=["all", "arrival", "departure"], default="all").strip().lower()
+            inicio = Prompt.ask("👉 Digite a data de início (formato: DD/MM/AAAA)")
+            dias = int(Prompt.ask("👉 Digite o número de dias do período", default="1"))
+
+            inicio_dt = datetime.strptime(inicio, "%d/%m/%Y")
+            fim_dt = min(inicio_dt + timedelta(days=dias), datetime.now())
+
+            if dias <= 0 or fim_dt <= inicio_dt:
+                console.print("⚠️ O período deve ter pelo menos um dia e começar no passado.", style="bold red")
+                continue
+
+            console.print(f"🔎 Buscando voos de {inicio_dt.strftime('%d/%m/%Y')} a {fim_dt.strftime('%d/%m/%Y %H:%M')}...", style="bold yellow")
+            voos = buscar_voos_historicos_periodo(tipo_voo, int(inicio_dt.timestamp()), int(fim_dt.timestamp()))
+
+            # Janelas que falharam mesmo depois das novas tentativas deixam as estatísticas incompletas
+            if voos.janelas_com_falha:
+                console.print(
+                    f"⚠️ {len(voos.janelas_com_falha)} de {voos.total_janelas} janelas de 2 horas não puderam ser buscadas "
+                    f"({descrever_janelas_com_falha(voos)}); as estatísticas abaixo estão incompletas.",
+                    style="bold yellow",
+                )
+
+            if not voos:
+                console.print("⚠️ Nenhum voo histórico encontrado no período.", style="bold yellow")
+                if not tentar_novamente():
+                    return
+                continue
+
+            estatisticas = calcular_estatisticas_trafego(voos)
+            _exibir_tabelas_estatisticas(estatisticas)
+
+            if not tentar_novamente():
+                return
+
+        except ValueError:
+            console.print("⚠️ Entrada inválida. Use o formato DD/MM/AAAA e um número inteiro de dias.", style="bold red")
+            continue
+
+def _exibir_tabelas_estatisticas(estatisticas, limite=10):
+    """
+    Exibe as tabelas de aeroportos, rotas e companhias calculadas por calcular_estatisticas_trafego.
+    """
+    console.print(f"✅ {estatisticas['total_voos']} voos analisados.", style="bold green")
+
+    # Aeroportos mais movimentados, com a hora de pico
+    tabela = Table(title="🛬 Aeroportos mais movimentados", show_header=True, header_style="bold magenta")
+    tabela.add_column("Aeroporto", style="cyan")
+    tabela.add_column("Movimentos", style="yellow")
+    tabela.add_column("Hora de pico (UTC)", style="green")
+    tabela.add_column("Movimentos por hora (0h-23h UTC)", style="blue")
+    aeroportos = sorted(estatisticas["movimentos_por_hora"].items(), key=lambda item: sum(item[1]), reverse=True)
+    for aeroporto, por_hora in aeroportos[:limite]:
+        hora_pico = max(range(24), key=lambda hora: por_hora[hora])
+        tabela.add_row(aeroporto, str(sum(por_hora)), f"{hora_pico:02d}h ({por_hora[hora_pico]})", " ".join(str(total) for total in por_hora))
+    console.print(tabela)
+
+    # Rotas mais voadas
+    tabela = Table(title="🛫 Rotas mais voadas", show_header=True, header_style="bold magenta")
+    tabela.add_column("Origem", style="cyan")
+    tabela.add_column("Destino", style="blue")
+    tabela.add_column("Voos", style="yellow")
+    for (origem, destino), total in estatisticas["rotas"].most_common(limite):
+        tabela.add_row(origem, destino, str(total))
+    console.print(tabela)
+
+    # Volume por companhia aérea
+    tabela = Table(title="🏢 Voos por companhia (prefixo do callsign)", show_header=True, header_style="bold magenta")
+    tabela.add_column("Companhia", style="cyan")
+    tabela.add_column("Voos", style="yellow")
+    for prefixo, total in estatisticas["companhias"].most_common(limite):
+        tabela.add_row(prefixo, str(total))
+    console.print(tabela)
+    console.print()  # Linha em branco